@@ -0,0 +1,111 @@
+# benchmarks/bench_hot_paths.py
+# pytest-benchmark suite for every detection hot path, on deterministic
+# synthetic events modeled on live_anomalies.csv (src/synthetic_logs.py).
+# Not collected by a plain `pytest`; run it by path from the repo root:
+#   python -m pytest benchmarks/bench_hot_paths.py                            # compare with the baseline
+#   python -m pytest benchmarks/bench_hot_paths.py --benchmark-save=baseline  # record one on this machine
+# See benchmarks/conftest.py for where runs are stored and when the
+# regression threshold applies.
+
+import os
+
+import pandas as pd
+import pytest
+from joblib import load
+
+from src.anomaly_sink import AnomalySink
+from src.model_registry import MODEL_PATH
+from src.normalize import cache_clear, clean_message
+from src.preprocess import COL_NAMES, clean_log_frame
+from src.rules import RuleEngine, load_rules
+from src.synthetic_logs import generate_logs
+
+# --- Configuration ---
+EVENTS = 10000
+SCORE_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+ROUNDS = 5  # For the cases that need a fresh setup per round
+
+MODEL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def events():
+    # Numbered so every message is distinct and no cache can answer for it
+    return [(level, source, event_id, f'{message} #{n}')
+            for n, (level, source, event_id, message) in enumerate(generate_logs(EVENTS))]
+
+
+@pytest.fixture(scope='module')
+def messages(events):
+    return [message for _, _, _, message in events]
+
+
+@pytest.fixture(scope='module')
+def cleaned(messages):
+    return [clean_message(m) for m in messages]
+
+
+@pytest.fixture(scope='module')
+def model():
+    if not os.path.exists(MODEL_FILE):
+        pytest.skip(f"No model at {MODEL_FILE}; run src/model.py first")
+    return load(MODEL_FILE)
+
+
+def per(benchmark, count, unit):
+    """Records how many units one call handles, so per-unit cost can be read off the JSON."""
+    benchmark.extra_info['units'] = count
+    benchmark.extra_info['unit'] = unit
+
+
+def test_clean_message(benchmark, messages):
+    per(benchmark, len(messages), 'event')
+    benchmark.pedantic(lambda: [clean_message(m) for m in messages], setup=cache_clear,
+                       rounds=ROUNDS, warmup_rounds=1)
+
+
+def test_featurize(benchmark, model, cleaned):
+    if not hasattr(model, 'steps'):
+        pytest.skip('The model is not a Pipeline')
+    featurizer = model[:-1]
+    per(benchmark, len(cleaned), 'event')
+    benchmark(featurizer.transform, cleaned)
+
+
+@pytest.mark.parametrize('size', SCORE_BATCH_SIZES)
+def test_score_batch(benchmark, model, cleaned, size):
+    batch = cleaned[:size]
+    per(benchmark, len(batch), 'event')
+    benchmark(model.decision_function, batch)
+
+
+def test_rule_match(benchmark, events):
+    rules = load_rules()
+    per(benchmark, len(events), 'event')
+    benchmark.pedantic(lambda engine: [engine.match(m, s, i) for _, s, i, m in events],
+                       setup=lambda: ((RuleEngine(rules, cache_size=0),), {}), rounds=ROUNDS, warmup_rounds=1)
+
+
+def test_anomaly_persist(benchmark, events, tmp_path):
+    rows = [['Mon Jul 30 10:27:00 2025', s, i, m, 'Model detected anomaly'] for _, s, i, m in events]
+    paths = (str(tmp_path / f'anomalies_{n}.csv') for n in range(ROUNDS + 1))
+
+    def persist(path):
+        with AnomalySink(path, ['Timestamp', 'Source', 'EventID', 'Message', 'DetectionReason']) as sink:
+            for row in rows:
+                sink.write(row)
+
+    per(benchmark, len(rows), 'row')
+    benchmark.pedantic(persist, setup=lambda: ((next(paths),), {}), rounds=ROUNDS, warmup_rounds=1)
+
+
+def test_preprocess(benchmark, events):
+    frame = pd.DataFrame([(level, '7/30/2025 10:27:00 AM', s, i, 'None', m) for level, s, i, m in events] * 5,
+                         columns=COL_NAMES)
+    per(benchmark, len(frame), 'row')
+    benchmark.pedantic(clean_log_frame, args=(frame,), rounds=ROUNDS, warmup_rounds=1)
+
+
+def test_model_load(benchmark, model):
+    per(benchmark, 1, 'load')
+    benchmark.pedantic(load, args=(MODEL_FILE,), rounds=ROUNDS, warmup_rounds=1)
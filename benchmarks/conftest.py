@@ -0,0 +1,77 @@
+# benchmarks/conftest.py
+# pytest-benchmark settings for bench_hot_paths.py. Runs are stored under
+# benchmarks/<platform>/ with the machine they ran on; a plain run compares
+# with the *_baseline.json there and fails past REGRESSION_THRESHOLD,
+# but only when that baseline was recorded on the same reference machine
+# (CPU model and count, architecture, Python, numpy and scikit-learn).
+# Elsewhere the comparison is printed for information and nothing fails.
+#
+# The reference machine is whichever host records the committed baseline:
+# run the suite there with --benchmark-save=baseline and commit the JSON it
+# writes. Use a dedicated machine or CI runner; on a shared VM, timings
+# drift more between runs than REGRESSION_THRESHOLD allows.
+
+import glob
+import os
+import sys
+
+import pytest
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# --- Configuration ---
+BASELINE_NAME = 'baseline'
+REGRESSION_THRESHOLD = 'min:25%'  # Fastest round more than 25% slower than the baseline's fastest
+_DEFAULT_STORAGE = 'file://./.benchmarks'
+
+
+def reference_machine(machine_info):
+    """The parts of pytest-benchmark's machine_info that decide whether two runs' timings compare."""
+    cpu = machine_info.get('cpu') or {}
+    return {
+        'cpu': cpu.get('brand_raw'),
+        'cpus': cpu.get('count'),
+        'machine': machine_info.get('machine'),
+        'python': machine_info.get('python_version'),
+        'numpy': machine_info.get('numpy'),
+        'sklearn': machine_info.get('sklearn'),
+    }
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    from pytest_benchmark.utils import parse_compare_fail
+
+    if hasattr(config, '_benchmarksession'):
+        return  # Collected late by a run of other tests: leave that run's options alone
+    option = config.option
+    if getattr(option, 'benchmark_storage', None) == _DEFAULT_STORAGE:
+        option.benchmark_storage = f'file://{BENCHMARK_DIR}'
+    if option.benchmark_save or option.benchmark_autosave or option.benchmark_compare:
+        return
+    if glob.glob(os.path.join(BENCHMARK_DIR, '*', f'*_{BASELINE_NAME}.json')):
+        option.benchmark_compare = f'*_{BASELINE_NAME}'
+        if not option.benchmark_compare_fail:
+            option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
+
+
+def pytest_benchmark_update_machine_info(config, machine_info):
+    import numpy
+    import sklearn
+
+    machine_info['numpy'] = numpy.__version__
+    machine_info['sklearn'] = sklearn.__version__
+
+
+def pytest_benchmark_compare_machine_info(config, benchmarksession, machine_info, compared_benchmark):
+    saved = reference_machine(compared_benchmark['machine_info'])
+    here = reference_machine(machine_info)
+    if saved != here:
+        benchmarksession.logger.warning(
+            f"Baseline recorded on {saved}, this machine is {here}: comparing for information only. "
+            f"Record a baseline here with --benchmark-save={BASELINE_NAME} to enforce the threshold."
+        )
+        benchmarksession.compare_fail = []
@@ -0,0 +1,137 @@
+# src/aggregation.py
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.metrics import REGISTRY
+from src.template_miner import TemplateMiner
+
+# --- Configuration ---
+AGGREGATION_WINDOW = 60.0  # Seconds; identical anomalies inside one window become one record
+MAX_GROUPS = 10000         # Open groups held at most; beyond this the oldest window is emitted early
+
+# One record per (source, event_id, template) per window; message is the first one seen
+AnomalyRecord = namedtuple(
+    'AnomalyRecord', ['first_seen', 'last_seen', 'source', 'event_id', 'message', 'reason', 'count']
+)
+
+ANOMALY_RECORDS = REGISTRY.counter('logmon_anomaly_records_total', 'Aggregated anomaly records emitted')
+
+
+class _Group:
+    __slots__ = ('first_seen', 'last_seen', 'source', 'event_id', 'message', 'reason', 'count')
+
+    def __init__(self, first_seen, source, event_id, message, reason):
+        self.first_seen = self.last_seen = first_seen
+        self.source = source
+        self.event_id = event_id
+        self.message = message
+        self.reason = reason
+        self.count = 1
+
+    def record(self):
+        return AnomalyRecord(self.first_seen, self.last_seen, self.source, self.event_id,
+                             self.message, self.reason, self.count)
+
+
+class AnomalyAggregator:
+    """
+    Sits between detection and the anomaly sink. Anomalies with the same
+    source, EventID and message template (from a TemplateMiner, so record
+    numbers and GUIDs inside the text don't split them) that arrive in the
+    same `window` seconds are collapsed into one AnomalyRecord with a count,
+    first/last seen and the first message as a sample; `emit(record)` is
+    called for each once its window has closed.
+
+    Groups live in one bucket per window, in arrival order, so closing
+    windows only ever touches the oldest buckets. At most `max_groups`
+    groups are held; past that the oldest bucket is emitted early. A
+    window of 0 passes every anomaly straight through with count 1.
+    """
+
+    def __init__(self, emit, window=AGGREGATION_WINDOW, max_groups=MAX_GROUPS, miner=None, clock=time.time):
+        self.emit = emit
+        self.window = window
+        self.max_groups = max_groups
+        self.miner = miner or TemplateMiner()
+        self.clock = clock
+        self.anomalies = 0
+        self.records = 0
+        self._buckets = OrderedDict()  # window number -> {(source, event_id, template_id): _Group}
+        self._groups = 0
+        self._lock = threading.Lock()
+
+    def add(self, source, event_id, message, reason, seen):
+        """Counts one anomaly; `seen` is its timestamp as it should appear in the record."""
+        if self.window <= 0:
+            self.anomalies += 1
+            self._emit([_Group(seen, source, event_id, message, reason)])
+            return
+
+        now = self.clock()
+        with self._lock:
+            self.anomalies += 1
+            closed = self._pop_closed(now)
+            template_id, _ = self.miner.add(message)
+            key = (source, event_id, template_id)
+            bucket = self._buckets.setdefault(int(now // self.window), {})
+            group = bucket.get(key)
+            if group is None:
+                bucket[key] = _Group(seen, source, event_id, message, reason)
+                self._groups += 1
+                if self._groups > self.max_groups:
+                    closed.extend(self._pop_oldest())
+            else:
+                group.count += 1
+                group.last_seen = seen
+        self._emit(closed)
+
+    def flush_due(self):
+        """Emits every window that has closed; cheap enough to call on every poll."""
+        with self._lock:
+            closed = self._pop_closed(self.clock())
+        self._emit(closed)
+
+    def flush(self):
+        """Emits everything still open, e.g. before the sink is closed."""
+        with self._lock:
+            closed = []
+            while self._buckets:
+                closed.extend(self._pop_oldest())
+        self._emit(closed)
+
+    def mark(self):
+        """A position covering every anomaly added so far, for written_through()."""
+        return int(self.clock() // self.window) if self.window > 0 else 0
+
+    def written_through(self, mark):
+        """True once every anomaly added before mark() was taken has been emitted."""
+        with self._lock:
+            return not self._buckets or next(iter(self._buckets)) > mark
+
+    def _pop_closed(self, now):
+        current = int(now // self.window)
+        closed = []
+        while self._buckets and next(iter(self._buckets)) < current:
+            closed.extend(self._pop_oldest())
+        return closed
+
+    def _pop_oldest(self):
+        _, bucket = self._buckets.popitem(last=False)
+        self._groups -= len(bucket)
+        return list(bucket.values())
+
+    def _emit(self, groups):
+        for group in groups:
+            self.emit(group.record())
+        self.records += len(groups)
+        ANOMALY_RECORDS.inc(len(groups))
+
+    def stats(self):
+        return {
+            'anomalies': self.anomalies,
+            'records': self.records,
+            'open_groups': self._groups,
+            'reduction': self.anomalies / self.records if self.records else 0.0,
+        }
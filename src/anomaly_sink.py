@@ -0,0 +1,219 @@
+# src/anomaly_sink.py
+
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from src.anomaly_store import AnomalyStore
+from src.event_sources import parse_timestamp
+from src.metrics import ANOMALIES_WRITTEN, STAGE_SECONDS
+from src.structured_log import get_logger
+
+# --- Configuration ---
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+# Parquet column types by header name; every other column is a string
+PARQUET_TIMESTAMP_COLUMNS = ('Timestamp', 'LastSeen')
+PARQUET_INTEGER_COLUMNS = ('EventID', 'Count')
+PARQUET_PARTITION_COLUMN = 'Timestamp'
+# Hive's name for a null partition value; rows whose timestamp won't parse land here
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+_SINK_SECONDS = STAGE_SECONDS.labels(stage='sink')
+log = get_logger('sink')
+
+
+class AnomalySink:
+    """
+    Writes anomaly rows from a background thread so detection never waits on
+    disk I/O. Rows are buffered and flushed when `batch_size` rows are pending
+    or `flush_interval` seconds have passed, and always on close().
+
+    fmt='csv' appends to a single CSV file at `path` (header written once);
+    an existing file with a different header is renamed aside first, so
+    every row in the file matches its header.
+    fmt='parquet' writes one part file per flush and day under `path`,
+    partitioned by the day of each row's Timestamp
+    (`path/date=YYYY-MM-DD/part-*.parquet`), with typed timestamp and
+    integer columns; it needs pyarrow.
+    fmt='sqlite' inserts each flush into the indexed history database at
+    `path` (src/anomaly_store.py), which the API queries.
+
+    A batch that fails to write is kept and retried every `flush_interval`
+    (new rows join it), and only rows that were written count as flushed.
+    mark() and written_through(mark) tell a caller when every row queued
+    so far has been flushed, e.g. before checkpointing what was read.
+    """
+
+    def __init__(self, path, header, fmt='csv', batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        if fmt not in ('csv', 'parquet', 'sqlite'):
+            raise ValueError(f"Unsupported anomaly output format: {fmt}")
+        if fmt == 'parquet':
+            import pyarrow  # noqa: F401  -- fail now, not on the first flush
+        if fmt == 'csv':
+            _rotate_if_mismatched(path, header)
+
+        # Creates the database and schema now; the writer thread opens its own connection
+        self._store = AnomalyStore(path) if fmt == 'sqlite' else None
+        self.path = path
+        self.header = list(header)
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.flushes = 0
+        self._queued = 0
+        self._flushed = 0
+        self._queue = queue.Queue()
+        self._part = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='anomaly-sink', daemon=True)
+        self._worker.start()
+        # Make sure buffered rows hit the disk even if the caller forgets close()
+        atexit.register(self.close)
+
+    def write(self, row):
+        """Queues one row (a sequence matching `header`); never blocks on I/O."""
+        self._queued += 1
+        self._queue.put(row)
+
+    def mark(self):
+        """A position covering every row queued so far, for written_through()."""
+        return self._queued
+
+    def written_through(self, mark):
+        """True once every row queued before mark() was taken has been written."""
+        return self._flushed >= mark
+
+    def close(self):
+        """Flushes every queued row and stops the writer thread. Safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        pending = []
+        failed = False
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                row = ()
+            if row is None:
+                break
+            if row:
+                pending.append(row)
+            # After a failed write, wait out the interval instead of retrying on every row
+            if (len(pending) >= self.batch_size and not failed) or time.monotonic() >= deadline:
+                failed = not self._flush(pending)
+                if not failed:
+                    pending = []
+                deadline = time.monotonic() + self.flush_interval
+        if not self._flush(pending):
+            log.error(f"⚠️ Dropping {len(pending)} unwritten anomalies for '{self.path}' on close.")
+        if self._store is not None:
+            self._store.close()
+
+    def _flush(self, rows):
+        """Writes `rows`; False if that failed and they should be retried."""
+        if not rows:
+            return True
+        start = time.perf_counter()
+        try:
+            if self.fmt == 'csv':
+                self._write_csv(rows)
+            elif self.fmt == 'sqlite':
+                self._store.add(rows)
+            else:
+                self._write_parquet(rows)
+            self.rows_written += len(rows)
+            self.flushes += 1
+            ANOMALIES_WRITTEN.inc(len(rows))
+            _SINK_SECONDS.observe(time.perf_counter() - start)
+        except Exception as e:
+            log.error(f"⚠️ Failed to write {len(rows)} anomalies to '{self.path}'; will retry. Error: {e}")
+            return False
+        self._flushed += len(rows)
+        return True
+
+    def _write_csv(self, rows):
+        file_exists = os.path.isfile(self.path) and os.path.getsize(self.path) > 0
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(self.header)
+            writer.writerows(rows)
+
+    def _write_parquet(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, _parquet_type(pa, name)) for name in self.header])
+        typed = [[_parquet_value(name, value) for name, value in zip(self.header, row)] for row in rows]
+        by_day = {}
+        if PARQUET_PARTITION_COLUMN in self.header:
+            key = self.header.index(PARQUET_PARTITION_COLUMN)
+            for row in typed:
+                day = f"{row[key]:%Y-%m-%d}" if row[key] is not None else NULL_PARTITION
+                by_day.setdefault(day, []).append(row)
+        else:
+            by_day[f"{datetime.now():%Y-%m-%d}"] = typed
+
+        for day, day_rows in by_day.items():
+            partition = os.path.join(self.path, f"date={day}")
+            os.makedirs(partition, exist_ok=True)
+            columns = {name: [row[i] for row in day_rows] for i, name in enumerate(self.header)}
+            self._part += 1
+            filename = f"part-{time.time_ns()}-{self._part:06d}.parquet"
+            pq.write_table(pa.table(columns, schema=schema), os.path.join(partition, filename))
+
+
+def _parquet_type(pa, name):
+    if name in PARQUET_TIMESTAMP_COLUMNS:
+        return pa.timestamp('s')
+    if name in PARQUET_INTEGER_COLUMNS:
+        return pa.int64()
+    return pa.string()
+
+
+def _parquet_value(name, value):
+    """`value` converted to its column's Parquet type; None when it is empty or won't parse."""
+    if value is None or value == '':
+        return None
+    if name in PARQUET_TIMESTAMP_COLUMNS:
+        return value if isinstance(value, datetime) else parse_timestamp(str(value))
+    if name in PARQUET_INTEGER_COLUMNS:
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return str(value)
+
+
+def _rotate_if_mismatched(path, header):
+    """Renames a CSV whose header isn't `header` to path.<timestamp>.csv, so new rows start a new file."""
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            existing = next(csv.reader(f), None)
+    except FileNotFoundError:
+        return
+    if existing is None or existing == list(header):
+        return
+    root, ext = os.path.splitext(path)
+    rotated = f"{root}.{datetime.now():%Y%m%d-%H%M%S}{ext}"
+    os.replace(path, rotated)
+    log.warning(f"⚠️ '{path}' has columns {existing}, not {list(header)}; moved it to '{rotated}'.")
@@ -0,0 +1,362 @@
+# src/anomaly_store.py
+# Indexed anomaly history for the dashboard and the API: an embedded SQLite
+# database the sink can write to (fmt='sqlite') and the existing CSVs can be
+# imported into once.
+#   python -m src.anomaly_store import live_anomalies.csv
+#   python -m src.anomaly_store top --hours 1
+#   python -m src.anomaly_store history --source Application --limit 20
+#   python -m src.anomaly_store compact --retention-days 90
+
+import argparse
+import csv
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from src.event_sources import parse_log_line, parse_timestamp
+
+# --- Configuration ---
+ANOMALY_DB_PATH = 'data/anomalies.db'
+RETENTION_DAYS = 90           # Anomalies first seen longer ago are deleted; None keeps everything
+MAINTENANCE_INTERVAL = 3600   # Seconds between retention/compaction passes run by the writer
+DELETE_BATCH_SIZE = 50000     # Rows per retention transaction, so readers and the writer never wait long
+IMPORT_BATCH_SIZE = 10000
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+CACHE_SIZE_MB = 64            # Page cache per connection
+ROLLUP_SECONDS = 300          # Per-source anomaly counts are also kept per bucket this long
+
+# Timestamps are Unix seconds. source_counts holds each source's totals per
+# ROLLUP_SECONDS bucket, kept in step with the anomalies table by add() and
+# purge(); top_sources() reads whole buckets from it and only the partial
+# buckets at either end of the range through the (ts, source, count) index.
+# The other two indexes serve filtered history.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomalies (
+    id        INTEGER PRIMARY KEY,
+    ts        REAL    NOT NULL,
+    last_seen REAL    NOT NULL,
+    source    TEXT    NOT NULL,
+    event_id  INTEGER,
+    message   TEXT    NOT NULL,
+    reason    TEXT    NOT NULL,
+    count     INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS anomalies_ts ON anomalies (ts, source, count);
+CREATE INDEX IF NOT EXISTS anomalies_source_ts ON anomalies (source, ts);
+CREATE INDEX IF NOT EXISTS anomalies_event_ts ON anomalies (event_id, ts);
+CREATE TABLE IF NOT EXISTS source_counts (
+    bucket    INTEGER NOT NULL,
+    source    TEXT    NOT NULL,
+    anomalies INTEGER NOT NULL,
+    records   INTEGER NOT NULL,
+    PRIMARY KEY (bucket, source)
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = 'id, ts, last_seen, source, event_id, message, reason, count'
+
+AnomalyRow = namedtuple('AnomalyRow', ['id', 'timestamp', 'last_seen', 'source', 'event_id', 'message',
+                                       'reason', 'count'])
+SourceCount = namedtuple('SourceCount', ['source', 'anomalies', 'records'])
+
+
+def to_seconds(value):
+    """Unix seconds from a number, a datetime or any timestamp string parse_timestamp knows; None if unknown."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, datetime):
+        value = parse_timestamp(str(value))
+        if value is None:
+            return None
+    return value.timestamp()
+
+
+def parse_anomaly_row(row):
+    """
+    (ts, last_seen, source, event_id, message, reason, count) from a row in
+    either live_anomalies.csv layout - main.py's (Timestamp, Source, EventID,
+    Message[, Reason, Count, LastSeen]) or dashboard.py's (Timestamp,
+    "Source: .. | ID: .. | Message: ..", Reason[, Count, LastSeen]) - as the
+    sink writes it or as read back from the file. None for header and
+    malformed rows.
+    """
+    if len(row) < 3:
+        return None
+    if str(row[1]).startswith('Source: '):
+        parsed = parse_log_line(row[1])
+        if parsed is None:
+            return None
+        (source, event_id, message), reason, rest = parsed, row[2], row[3:]
+    elif len(row) >= 4:
+        source, event_id, message = row[1], row[2], row[3]
+        reason, rest = (row[4], row[5:]) if len(row) > 4 else ('', ())
+    else:
+        return None
+    try:
+        event_id = int(event_id)
+        count = int(rest[0]) if rest and rest[0] != '' else 1
+    except ValueError:
+        return None  # Header row
+    first = to_seconds(row[0])
+    if first is None:
+        return None
+    last = to_seconds(rest[1]) if len(rest) > 1 and rest[1] != '' else None
+    return first, first if last is None else last, source, event_id, message, reason, count
+
+
+def encode_cursor(row):
+    return f"{row.timestamp!r}:{row.id}"
+
+
+def decode_cursor(cursor):
+    """(ts, id) from a history() cursor; ValueError if it isn't one."""
+    ts, _, row_id = cursor.rpartition(':')
+    return float(ts), int(row_id)
+
+
+class AnomalyStore:
+    """
+    Anomaly records in an SQLite database in WAL mode, so the sink's writer
+    thread appends while any number of readers query. Every thread gets its
+    own connection. add() inserts a batch in one transaction; the writer
+    also deletes records older than `retention_days` and returns the freed
+    pages to the filesystem every MAINTENANCE_INTERVAL seconds.
+
+    history() pages with a cursor (the last row's timestamp and id) instead
+    of an offset, so page 10,000 costs the same as page 1.
+    """
+
+    def __init__(self, path=ANOMALY_DB_PATH, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self.rows_added = 0
+        self.rows_purged = 0
+        self._local = threading.local()
+        self._next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        # Only takes effect before the first table exists; lets compact() shrink the file
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; add() and purge() open their own transactions
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous = NORMAL")  # Durable at checkpoints; WAL keeps the file consistent
+            conn.execute(f"PRAGMA cache_size = {-CACHE_SIZE_MB * 1024}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def add(self, rows):
+        """
+        Inserts sink rows (see parse_anomaly_row) in one transaction. Returns
+        how many were stored; unparseable rows are skipped.
+        """
+        records = [record for record in map(parse_anomaly_row, rows) if record is not None]
+        if records:
+            anomalies, counted = Counter(), Counter()
+            for ts, _, source, _, _, _, count in records:
+                key = int(ts // ROLLUP_SECONDS), source
+                anomalies[key] += count
+                counted[key] += 1
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT INTO anomalies (ts, last_seen, source, event_id, message, reason, count) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+                conn.executemany(
+                    "INSERT INTO source_counts VALUES (?, ?, ?, ?) ON CONFLICT (bucket, source) DO UPDATE SET "
+                    "anomalies = anomalies + excluded.anomalies, records = records + excluded.records",
+                    [(bucket, source, anomalies[bucket, source], n) for (bucket, source), n in counted.items()]
+                )
+            self.rows_added += len(records)
+        if time.monotonic() >= self._next_maintenance:
+            self._next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+            self.maintain()
+        return len(records)
+
+    def top_sources(self, since, until=None, limit=10):
+        """SourceCounts with the most anomalies (summed Count) first seen in [since, until), most first."""
+        since, until = to_seconds(since), to_seconds(until)
+        first = math.ceil(since / ROLLUP_SECONDS)  # First bucket wholly inside the range
+        last = math.inf if until is None else math.floor(until / ROLLUP_SECONDS)  # Bucket `last` is not
+        parts, params = [], []
+
+        def scan(start, end):
+            # Pinned to the covering index: the cost follows the rows in the range, whatever the statistics say
+            parts.append("SELECT source, count AS anomalies, 1 AS records FROM anomalies INDEXED BY anomalies_ts "
+                         "WHERE ts >= ?" + ("" if end is None else " AND ts < ?"))
+            params.extend([start] if end is None else [start, end])
+
+        if first >= last:
+            scan(since, until)  # Shorter than a bucket
+        else:
+            scan(since, first * ROLLUP_SECONDS)
+            parts.append("SELECT source, anomalies, records FROM source_counts WHERE bucket >= ?"
+                         + ("" if until is None else " AND bucket < ?"))
+            params.extend([first] if until is None else [first, last])
+            if until is not None:
+                scan(last * ROLLUP_SECONDS, until)
+        sql = (f"SELECT source, SUM(anomalies) AS total, SUM(records) FROM ({' UNION ALL '.join(parts)}) "
+               "GROUP BY source ORDER BY total DESC, source LIMIT ?")
+        return [SourceCount(*row) for row in self._connection().execute(sql, params + [limit])]
+
+    def history(self, since=None, until=None, source=None, event_id=None, limit=PAGE_SIZE, cursor=None):
+        """
+        One page of anomalies, newest first, optionally limited to a time
+        range, a Source and/or an EventID. Returns (rows, next_cursor);
+        next_cursor is None on the last page. Raises ValueError for a bad cursor.
+        """
+        where, params = [], []
+        if source is not None:
+            where.append("source = ?")
+            params.append(source)
+        if event_id is not None:
+            where.append("event_id = ?")
+            params.append(event_id)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(to_seconds(since))
+        if until is not None:
+            where.append("ts < ?")
+            params.append(to_seconds(until))
+        if cursor is not None:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        sql = f"SELECT {_COLUMNS} FROM anomalies"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)  # One extra row says whether there is a next page
+        rows = [AnomalyRow(*row) for row in self._connection().execute(sql, params)]
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
+
+    def purge(self, older_than):
+        """
+        Deletes anomalies first seen before `older_than` (rounded down to a
+        rollup bucket, so the rollups stay exact), in short transactions.
+        Returns how many.
+        """
+        bucket = math.floor(to_seconds(older_than) / ROLLUP_SECONDS)
+        cutoff = bucket * ROLLUP_SECONDS
+        conn = self._connection()
+        purged = 0
+        while True:
+            with conn:
+                conn.execute("BEGIN")
+                deleted = conn.execute(
+                    "DELETE FROM anomalies WHERE id IN (SELECT id FROM anomalies WHERE ts < ? LIMIT ?)",
+                    (cutoff, DELETE_BATCH_SIZE)
+                ).rowcount
+            purged += deleted
+            if deleted < DELETE_BATCH_SIZE:
+                break
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM source_counts WHERE bucket < ?", (bucket,))
+        self.rows_purged += purged
+        return purged
+
+    def compact(self):
+        """Returns free pages to the filesystem, truncates the WAL and refreshes the planner's statistics."""
+        conn = self._connection()
+        # executescript() steps the pragma to completion; execute() would free a single page
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+
+    def maintain(self):
+        """Applies the retention period and compacts. Returns how many rows were purged."""
+        purged = 0
+        if self.retention_days is not None:
+            purged = self.purge(time.time() - self.retention_days * 86400)
+        self.compact()
+        return purged
+
+    def count(self):
+        """Rows in the store; scans an index, so meant for tools rather than request paths."""
+        return self._connection().execute("SELECT COUNT(*) FROM anomalies").fetchone()[0]
+
+
+def import_csv(store, path, encoding='utf-8'):
+    """Adds every row of a live_anomalies.csv (either layout) to the store. Returns (imported, skipped)."""
+    imported = skipped = 0
+    batch = []
+    with open(path, newline='', encoding=encoding, errors='replace') as f:
+        for row in csv.reader(f):
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                added = store.add(batch)
+                imported, skipped, batch = imported + added, skipped + len(batch) - added, []
+    if batch:
+        added = store.add(batch)
+        imported, skipped = imported + added, skipped + len(batch) - added
+    return imported, skipped
+
+
+def _format_seconds(seconds):
+    return datetime.fromtimestamp(seconds).isoformat(sep=' ', timespec='seconds')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query and maintain the anomaly history database.')
+    parser.add_argument('--db', default=ANOMALY_DB_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    imports = commands.add_parser('import', help='add the rows of live_anomalies.csv files')
+    imports.add_argument('paths', nargs='+')
+    imports.add_argument('--encoding', default='utf-8')
+    top = commands.add_parser('top', help='sources with the most anomalies recently')
+    top.add_argument('--hours', type=float, default=1.0)
+    top.add_argument('--limit', type=int, default=10)
+    history = commands.add_parser('history', help='newest anomalies first')
+    history.add_argument('--source', default=None)
+    history.add_argument('--event-id', type=int, default=None)
+    history.add_argument('--limit', type=int, default=20)
+    compact = commands.add_parser('compact', help='apply the retention period and shrink the file')
+    compact.add_argument('--retention-days', type=float, default=RETENTION_DAYS)
+    args = parser.parse_args()
+
+    store = AnomalyStore(args.db, retention_days=getattr(args, 'retention_days', RETENTION_DAYS))
+    if args.command == 'import':
+        for path in args.paths:
+            start = time.perf_counter()
+            imported, skipped = import_csv(store, path, args.encoding)
+            print(f"✅ '{path}': {imported} anomalies imported, {skipped} rows skipped "
+                  f"({time.perf_counter() - start:.1f}s).")
+        store.compact()
+    elif args.command == 'top':
+        rows = store.top_sources(time.time() - args.hours * 3600, limit=args.limit)
+        print(f"📊 Top sources in the last {args.hours:g}h:")
+        for row in rows:
+            print(f"  {row.anomalies:>8}  {row.source} ({row.records} records)")
+    elif args.command == 'history':
+        rows, _ = store.history(source=args.source, event_id=args.event_id, limit=args.limit)
+        for row in rows:
+            print(f"{_format_seconds(row.timestamp)}  {row.source} | ID: {row.event_id} | "
+                  f"x{row.count} | {row.reason} | {row.message}")
+    else:
+        before = os.path.getsize(args.db)
+        purged = store.maintain()
+        print(f"🧹 {purged} anomalies older than {args.retention_days:g} days purged; "
+              f"{before / 2**20:.1f} MiB -> {os.path.getsize(args.db) / 2**20:.1f} MiB.")
@@ -1,12 +1,182 @@
-# Example api.py snippet
-from fastapi import FastAPI
-from joblib import load
-
-app = FastAPI()
-model = load('models/crash_detector.joblib')
-
-@app.post("/predict")
-def predict_log(log_entry: dict):
-    log_message = log_entry['message']
-    prediction = model.predict([log_message])[0]
-    return {"log_message": log_message, "is_crash": int(prediction)}
\ No newline at end of file
+# src/api.py
+# Scoring service. Run from the repo root:
+#   uvicorn src.api:app --host 127.0.0.1 --port 8000
+import asyncio
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Response
+from pydantic import BaseModel
+
+from src.anomaly_store import ANOMALY_DB_PATH, MAX_PAGE_SIZE, PAGE_SIZE, AnomalyStore
+from src.feedback import FeedbackStore
+from src.metrics import CONTENT_TYPE, REGISTRY
+from src.model_registry import ModelWatcher, load_current_model
+from src.rules import RuleEngine
+from src.scoring_engine import ScoringEngine
+from src.structured_log import configure_logging, shutdown_logging
+
+# --- Configuration ---
+MODEL_PATH = 'models/anomaly_detector.joblib'
+MAX_BATCH_SIZE = 10000
+BATCH_CHUNK_SIZE = 1024   # /predict/batch splits big requests across the worker pool
+COALESCE_WINDOW = 0.005   # How long concurrent /predict calls wait to share one model call
+WORKERS = os.cpu_count() or 1
+
+class LogEntry(BaseModel):
+    message: str
+
+class LogBatch(BaseModel):
+    messages: List[str]
+
+class Prediction(BaseModel):
+    log_message: str
+    is_crash: int  # model.predict's convention, as before: -1 = anomaly, 1 = normal
+    anomaly_score: float  # decision_function value; negative means anomalous, 0.0 if a rule decided
+    keyword: Optional[str] = None
+    rule: Optional[str] = None
+
+class Correction(BaseModel):
+    message: str
+    is_crash: int  # The correct label: 1 = crash/anomaly, 0 = normal
+    source: Optional[str] = None
+    event_id: Optional[int] = None
+    level: Optional[str] = None
+
+class FeedbackBatch(BaseModel):
+    corrections: List[Correction]
+
+class FeedbackResult(BaseModel):
+    added: int
+    duplicates: int
+    total_rows: int
+
+class SourceCount(BaseModel):
+    source: str
+    anomalies: int  # Occurrences, counting every one an aggregated record stands for
+    records: int
+
+class Anomaly(BaseModel):
+    id: int
+    timestamp: datetime  # First occurrence
+    last_seen: datetime
+    source: str
+    event_id: Optional[int] = None
+    message: str
+    reason: str
+    count: int
+
+class AnomalyPage(BaseModel):
+    anomalies: List[Anomaly]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` for the next (older) page
+
+model, model_version = load_current_model(fallback_path=MODEL_PATH)
+# Single /predict requests are coalesced by the engine into one model call per window
+# Rules come from src/config.py (or its JSON override) and skip the model when they match
+engine = ScoringEngine(model, rules=RuleEngine.from_config(), max_latency=COALESCE_WINDOW)
+watcher = ModelWatcher(engine, model_version)
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='batch-scoring')
+# Analyst corrections; src/retrain.py folds them into the next model
+feedback = FeedbackStore()
+# Anomaly history written by the monitors' sqlite sink (or imported from their CSVs);
+# opened on startup so importing this module never creates the database
+history = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global history
+    # Model swaps and engine warnings go through the non-blocking log queue
+    configure_logging()
+    history = AnomalyStore(ANOMALY_DB_PATH)
+    engine.start()
+    watcher.start()
+    yield
+    watcher.stop()
+    engine.stop()
+    executor.shutdown(wait=True)
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
+
+def to_prediction(message, verdict):
+    return Prediction(
+        log_message=message,
+        is_crash=-1 if verdict.is_anomaly else 1,
+        anomaly_score=verdict.score,
+        keyword=verdict.keyword,
+        rule=verdict.rule,
+    )
+
+@app.post("/predict", response_model=Prediction)
+async def predict_log(log_entry: LogEntry):
+    try:
+        # Never wait on a full queue here: that would stall the event loop for every client
+        verdict = await asyncio.wrap_future(engine.submit(log_entry.message, block=False))
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="Scoring queue is full; retry shortly.",
+                            headers={'Retry-After': '1'})
+    return to_prediction(log_entry.message, verdict)
+
+@app.post("/predict/batch", response_model=List[Prediction])
+async def predict_batch(batch: LogBatch):
+    messages = batch.messages
+    if len(messages) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} messages per batch.")
+
+    loop = asyncio.get_running_loop()
+    chunks = [messages[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(messages), BATCH_CHUNK_SIZE)]
+    results = await asyncio.gather(
+        *(loop.run_in_executor(executor, engine.score_batch, chunk) for chunk in chunks)
+    )
+    return [
+        to_prediction(message, verdict)
+        for chunk, verdicts in zip(chunks, results)
+        for message, verdict in zip(chunk, verdicts)
+    ]
+
+@app.post("/feedback", response_model=FeedbackResult)
+async def record_feedback(batch: FeedbackBatch):
+    if len(batch.corrections) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} corrections per batch.")
+    rows = [
+        {'Message': c.message, 'is_crash': c.is_crash, 'Source': c.source, 'EventID': c.event_id, 'Level': c.level}
+        for c in batch.corrections
+    ]
+    loop = asyncio.get_running_loop()
+    try:
+        # One append (and fsync) for the whole batch, off the event loop
+        added, duplicates = await loop.run_in_executor(executor, feedback.add, rows)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return FeedbackResult(added=added, duplicates=duplicates, total_rows=len(feedback))
+
+# Plain `def`: FastAPI runs these in its thread pool, and each thread reads through its own connection
+@app.get("/anomalies/top-sources", response_model=List[SourceCount])
+def top_sources(hours: float = Query(1.0, gt=0), limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE)):
+    rows = history.top_sources(time.time() - hours * 3600, limit=limit)
+    return [SourceCount(source=r.source, anomalies=r.anomalies, records=r.records) for r in rows]
+
+@app.get("/anomalies", response_model=AnomalyPage)
+def anomaly_history(source: Optional[str] = None, event_id: Optional[int] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    try:
+        rows, next_cursor = history.history(since, until, source, event_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    anomalies = [
+        Anomaly(id=r.id, timestamp=datetime.fromtimestamp(r.timestamp), last_seen=datetime.fromtimestamp(r.last_seen),
+                source=r.source, event_id=r.event_id, message=r.message, reason=r.reason, count=r.count)
+        for r in rows
+    ]
+    return AnomalyPage(anomalies=anomalies, next_cursor=next_cursor)
+
+@app.get("/metrics")
+def metrics():
+    """Pipeline counters and stage latency histograms in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,65 @@
+# src/bench_aggregation.py
+# Replays the anomalies in live_anomalies.csv as a crash loop (at a fixed
+# rate on a simulated clock) into the anomaly sink, once with every anomaly
+# written and once through the AnomalyAggregator, and compares rows and
+# bytes written and the aggregator's cost per anomaly.
+#   python -m src.bench_aggregation --log live_anomalies.csv --anomalies 500000 --rate 1000 --window 60
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+from src.aggregation import AGGREGATION_WINDOW, AnomalyAggregator
+from src.anomaly_sink import AnomalySink
+from src.event_sources import read_replay_rows
+from src.main import ANOMALY_COLUMNS
+
+REASON = "Rule match (critical-keywords): 'fatal'"
+
+
+def write_all(path, anomalies):
+    with AnomalySink(path, ANOMALY_COLUMNS[:5]) as sink:
+        for stamp, source, event_id, message in anomalies:
+            sink.write([stamp, source, event_id, message, REASON])
+
+
+def write_aggregated(path, anomalies, rate, window):
+    clock = [0.0]
+    with AnomalySink(path, ANOMALY_COLUMNS) as sink:
+        aggregator = AnomalyAggregator(
+            lambda r: sink.write([r.first_seen, r.source, r.event_id, r.message, r.reason, r.count, r.last_seen]),
+            window, clock=lambda: clock[0],
+        )
+        start = time.perf_counter()
+        for stamp, source, event_id, message in anomalies:
+            aggregator.add(source, event_id, message, REASON, stamp)
+            clock[0] += 1.0 / rate
+        aggregator.flush()
+        elapsed = time.perf_counter() - start
+    return aggregator.stats(), elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark anomaly aggregation before the sink.')
+    parser.add_argument('--log', default='live_anomalies.csv')
+    parser.add_argument('--anomalies', type=int, default=500000)
+    parser.add_argument('--rate', type=float, default=1000, help='simulated anomalies per second')
+    parser.add_argument('--window', type=float, default=AGGREGATION_WINDOW)
+    args = parser.parse_args()
+
+    replay = [(str(stamp), source, event_id, message) for stamp, source, event_id, message in read_replay_rows(args.log)]
+    anomalies = list(itertools.islice(itertools.cycle(replay), args.anomalies))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path, aggregated_path = os.path.join(tmp, 'plain.csv'), os.path.join(tmp, 'aggregated.csv')
+        write_all(plain_path, anomalies)
+        stats, elapsed = write_aggregated(aggregated_path, anomalies, args.rate, args.window)
+        plain_bytes, aggregated_bytes = os.path.getsize(plain_path), os.path.getsize(aggregated_path)
+
+    print(f"📊 {args.anomalies} anomalies at {args.rate:.0f}/s simulated, {args.window:.0f}s window")
+    print(f"   every anomaly written : {args.anomalies:>10} rows {plain_bytes / 1024:>10.0f} KiB")
+    print(f"   aggregated            : {stats['records']:>10} rows {aggregated_bytes / 1024:>10.0f} KiB "
+          f"({stats['reduction']:.0f}x fewer rows, {plain_bytes / aggregated_bytes:.0f}x fewer bytes)")
+    print(f"   aggregator cost       : {elapsed / args.anomalies * 1e6:>10.2f} µs per anomaly")
@@ -0,0 +1,87 @@
+# src/bench_api.py
+# Load-tests the scoring service and reports requests/sec and tail latency.
+# Start the service yourself or pass --spawn to launch a local uvicorn:
+#   python -m src.bench_api --spawn --requests 5000 --concurrency 64
+#   python -m src.bench_api --spawn --batch-size 1000 --requests 200
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from src.scoring_engine import percentile
+from src.synthetic_logs import generate_logs
+
+
+async def wait_until_up(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.post(f"{url}/predict", json={'message': 'ping'})
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout}s")
+
+
+async def load_test(url, total, concurrency, batch_size):
+    messages = [message for _, _, _, message in generate_logs(max(batch_size, 1) * 100)]
+    latencies = []
+    sent = 0
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        await wait_until_up(client, url)
+
+        async def worker():
+            nonlocal sent
+            while sent < total:
+                i = sent
+                sent += 1
+                start = time.perf_counter()
+                if batch_size:
+                    offset = (i * batch_size) % (len(messages) - batch_size + 1)
+                    body = {'messages': messages[offset:offset + batch_size]}
+                    response = await client.post(f"{url}/predict/batch", json=body)
+                else:
+                    response = await client.post(f"{url}/predict", json={'message': messages[i % len(messages)]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, latencies
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the scoring API.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=0, help='0 = single /predict requests')
+    parser.add_argument('--spawn', action='store_true', help='start uvicorn src.api:app locally')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'src.api:app', '--port', args.url.rsplit(':', 1)[-1],
+             '--log-level', 'warning']
+        )
+    try:
+        elapsed, latencies = asyncio.run(load_test(args.url, args.requests, args.concurrency, args.batch_size))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    messages_per_request = args.batch_size or 1
+    print(f"📊 {len(latencies)} requests x {messages_per_request} message(s), concurrency {args.concurrency}")
+    print(f"   throughput : {len(latencies) / elapsed:10.0f} req/s "
+          f"({len(latencies) * messages_per_request / elapsed:.0f} messages/s)")
+    print(f"   latency    : p50 {percentile(latencies, 0.50) * 1000:.1f} ms | "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms | max {max(latencies) * 1000:.1f} ms")
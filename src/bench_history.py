@@ -0,0 +1,121 @@
+# src/bench_history.py
+# Dashboard-style queries over a large anomaly history: reading a
+# live_anomalies.csv with pandas for every question against the indexed
+# SQLite store (src/anomaly_store.py) after a one-shot import of the same
+# file. Also times sink-sized inserts into the already-large database.
+#   python -m src.bench_history --rows 2000000 --days 30
+#   python -m src.bench_history --rows 20000000 --skip-csv   # store only
+
+import argparse
+import csv
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from src.anomaly_store import AnomalyStore, import_csv
+from src.synthetic_logs import generate_logs
+
+COLUMNS = ['Timestamp', 'Source', 'EventID', 'Message', 'DetectionReason', 'Count', 'LastSeen']
+RARE_SOURCE = 'Microsoft-Windows-Kernel-Power'  # Every 10,000th row: a selective filter
+SINK_BATCH = 500
+SINK_BATCHES = 200
+
+
+def write_history(path, rows, days, seed=42):
+    """Writes `rows` anomalies spread evenly over the last `days` days, oldest first, in main.py's layout."""
+    end = time.time()
+    step = days * 86400 / rows
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for n, (_, source, event_id, message) in enumerate(generate_logs(rows, seed)):
+            if n % 10000 == 0:
+                source, event_id = RARE_SOURCE, 41
+            seen = datetime.fromtimestamp(end - (rows - n) * step).isoformat()
+            writer.writerow([seen, source, event_id, message, 'Model detected anomaly', 1 + n % 3, seen])
+    return end
+
+
+def timed(function, repeat=20):
+    """(median milliseconds, result) over `repeat` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def csv_queries(path, now):
+    """The questions answered by scanning the CSV, as a dashboard without the store would."""
+    hour_ago = pd.Timestamp(datetime.fromtimestamp(now - 3600))
+
+    def top_sources():
+        df = pd.read_csv(path, usecols=['Timestamp', 'Source', 'Count'], parse_dates=['Timestamp'])
+        recent = df[df['Timestamp'] >= hour_ago]
+        return recent.groupby('Source')['Count'].sum().nlargest(10)
+
+    def rare_source():
+        df = pd.read_csv(path, parse_dates=['Timestamp'])
+        return df[df['Source'] == RARE_SOURCE].nlargest(100, 'Timestamp')
+
+    return {'top sources, last hour': top_sources, 'newest 100 from a rare source': rare_source}
+
+
+def store_queries(store, now):
+    _, deep_cursor = store.history(until=now - 7 * 86400, limit=1)  # A page a week back
+    return {
+        'top sources, last hour': lambda: store.top_sources(now - 3600),
+        'top sources, last 24h': lambda: store.top_sources(now - 86400),
+        'top sources, last 30 days': lambda: store.top_sources(now - 30 * 86400),
+        'newest 100': lambda: store.history(),
+        'next 100 from a week back': lambda: store.history(cursor=deep_cursor),
+        'newest 100 from a rare source': lambda: store.history(source=RARE_SOURCE),
+        'newest 100 of EventID 1000': lambda: store.history(event_id=1000),
+        'EventID 1000, one day a week back': lambda: store.history(event_id=1000, since=now - 8 * 86400,
+                                                                    until=now - 7 * 86400),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark anomaly history queries: CSV scans vs the store.')
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--skip-csv', action='store_true', help="don't time the pandas CSV scans")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, db_path = os.path.join(tmp, 'live_anomalies.csv'), os.path.join(tmp, 'anomalies.db')
+        now = write_history(csv_path, args.rows, args.days)
+
+        store = AnomalyStore(db_path)
+        start = time.perf_counter()
+        imported, _ = import_csv(store, csv_path)
+        store.compact()
+        import_seconds = time.perf_counter() - start
+        print(f"📊 {imported} anomalies over {args.days:g} days; CSV {os.path.getsize(csv_path) / 2**20:.0f} MiB, "
+              f"database {os.path.getsize(db_path) / 2**20:.0f} MiB")
+        print(f"   one-shot import          : {import_seconds:>9.1f}s ({imported / import_seconds:,.0f} rows/s)")
+
+        baseline = {}
+        if not args.skip_csv:
+            baseline = {name: timed(query, 1)[0] for name, query in csv_queries(csv_path, now).items()}
+        print(f"   {'query':<36} {'CSV scan':>10} {'store':>10}")
+        for name, query in store_queries(store, now).items():
+            milliseconds, result = timed(query)
+            rows = len(result[0]) if isinstance(result, tuple) else len(result)
+            scan = f"{baseline[name]:>8.0f}ms" if name in baseline else f"{'-':>10}"
+            print(f"   {name:<36} {scan} {milliseconds:>8.2f}ms  ({rows} rows)")
+
+        # The live path: the sink's writer adds one batch per flush to the big database
+        batches = iter([[now + seconds, 'Application Error', 1000, 'Faulting application name: python.exe',
+                         'Model detected anomaly', 1, now + seconds] for seconds in range(first, first + SINK_BATCH)]
+                       for first in range(0, SINK_BATCH * SINK_BATCHES, SINK_BATCH))
+        flush_ms, _ = timed(lambda: store.add(next(batches)), SINK_BATCHES)
+        print(f"   sink flush ({SINK_BATCH} rows)    : {flush_ms:>9.2f}ms median "
+              f"({SINK_BATCH / flush_ms * 1000:,.0f} rows/s)")
+        store.close()
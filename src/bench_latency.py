@@ -0,0 +1,122 @@
+# src/bench_latency.py
+# Measures event-to-alert latency of the old fixed-sleep polling loop against
+# the adaptive PollScheduler. A producer thread writes synthetic events into
+# an in-memory "log" in random bursts; the monitor loop reads, scores and
+# raises alerts, and each alert's delay since its event was written is kept.
+#   python -m src.bench_latency --seconds 30 --rate 50
+
+import argparse
+import random
+import threading
+import time
+from collections import deque
+
+from src.event_sources import EventSource, SyntheticSource, event_message
+from src.model_registry import MODEL_PATH, load_current_model
+from src.rules import RuleEngine
+from src.scheduler import PollScheduler
+from src.scoring_engine import ScoringEngine, percentile
+
+
+class LiveLogSource(EventSource):
+    """An event log that a producer thread appends to; read() drains it like the real one."""
+    name = 'live'
+
+    def __init__(self, rate, seed=42):
+        self.rate = rate
+        self._events = deque()
+        self._synthetic = SyntheticSource(seed=seed)
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _produce(self):
+        # Bursts of 1-20 events, spaced so the long-run average is `rate`/sec
+        while not self._stop.is_set():
+            burst = self._rng.randint(1, 20)
+            for event in self._synthetic.read(burst):
+                self._events.append((time.perf_counter(), event))
+            self._stop.wait(self._rng.expovariate(self.rate / 10.5))
+
+    def read(self, max_events=20):
+        count = min(max_events, len(self._events))
+        return [self._events.popleft() for _ in range(count)]
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def score(engine, batch):
+    """Scores a read batch and returns the write-to-alert latency of each anomaly."""
+    pending = [(written, engine.submit(event_message(event))) for written, event in batch]
+    latencies = []
+    for written, future in pending:
+        if future.result().is_anomaly:
+            latencies.append(time.perf_counter() - written)
+    return latencies
+
+
+def fixed_sleep_loop(source, engine, deadline):
+    """The monitors' previous loop: sleep(2) when idle, sleep(1) per batch, 5s pause per 10 alerts."""
+    latencies, alerts = [], 0
+    while time.perf_counter() < deadline:
+        batch = source.read(20)
+        if not batch:
+            time.sleep(2)
+            continue
+        for latency in score(engine, batch):
+            latencies.append(latency)
+            alerts += 1
+            if alerts % 10 == 0:
+                time.sleep(5)
+        time.sleep(1)
+    return latencies
+
+
+def scheduled_loop(source, engine, deadline, max_latency):
+    scheduler = PollScheduler(max_latency)
+    latencies = []
+    while time.perf_counter() < deadline:
+        batch = source.read(1024)
+        latencies.extend(score(engine, batch))
+        scheduler.pause(len(batch), source)
+    return latencies, scheduler.stats()
+
+
+def report(label, latencies, extra=''):
+    if not latencies:
+        print(f"   {label:<14}: no alerts")
+        return
+    print(f"   {label:<14}: {len(latencies):6d} alerts | p50 {percentile(latencies, 0.5) * 1000:8.1f} ms"
+          f" | p99 {percentile(latencies, 0.99) * 1000:8.1f} ms | max {max(latencies) * 1000:8.1f} ms{extra}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare fixed-sleep and adaptive polling latency.')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--rate', type=float, default=50, help='average events/sec written')
+    parser.add_argument('--max-latency', type=float, default=1.0, help='scheduler idle latency target (s)')
+    args = parser.parse_args()
+
+    model, _ = load_current_model(fallback_path=MODEL_PATH)
+    engine = ScoringEngine(model, rules=RuleEngine.from_config()).start()
+
+    print(f"📊 {args.rate:.0f} events/s in bursts for {args.seconds:.0f}s per loop")
+    source = LiveLogSource(args.rate).start()
+    report('fixed sleeps', fixed_sleep_loop(source, engine, time.perf_counter() + args.seconds))
+    source.close()
+
+    source = LiveLogSource(args.rate).start()
+    latencies, stats = scheduled_loop(source, engine, time.perf_counter() + args.seconds, args.max_latency)
+    source.close()
+    report('scheduler', latencies, f" | {stats['polls'] / args.seconds:.0f} polls/s")
+    engine.stop()
+
+    if latencies and max(latencies) > args.max_latency + 0.25:
+        raise SystemExit(f"❌ Worst alert latency exceeded the {args.max_latency}s target.")
+    print(f"✅ Every alert was raised within the {args.max_latency}s latency target.")
@@ -0,0 +1,102 @@
+# src/bench_logging.py
+# Detection throughput with stdout going into a slow pipe (a throttled
+# console, ssh session or log shipper): the old print-per-anomaly reporting
+# against the queued, rate-limited logging in src/structured_log.py.
+#   python -m src.bench_logging --events 200000 --pipe-kib-per-sec 64
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Runs in the child: score synthetic events like main.py and report anomalies one way or the other
+CHILD = r"""
+import json, sys, time
+from src.event_sources import SyntheticSource, event_message
+from src.model_registry import MODEL_PATH, load_current_model
+from src.rules import RuleEngine
+from src.scoring_engine import ScoringEngine
+from src.structured_log import AlertSummarizer, configure_logging, shutdown_logging
+from src.template_miner import TemplateVerdictCache
+
+mode, count = sys.argv[1], int(sys.argv[2])
+model, _ = load_current_model(fallback_path=MODEL_PATH)
+engine = ScoringEngine(model, rules=RuleEngine.from_config(), template_cache=TemplateVerdictCache()).start()
+if mode == 'logging':
+    configure_logging()
+    alerts = AlertSummarizer()
+
+def report(event, message, reason):
+    if mode == 'print':
+        print(f"\n🚨 ANOMALY DETECTED!")
+        print(f"🔍 Reason: {reason}")
+        print(f"🧾 Event: Source: {event.SourceName} | ID: {event.EventID} | Message: {message}\n")
+    else:
+        alerts.report(event.SourceName, event.EventID, message, reason)
+
+source = SyntheticSource(count)
+start = time.perf_counter()
+events_done = anomalies = 0
+while True:
+    events = source.read()
+    if not events:
+        break
+    pending = [(event, engine.submit(event_message(event), event.SourceName, event.EventID)) for event in events]
+    for event, future in pending:
+        verdict = future.result()
+        if verdict.is_anomaly:
+            anomalies += 1
+            reason = "Model detected anomaly" if verdict.rule is None else f"Rule match ({verdict.rule}): '{verdict.keyword}'"
+            report(event, event_message(event), reason)
+    events_done += len(events)
+    if mode == 'logging':
+        alerts.flush_due()
+elapsed = time.perf_counter() - start
+engine.stop()
+if mode == 'logging':
+    alerts.flush()
+    shutdown_logging()
+sys.stderr.write(json.dumps({'events': events_done, 'anomalies': anomalies, 'seconds': elapsed}) + '\n')
+"""
+
+
+def slow_reader(pipe, kib_per_sec, counter):
+    """Drains `pipe` at no more than `kib_per_sec`, like a slow terminal."""
+    chunk = 4096
+    delay = chunk / (kib_per_sec * 1024)
+    while True:
+        data = os.read(pipe.fileno(), chunk)
+        if not data:
+            return
+        counter[0] += len(data)
+        time.sleep(delay)
+
+
+def run(mode, events, kib_per_sec):
+    child = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', CHILD, mode, str(events)],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    written = [0]
+    reader = threading.Thread(target=slow_reader, args=(child.stdout, kib_per_sec, written), daemon=True)
+    reader.start()
+    stderr = child.stderr.read().decode('utf-8', 'replace')
+    child.wait()
+    reader.join()
+    result = json.loads(stderr.strip().splitlines()[-1])
+    result['console_bytes'] = written[0]
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark anomaly reporting behind a slow stdout pipe.')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--pipe-kib-per-sec', type=float, default=64)
+    args = parser.parse_args()
+
+    print(f"📊 {args.events} synthetic events, stdout drained at {args.pipe_kib_per_sec:.0f} KiB/s")
+    for label, mode in (('print per anomaly (before)', 'print'), ('queued + summarized (after)', 'logging')):
+        result = run(mode, args.events, args.pipe_kib_per_sec)
+        print(f"   {label:<28} {result['events'] / result['seconds']:>10.0f} events/s | "
+              f"{result['anomalies']} anomalies | {result['console_bytes'] / 1024:>8.0f} KiB of console output")
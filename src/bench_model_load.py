@@ -0,0 +1,76 @@
+# src/bench_model_load.py
+# Compares cold-start time and memory of the plain joblib artifact with the
+# memory-mapped compact export, loading each in several processes at once.
+#   python -m src.bench_model_load --procs 4
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from joblib import load
+
+from src.mmap_model import export_mmap_model, load_mmap_model
+from src.model_registry import MODEL_PATH
+from src.normalize import clean_message
+from src.synthetic_logs import generate_logs
+
+# Runs in each child: load, score once, report timing and /proc memory counters
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from joblib import load
+from src.mmap_model import load_mmap_model
+path, mmap = sys.argv[1], sys.argv[2] == '1'
+model = load_mmap_model(path) if mmap else load(path)
+loaded = time.perf_counter() - start
+model.decision_function(['warm up message'])
+status = {}
+with open('/proc/self/status') as f:
+    for line in f:
+        key, _, value = line.partition(':')
+        if key in ('VmRSS', 'RssAnon', 'RssFile'):
+            status[key] = int(value.split()[0])
+print(json.dumps({'load_s': loaded, **status}), flush=True)
+sys.stdin.read()  # Stay alive until every sibling has loaded
+"""
+
+
+def run_children(path, mmap, procs):
+    children = [
+        subprocess.Popen([sys.executable, '-c', CHILD, path, '1' if mmap else '0'],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(procs)
+    ]
+    results = [json.loads(child.stdout.readline()) for child in children]
+    for child in children:
+        child.communicate('')
+    return results
+
+
+def summarize(label, results):
+    load_s = sum(r['load_s'] for r in results) / len(results)
+    rss = sum(r['VmRSS'] for r in results) / 1024
+    private = sum(r.get('RssAnon', 0) for r in results) / 1024
+    print(f"   {label:<10}: load {load_s * 1000:7.1f} ms | total RSS {rss:7.1f} MiB | private {private:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark model cold start and RSS.')
+    parser.add_argument('--procs', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mmap_path = export_mmap_model(load(MODEL_PATH), os.path.join(tmp, 'model.mmap.joblib'))
+
+        # The compact pipeline must score exactly like the original
+        messages = [clean_message(m) for _, _, _, m in generate_logs(5000)]
+        if not (load(MODEL_PATH).decision_function(messages) == load_mmap_model(mmap_path).decision_function(messages)).all():
+            raise SystemExit("❌ Compact model scores differ from the original.")
+        print("✅ Compact model scores are identical to the original.")
+
+        print(f"📊 {args.procs} processes loading concurrently")
+        summarize('joblib', run_children(MODEL_PATH, False, args.procs))
+        summarize('mmap', run_children(mmap_path, True, args.procs))
@@ -0,0 +1,88 @@
+# src/bench_normalize.py
+# Checks that the shared normalizer is byte-identical to the original regex
+# cleaning (live and training paths) and times both. Run from the repo root:
+#   python -m src.bench_normalize --rows 1000000
+
+import argparse
+import csv
+import re
+import sys
+import time
+
+import pandas as pd
+
+from src.normalize import clean_message, clean_series
+from src.synthetic_logs import generate_logs
+
+# Awkward inputs: unicode case folding, non-ASCII whitespace, control chars
+EDGE_CASES = [
+    "", "   ", "ABC def", "Fatal CRASH!!! 0xC0000005", "tab\tand\nnewline\r\n",
+    "\x1c\x1d\x1e\x1f separators", "non\u00a0breaking\u2003spaces", "İstanbul ǅ ß ﬃ",
+    "Ünïcödé façade — naïve", "\\\\?\\C:\\WINDOWS\\SystemTemp\\WER-425703-0.sysdata.xml",
+    "mixed ＡＢＣ full-width", "emoji 🚨 alert", "\u2028line\u2029para",
+]
+
+
+def legacy_live_clean(message):
+    """The clean_message that used to live in main.py / dashboard.py."""
+    if not isinstance(message, str):
+        return ""
+    cleaned = message.lower()
+    cleaned = re.sub(r'[^a-z\s]', '', cleaned)
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    return cleaned
+
+
+def legacy_training_clean(series):
+    """The row-wise cleaning that used to live in preprocess.py."""
+    cleaned = series.astype(str).str.lower()
+    cleaned = cleaned.apply(lambda x: re.sub(r'[^a-z\s]', '', x))
+    return cleaned.apply(lambda x: re.sub(r'\s+', ' ', x).strip())
+
+
+def load_corpus(rows):
+    messages = list(EDGE_CASES)
+    try:
+        with open('live_anomalies.csv', newline='', encoding='utf-8') as f:
+            messages.extend(' '.join(row) for row in csv.reader(f))
+    except FileNotFoundError:
+        pass
+    messages.extend(message for _, _, _, message in generate_logs(rows))
+    return messages
+
+
+def check_identical(messages):
+    series = pd.Series(messages)
+    training = legacy_training_clean(series).tolist()
+    bulk = clean_series(series.astype(str)).tolist()
+    for i, message in enumerate(messages):
+        live = clean_message(message)
+        if not (live.encode() == legacy_live_clean(message).encode()
+                == training[i].encode() == bulk[i].encode()):
+            print(f"❌ Mismatch for {message!r}: {live!r} vs {training[i]!r}")
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify and benchmark message normalization.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    messages = load_corpus(args.rows)
+    if not check_identical(messages[:200000]):
+        sys.exit(1)
+    print(f"✅ Live, training and bulk cleaning are byte-identical on {min(len(messages), 200000)} messages.")
+
+    series = pd.Series(messages)
+    start = time.perf_counter()
+    legacy_training_clean(series)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clean_series(series.astype(str))
+    bulk = time.perf_counter() - start
+
+    print(f"📊 {len(messages)} rows")
+    print(f"   row-wise apply : {len(messages) / legacy:12.0f} rows/s")
+    print(f"   clean_series   : {len(messages) / bulk:12.0f} rows/s ({legacy / bulk:.1f}x)")
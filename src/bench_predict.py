@@ -0,0 +1,62 @@
+# src/bench_predict.py
+# Scores a synthetic Event Viewer export with the batch scorer (CSV and
+# Parquet output, one or more workers) and compares it with scoring the
+# same rows one event at a time, the way the live monitors would.
+#   python -m src.bench_predict --rows 1000000 --workers 1 4
+
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+
+from src.model_registry import MODEL_PATH, load_current_model
+from src.normalize import clean_message
+from src.predict import predict_export
+from src.rules import RuleEngine
+from src.synthetic_logs import generate_logs
+
+PER_EVENT_SAMPLE = 1000
+
+
+def write_export(path, rows):
+    """Writes an Event Viewer-shaped CSV export with `rows` synthetic events."""
+    with open(path, 'w', newline='', encoding='latin1', errors='replace') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Level', 'Date and Time', 'Source', 'Event ID', 'Task Category', 'Message'])
+        for level, source, event_id, message in generate_logs(rows):
+            writer.writerow([level, '7/30/2025 10:27:00 AM', source, event_id, 'None', message])
+
+
+def per_event_rate(sample):
+    """Rows per minute scoring one event per model call."""
+    model, _ = load_current_model(fallback_path=MODEL_PATH)
+    rules = RuleEngine.from_config()
+    start = time.perf_counter()
+    for _, source, event_id, message in sample:
+        if rules.match(message, source, event_id) is None:
+            model.decision_function([clean_message(message)])
+    return len(sample) / (time.perf_counter() - start) * 60
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the batch export scorer.')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export = os.path.join(tmp, 'export.csv')
+        write_export(export, args.rows)
+
+        results = [('one event per call', per_event_rate(list(itertools.islice(generate_logs(args.rows),
+                                                                                PER_EVENT_SAMPLE))))]
+        for workers in sorted(set(args.workers)):
+            for suffix in ('csv', 'parquet'):
+                run = predict_export(export, os.path.join(tmp, f'scored.{suffix}'), workers=workers)
+                results.append((f'batch, {workers} worker(s), {suffix}', run['rows_in'] / run['seconds'] * 60))
+
+    print(f"\n📊 {args.rows} rows")
+    for label, rate in results:
+        print(f"   {label:<32} {rate:>14,.0f} rows/min")
@@ -0,0 +1,78 @@
+# src/bench_rules.py
+# Times rule evaluation per event: the old uncompiled keyword re.search
+# against the RuleEngine with the configured rules and with a few hundred
+# generated rules, on a replayed anomaly log (messages repeat, as in real
+# logs) and on synthetic messages that are all distinct.
+#   python -m src.bench_rules --log live_anomalies.csv --events 200000 --rules 400
+
+import argparse
+import itertools
+import random
+import re
+import time
+
+from src.event_sources import read_replay_rows
+from src.rules import Rule, RuleEngine, ahocorasick, load_rules
+from src.synthetic_logs import generate_logs
+
+LEGACY_KEYWORDS = r'fatal|crash|failed|exception|unhandled|error'
+
+
+def generated_rules(count, seed=42):
+    """`count` rules in the mix a real deployment would grow: mostly keywords, some regexes, ids, sources."""
+    rng = random.Random(seed)
+    words = lambda n: [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(5, 12))) for _ in range(n)]
+    rules = []
+    for n in range(count):
+        kind = rng.choices(['keyword', 'regex', 'event_id', 'source'], weights=[70, 10, 10, 10])[0]
+        if kind == 'keyword':
+            patterns = words(5)
+        elif kind == 'regex':
+            patterns = [rf'{words(1)[0]}\s+\d+ {words(1)[0]}']
+        elif kind == 'event_id':
+            patterns = [rng.randint(20000, 90000) for _ in range(3)]
+        else:
+            patterns = words(2)
+        rules.append(Rule(f'{kind}-{n}', kind, patterns, 'alert'))
+    return load_rules() + rules
+
+
+def time_per_event(match, events):
+    start = time.perf_counter()
+    for source, event_id, message in events:
+        match(message, source, event_id)
+    return (time.perf_counter() - start) / len(events) * 1e9
+
+
+def legacy_match(message, source, event_id):
+    return re.search(LEGACY_KEYWORDS, message, re.IGNORECASE)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the keyword/rule engine.')
+    parser.add_argument('--log', default='live_anomalies.csv')
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--rules', type=int, default=400)
+    args = parser.parse_args()
+
+    replay = [(source, event_id, message) for _, source, event_id, message in read_replay_rows(args.log)]
+    stream = list(itertools.islice(itertools.cycle(replay), args.events))
+    # Fresh messages: every one differs, so nothing is served from the match cache
+    fresh = [(source, event_id, f'{message} #{n}')
+             for n, (_, source, event_id, message) in enumerate(generate_logs(args.events))]
+
+    configured = RuleEngine(load_rules())
+    many = RuleEngine(generated_rules(args.rules))
+    print(f"📊 {args.events} events, keyword matcher: {'Aho-Corasick' if ahocorasick else 'trie regex'}")
+    print(f"   {'':<32} {'repeating':>12} {'fresh':>12}")
+    print(f"   {'legacy re.search':<32} {time_per_event(legacy_match, stream):>9.0f} ns "
+          f"{time_per_event(legacy_match, fresh):>9.0f} ns")
+    for label, engine in (('configured rules', configured), (f'{len(many.rules)} rules', many)):
+        warm = time_per_event(engine.match, stream)
+        cold = time_per_event(RuleEngine(engine.rules, cache_size=0).match, fresh)
+        print(f"   {'RuleEngine, ' + label:<32} {warm:>9.0f} ns {cold:>9.0f} ns")
+
+    busiest = sorted(configured.stats()['rules'], key=lambda r: -r['hits'])[:5]
+    print("   busiest configured rules:")
+    for rule in busiest:
+        print(f"     {rule['name']:<24} {rule['hits']:>8} hits {rule['match_ms']:>8.1f} ms")
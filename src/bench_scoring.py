@@ -0,0 +1,55 @@
+# src/bench_scoring.py
+# Compares per-event model.predict against the micro-batched ScoringEngine
+# on a synthetic event stream. Run from the repo root:
+#   python -m src.bench_scoring --events 20000
+
+import argparse
+import time
+
+from joblib import load
+
+from src.event_sources import event_message, synthetic_source
+from src.normalize import clean_message
+from src.scoring_engine import ScoringEngine
+
+# Same settings as src/main.py, which can't be imported off Windows
+MODEL_PATH = 'models/anomaly_detector.joblib'
+CRITICAL_KEYWORDS = r'fatal|crash|failed|exception|unhandled|error'
+
+
+def bench_per_event(model, events):
+    start = time.perf_counter()
+    for event in events:
+        model.predict([clean_message(event_message(event))])
+    return time.perf_counter() - start
+
+
+def bench_engine(model, events, batch_size, max_latency):
+    engine = ScoringEngine(model, keywords=CRITICAL_KEYWORDS,
+                           batch_size=batch_size, max_latency=max_latency)
+    start = time.perf_counter()
+    engine.run(iter(events), lambda event, message, verdict: None)
+    return time.perf_counter() - start, engine.stats()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark batched vs per-event scoring.')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    model = load(MODEL_PATH)
+    events = list(synthetic_source(args.events))
+
+    # The per-event path is slow, so time it on a slice and extrapolate
+    sample = events[:min(len(events), 2000)]
+    per_event = bench_per_event(model, sample) / len(sample) * len(events)
+    batched, stats = bench_engine(model, events, args.batch_size, args.max_latency)
+
+    print(f"📊 {len(events)} synthetic events")
+    print(f"   per-event predict : {len(events) / per_event:10.0f} events/s")
+    print(f"   batched engine    : {len(events) / batched:10.0f} events/s ({per_event / batched:.1f}x)")
+    print(f"   mean batch size   : {stats['mean_batch_size']:.1f}")
+    print(f"   queue depth       : {stats['queue_depth']}")
+    print(f"   p50 / p99 latency : {stats['p50_latency_ms']:.2f} ms / {stats['p99_latency_ms']:.2f} ms")
@@ -0,0 +1,144 @@
+# src/bench_sharded.py
+# Throughput of sharded detection (src/sharded.py) against the single-process
+# engine on a synthetic stream, plus the per-event cost of each stage: the
+# serial reader and merger bound what adding shards can buy, so the projected
+# ceiling is printed next to what this machine actually measured.
+#   python -m src.bench_sharded --events 100000 --shards 1 2 4
+
+import argparse
+import os
+import threading
+import time
+
+from src.event_sources import event_message, event_seconds, open_source
+from src.model_registry import MODEL_PATH, load_current_model
+from src.rate_detector import RateDetector
+from src.rules import RuleEngine
+from src.scoring_engine import ScoringEngine
+from src.sharded import SHARD_BATCH_SIZE, ShardedDetector, decode_events, encode_verdicts, route
+from src.template_miner import TemplateVerdictCache
+
+
+class Records:
+    """Stands in for a ring: keeps what is put, hands it all back on get()."""
+
+    def __init__(self):
+        self.records = []
+
+    def put(self, records):
+        self.records.extend(records)
+
+    def get(self):
+        records, self.records = self.records + [b''], []
+        return records
+
+
+class Counter:
+    value = 1 << 62  # The merger is never behind
+
+
+def engine_for(model):
+    return ScoringEngine(model, rules=RuleEngine.from_config(), template_cache=TemplateVerdictCache(),
+                         rate_detector=RateDetector())
+
+
+def read_all(spec):
+    source = open_source(spec)
+    events = []
+    while not source.exhausted:
+        events.extend(source.read())
+    return events
+
+
+def stage_costs(model, spec, shards):
+    """Microseconds per event of each stage, each run alone in this process."""
+    costs = {}
+    start = time.perf_counter()
+    events = read_all(spec)
+    costs['source read'] = time.perf_counter() - start
+
+    inboxes = [Records() for _ in range(shards)]
+    start = time.perf_counter()
+    seq = 0
+    for first in range(0, len(events), 4096):
+        seq = route(events[first:first + 4096], seq, inboxes, {}, Counter(), threading.Event())
+    costs['reader routing'] = time.perf_counter() - start
+
+    engine = engine_for(model)
+    outboxes = []
+    start = time.perf_counter()
+    for inbox in inboxes:
+        outbox = Records()
+        for record in inbox.records:
+            seqs, batch = decode_events(record)
+            outbox.put([encode_verdicts(seqs, batch, engine.score_events(batch))])
+        outboxes.append(outbox)
+    costs['shard scoring'] = time.perf_counter() - start
+
+    detector = ShardedDetector(spec, model, shards)
+    start = time.perf_counter()
+    detector._merge(outboxes, [], Counter(), threading.Event(), None, lambda batch: None, None)
+    costs['merger'] = time.perf_counter() - start
+    return {stage: seconds / len(events) * 1e6 for stage, seconds in costs.items()}
+
+
+def in_process(model, spec):
+    """Events/s of the single-process path: read, then score in model-call-sized batches."""
+    engine = engine_for(model)
+    source = open_source(spec)
+    count = 0
+    start = time.perf_counter()
+    while not source.exhausted:
+        events = source.read()
+        for first in range(0, len(events), SHARD_BATCH_SIZE):
+            batch = events[first:first + SHARD_BATCH_SIZE]
+            engine.score_events([(event_message(e), e.SourceName, e.EventID, event_seconds(e)) for e in batch])
+        count += len(events)
+    return count / (time.perf_counter() - start)
+
+
+def sharded(model, spec, shards):
+    """(events/s from the first verdict to the last, seconds including startup)."""
+    first = []
+
+    def on_verdicts(batch):
+        if not first:
+            first.append((time.perf_counter(), len(batch.scores)))
+
+    detector = ShardedDetector(spec, model, shards)
+    start = time.perf_counter()
+    detector.run(on_verdicts)
+    end = time.perf_counter()
+    started, early = first[0]
+    return (detector.events - early) / max(end - started, 1e-9), end - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark sharded vs single-process detection.')
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    model, _ = load_current_model(fallback_path=MODEL_PATH)
+    spec = f'synthetic:{args.events}'
+    cpus = os.cpu_count() or 1
+    print(f"📊 {args.events} synthetic events, {cpus} CPU(s)")
+
+    costs = stage_costs(model, spec, max(args.shards))
+    print("--- Microseconds per event, each stage alone ---")
+    for stage, micros in costs.items():
+        print(f"  {stage:<16}: {micros:7.1f}")
+    reader = costs['source read'] + costs['reader routing']
+    shard, merger = costs['shard scoring'], costs['merger']
+
+    baseline = in_process(model, spec)
+    print(f"   single process      : {baseline:>9,.0f} events/s")
+    for shards in args.shards:
+        rate, seconds = sharded(model, spec, shards)
+        # Reader, merger and shards overlap; the slowest of them sets the pace once each has a core
+        ceiling = 1e6 / max(reader, merger, shard / shards)
+        note = '' if shards + 2 <= cpus else f"; needs {shards + 2} cores"
+        print(f"   {shards} shard(s)          : {rate:>9,.0f} events/s measured ({seconds:.1f}s with startup), "
+              f"{ceiling:,.0f} projected{note}")
+    print(f"   serial bound        : {1e6 / max(reader, merger):>9,.0f} events/s "
+          f"(reader {reader:.1f}us, merger {merger:.1f}us per event)")
@@ -0,0 +1,61 @@
+# src/bench_supervisor.py
+# Compares N single-channel processes (today's one-script-per-log setup)
+# with one supervisor process watching the same N channels: total RSS and
+# combined events/s, each channel replaying the anomaly log unpaced.
+#   python -m src.bench_supervisor --channels 4 --seconds 20
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in each child: replay `channels` copies of the log for `seconds`, report throughput and RSS
+CHILD = r"""
+import json, sys, tempfile, os
+from src.model_registry import MODEL_PATH, load_current_model
+from src.supervisor import Supervisor
+log, channels, seconds, workers = sys.argv[1], int(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4])
+model, version = load_current_model(fallback_path=MODEL_PATH)
+with tempfile.TemporaryDirectory() as tmp:
+    supervisor = Supervisor([f'replay:{log}'] * channels, model, version, workers=workers,
+                            dedup_file=os.path.join(tmp, 'dedup.json'), offsets_file=None,
+                            source_options={'speed': 0, 'loop': True}).start()
+    supervisor.wait(seconds, stats_interval=seconds * 2)
+    rss = 0
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+    supervisor.stop()
+events = sum(c['events'] for c in supervisor.stats()['channels'].values())
+print(json.dumps({'events': events, 'rss_kib': rss}))
+"""
+
+
+def run_children(log, procs, channels_each, seconds, workers):
+    children = [
+        subprocess.Popen([sys.executable, '-c', CHILD, log, str(channels_each), str(seconds), str(workers)],
+                         stdout=subprocess.PIPE, text=True)
+        for _ in range(procs)
+    ]
+    results = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+    events = sum(r['events'] for r in results)
+    rss = sum(r['rss_kib'] for r in results) / 1024
+    return events / seconds, rss
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark one supervisor against one process per channel.')
+    parser.add_argument('--log', default='live_anomalies.csv')
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=20)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    print(f"📊 {args.channels} replay channels, {args.seconds:.0f}s each run, {cpus} CPUs")
+    rate, rss = run_children(args.log, args.channels, 1, args.seconds, 1)
+    print(f"   {args.channels} processes x 1 channel : {rate:10.0f} events/s | total RSS {rss:7.1f} MiB")
+    shared_rate, shared_rss = run_children(args.log, 1, args.channels, args.seconds, cpus)
+    print(f"   1 supervisor x {args.channels} channels : {shared_rate:10.0f} events/s | total RSS {shared_rss:7.1f} MiB")
+    print(f"   memory saved: {rss / shared_rss:.1f}x")
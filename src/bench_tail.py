@@ -0,0 +1,78 @@
+# src/bench_tail.py
+# Measures how fast appended log lines can be ingested, comparing FileTailer
+# with the old reopen + readlines() handler. Run from the repo root:
+#   python -m src.bench_tail --mb 512
+
+import argparse
+import os
+import tempfile
+import time
+
+from src.log_monitor import FileTailer
+from src.synthetic_logs import generate_logs
+
+BLOCK_LINES = 20000
+
+
+def make_block():
+    lines = (f"{source} | ID: {event_id} | {message}" for _, source, event_id, message in generate_logs(BLOCK_LINES))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def legacy_read(filepath, last_pos):
+    """What LogFileHandler.on_modified used to do on every modify event."""
+    count = 0
+    with open(filepath, 'r') as f:
+        f.seek(last_pos)
+        new_lines = f.readlines()
+        for line in new_lines:
+            line.strip()
+            count += 1
+        return count, f.tell()
+
+
+def bench(filepath, block, total_bytes, reader):
+    """Appends `block` until `total_bytes` are written, reading after every append."""
+    written = lines = 0
+    elapsed = 0.0
+    with open(filepath, 'ab') as out:
+        while written < total_bytes:
+            out.write(block)
+            out.flush()
+            written += len(block)
+            start = time.perf_counter()
+            lines += reader()
+            elapsed += time.perf_counter() - start
+    return written, lines, elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark log file tailing throughput.')
+    parser.add_argument('--mb', type=int, default=512, help='MiB appended per run')
+    args = parser.parse_args()
+
+    block = make_block()
+    total = args.mb << 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tail.log')
+
+        open(path, 'wb').close()
+        tailer = FileTailer(path)
+        tail_bytes, tail_lines, tail_time = bench(
+            path, block, total, lambda: sum(len(batch) for batch in tailer.read_batches())
+        )
+        tailer.close()
+
+        open(path, 'wb').close()
+        position = [0]
+
+        def legacy():
+            count, position[0] = legacy_read(path, position[0])
+            return count
+
+        legacy_bytes, legacy_lines, legacy_time = bench(path, block, total, legacy)
+
+    print(f"📊 {tail_bytes / 2**20:.0f} MiB appended in {len(block) / 1024:.0f} KiB writes")
+    print(f"   FileTailer       : {tail_bytes / 2**20 / tail_time:8.0f} MiB/s {tail_lines / tail_time:12.0f} lines/s")
+    print(f"   reopen+readlines : {legacy_bytes / 2**20 / legacy_time:8.0f} MiB/s {legacy_lines / legacy_time:12.0f} lines/s")
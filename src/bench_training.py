@@ -0,0 +1,60 @@
+# src/bench_training.py
+# Records wall time and peak RSS of the in-memory and streaming trainers on
+# synthetic preprocessed datasets. Each run happens in a fresh process.
+#   python -m src.bench_training --rows 1000000 10000000
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from src.normalize import clean_message
+from src.synthetic_logs import generate_logs
+
+CHILD = r"""
+import json, resource, sys, time
+from src.model import train_anomaly_model_on_processed_data, train_streaming_model
+trainer = train_streaming_model if sys.argv[1] == 'streaming' else train_anomaly_model_on_processed_data
+start = time.perf_counter()
+trainer(processed_data_path=sys.argv[2], model_path=sys.argv[3], register=False)
+elapsed = time.perf_counter() - start
+peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'wall_s': elapsed, 'peak_rss_mib': peak_kib / 1024}))
+"""
+
+
+def write_dataset(path, rows):
+    """Writes a preprocessed_logs.csv-shaped file with `rows` synthetic rows."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Level', 'CleanedMessage'])
+        for level, _, _, message in generate_logs(rows):
+            writer.writerow([level, clean_message(message)])
+
+
+def run_trainer(mode, data_path, model_path):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, mode, data_path, model_path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark in-memory vs streaming training.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.joblib')
+        print(f"{'rows':>12} {'trainer':>10} {'wall s':>10} {'peak RSS MiB':>14}")
+        for rows in args.rows:
+            data_path = os.path.join(tmp, f'preprocessed_{rows}.csv')
+            write_dataset(data_path, rows)
+            for mode in ('in-memory', 'streaming'):
+                result = run_trainer(mode, data_path, model_path)
+                print(f"{rows:>12} {mode:>10} {result['wall_s']:>10.1f} {result['peak_rss_mib']:>14.0f}")
+            os.remove(data_path)
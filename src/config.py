@@ -0,0 +1,39 @@
+# src/config.py
+# Detection rules, checked before the model on every event. A rule that
+# matches decides the verdict on its own and the model is skipped.
+#
+#   name     : shows up in verdicts and per-rule stats
+#   kind     : 'keyword'  - case-insensitive substrings of the message
+#              'regex'    - case-insensitive regular expressions on the message
+#              'event_id' - EventIDs as Event Viewer shows them: both the rule's ids and
+#                           the event's are compared on their low 16 bits, so the
+#                           qualifier bits pywin32 reports (0xC0001B7A) don't matter
+#              'source'   - exact (case-insensitive) event source names
+#   patterns : list of keywords / regexes / ids / source names
+#   action   : 'alert' flags the event, 'ignore' clears it
+#
+# EventID and Source rules are checked first, then keywords, then regexes;
+# within a kind the first match in the message wins.
+#
+# Keywords are matched with an Aho-Corasick automaton when pyahocorasick is
+# installed (`pip install pyahocorasick`); without it one trie-shaped regex
+# does the same job, correctly but slower on large keyword lists. The
+# engine logs which one it uses.
+#
+# Dropping a JSON list of the same dicts at RULES_FILE replaces RULES
+# without touching the code.
+
+RULES_FILE = 'config/rules.json'
+
+RULES = [
+    {
+        'name': 'critical-keywords',
+        'kind': 'keyword',
+        'patterns': ['fatal', 'crash', 'failed', 'exception', 'unhandled', 'error'],
+        'action': 'alert',
+    },
+    # Examples:
+    # {'name': 'app-crash-ids', 'kind': 'event_id', 'patterns': [1000, 1001], 'action': 'alert'},
+    # {'name': 'test-source', 'kind': 'source', 'patterns': ['PythonTestEventSource'], 'action': 'alert'},
+    # {'name': 'dns-timeouts', 'kind': 'regex', 'patterns': [r'name .* timed out'], 'action': 'ignore'},
+]
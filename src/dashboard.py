@@ -1,112 +1,138 @@
-# src/main.py (Live Monitoring Version)
-import time
-import os
-import csv
-import re
-from joblib import load
-import win32evtlog
-
-# --- Configuration ---
-MODEL_PATH = 'models/anomaly_detector.joblib' 
-LIVE_ANOMALY_LOG_FILE = 'live_anomalies.csv'
-LOG_TO_WATCH = 'System'
-CRITICAL_KEYWORDS = r'fatal|crash|failed|exception|unhandled|error'
-
-# --- Global State ---
-model = None
-
-def clean_message(message):
-    """
-    Applies the same cleaning steps used for training data to live data.
-    """
-    if not isinstance(message, str):
-        return ""
-    # Convert to lowercase
-    cleaned = message.lower()
-    # Remove special characters, punctuation, and numbers
-    cleaned = re.sub(r'[^a-z\s]', '', cleaned)
-    # Remove extra whitespace
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned
-
-def process_event(event):
-    """
-    Processes a single event using the hybrid detection model.
-    """
-    full_message = ""
-    if event.StringInserts:
-        full_message = ' '.join(str(s).strip() for s in event.StringInserts)
-    
-    log_line = f"Source: {event.SourceName} | ID: {event.EventID} | Message: {full_message}"
-    
-    # Preprocess the message before prediction
-    cleaned_full_message = clean_message(full_message)
-    
-    # Get prediction from the model on the cleaned message
-    model_prediction = model.predict([cleaned_full_message])[0]
-    # Check for keywords in the original, uncleaned message
-    keyword_found = re.search(CRITICAL_KEYWORDS, full_message, re.IGNORECASE)
-
-    if model_prediction == -1 or keyword_found:
-        reason = "model detected anomaly" if model_prediction == -1 else f"keyword '{keyword_found.group(0)}' found"
-        print("\n🚨 ANOMALY DETECTED! 🚨")
-        print(f" -> Reason: {reason}.")
-        print(f" -> {log_line}\n")
-        save_anomaly_to_file(log_line, reason)
-
-def save_anomaly_to_file(log_data, reason):
-    """Appends a detected anomaly and the reason to the log CSV."""
-    file_exists = os.path.isfile(LIVE_ANOMALY_LOG_FILE)
-    with open(LIVE_ANOMALY_LOG_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['Timestamp', 'AnomalousLogMessage', 'DetectionReason'])
-        from datetime import datetime
-        writer.writerow([datetime.now().isoformat(), log_data, reason])
-
-def start_live_monitoring():
-    """
-    Continuously monitors the event log for new entries.
-    """
-    print(f"Initializing live monitoring of the '{LOG_TO_WATCH}' log...")
-    
-    try:
-        log_handle = win32evtlog.OpenEventLog(None, LOG_TO_WATCH)
-        last_total = win32evtlog.GetNumberOfEventLogRecords(log_handle)
-        win32evtlog.CloseEventLog(log_handle)
-        print(f"System log currently has {last_total} records. Monitoring for new ones.")
-    except Exception as e:
-        print(f"FATAL ERROR: Could not get initial record count: {e}")
-        return
-
-    while True:
-        try:
-            log_handle = win32evtlog.OpenEventLog(None, LOG_TO_WATCH)
-            current_total = win32evtlog.GetNumberOfEventLogRecords(log_handle)
-
-            if current_total > last_total:
-                print(f"  -> Found {current_total - last_total} new event(s). Analyzing...")
-                flags = win32evtlog.EVENTLOG_FORWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-                new_events = win32evtlog.ReadEventLog(log_handle, flags, last_total)
-                
-                for event in new_events:
-                    process_event(event)
-                
-                last_total = current_total
-            
-            win32evtlog.CloseEventLog(log_handle)
-            time.sleep(5) # Wait 5 seconds before checking again
-
-        except Exception as e:
-            print(f"ERROR during monitoring loop: {e}")
-            time.sleep(10) # Wait longer after an error
-
-if __name__ == '__main__':
-    try:
-        model = load(MODEL_PATH)
-        print("Model loaded successfully.")
-        start_live_monitoring()
-    except FileNotFoundError:
-        print(f"Error: Model file not found at {MODEL_PATH}. Please run src/model.py first.")
-    except KeyboardInterrupt:
-        print("\nMonitoring stopped by user.")
+# src/main.py (Live Monitoring Version)
+import argparse
+import time
+from datetime import datetime
+from joblib import load
+
+from src.aggregation import AGGREGATION_WINDOW, AnomalyAggregator
+from src.anomaly_sink import AnomalySink
+from src.event_sources import WindowsEventLogSource, event_message, open_source
+from src.flat_forest import to_flat_pipeline
+from src.rules import RuleEngine
+from src.scheduler import PollScheduler
+from src.scoring_engine import ScoringEngine
+from src.structured_log import AlertSummarizer, add_logging_arguments, configure_from_args, get_logger
+from src.template_miner import TemplateVerdictCache
+
+# --- Configuration ---
+MODEL_PATH = 'models/anomaly_detector.joblib' 
+LIVE_ANOMALY_LOG_FILE = 'live_anomalies_system.csv'  # Its own layout, so not main.py's file
+LIVE_ANOMALY_PARQUET_DIR = 'data/live_anomalies_system'
+LIVE_ANOMALY_DB = 'data/anomalies.db'
+ANOMALY_OUTPUT_FORMAT = 'csv'  # or 'parquet' (daily partitions, needs pyarrow) or 'sqlite' (indexed history the API serves)
+ANOMALY_COLUMNS = ['Timestamp', 'AnomalousLogMessage', 'DetectionReason', 'Count', 'LastSeen']
+LOG_TO_WATCH = 'System'
+MAX_DETECTION_LATENCY = 1.0  # Seconds a new event may wait before an idle reader polls again
+
+log = get_logger('dashboard')
+
+# --- Global State ---
+model = None
+engine = None
+sink = None
+alerts = None
+aggregator = None
+
+def process_event(event, future):
+    """
+    Reports a single event once the batched hybrid detection verdict is ready.
+    """
+    full_message = event_message(event)
+
+    # The engine checked the rules against the original, uncleaned message
+    # and only cleaned and scored it with the model if no rule decided
+    verdict = future.result()
+
+    if verdict.is_anomaly:
+        reason = "model detected anomaly" if verdict.rule is None else f"rule '{verdict.rule}' matched '{verdict.keyword}'"
+        alerts.report(event.SourceName, event.EventID, full_message, reason)
+        save_anomaly_to_file(event, full_message, reason)
+
+def save_anomaly_to_file(event, message, reason):
+    """Counts a detected anomaly; identical ones are collapsed per window before they are written."""
+    aggregator.add(event.SourceName, event.EventID, message, reason, datetime.now().isoformat())
+
+def write_anomaly_record(record):
+    """Queues one aggregated anomaly for the batched background writer."""
+    log_data = f"Source: {record.source} | ID: {record.event_id} | Message: {record.message}"
+    sink.write([record.first_seen, log_data, record.reason, record.count, record.last_seen])
+
+def start_live_monitoring(source=None):
+    """
+    Continuously monitors an event source (by default, new entries in the
+    Windows LOG_TO_WATCH log) for anomalies.
+    """
+    global engine, sink, alerts, aggregator
+    log.info(f"Initializing live monitoring of the '{LOG_TO_WATCH if source is None else source.name}' log...")
+    
+    try:
+        if source is None:
+            source = WindowsEventLogSource(LOG_TO_WATCH)
+            log.info(f"Newest {LOG_TO_WATCH} record is #{source.last_record}. Monitoring for new ones.")
+    except Exception as e:
+        log.critical(f"FATAL ERROR: Could not open the event log: {e}")
+        return
+
+    output_path = {'parquet': LIVE_ANOMALY_PARQUET_DIR, 'sqlite': LIVE_ANOMALY_DB}.get(
+        ANOMALY_OUTPUT_FORMAT, LIVE_ANOMALY_LOG_FILE
+    )
+    sink = AnomalySink(output_path, ANOMALY_COLUMNS, fmt=ANOMALY_OUTPUT_FORMAT)
+    alerts = AlertSummarizer()
+    aggregator = AnomalyAggregator(write_anomaly_record, AGGREGATION_WINDOW)
+    engine = ScoringEngine(
+        model, rules=RuleEngine.from_config(), template_cache=TemplateVerdictCache()
+    ).start()
+
+    scheduler = PollScheduler(MAX_DETECTION_LATENCY)
+    try:
+        while not source.exhausted:
+            try:
+                new_events = source.read()
+                alerts.flush_due()
+                aggregator.flush_due()
+
+                if new_events:
+                    log.debug(f"  -> Found {len(new_events)} new event(s). Analyzing...")
+                    # Submit everything first so the new events are scored as one batch
+                    pending = [
+                        (event, engine.submit(event_message(event), event.SourceName, event.EventID))
+                        for event in new_events
+                    ]
+                    for event, future in pending:
+                        process_event(event, future)
+
+                # No wait while events keep coming, growing waits while idle
+                scheduler.pause(len(new_events), source)
+
+            except Exception as e:
+                log.error(f"ERROR during monitoring loop: {e}")
+                time.sleep(scheduler.failed()) # Back off fully after an error
+    finally:
+        engine.stop()
+        alerts.flush()
+        aggregator.flush()
+        source.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Live anomaly dashboard monitor.')
+    parser.add_argument('--source', default=None,
+                        help="windows:<log>, file:<path>, replay:<csv> or synthetic:[count] "
+                             f"(default: new events in the Windows '{LOG_TO_WATCH}' log)")
+    parser.add_argument('--speed', type=float, default=None,
+                        help='replay speed as a multiple of real time; 0 = as fast as possible')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_from_args(args)
+    try:
+        model = to_flat_pipeline(load(MODEL_PATH))
+        log.info("Model loaded successfully.")
+        options = {} if args.speed is None else {'speed': args.speed}
+        start_live_monitoring(open_source(args.source, **options) if args.source else None)
+    except FileNotFoundError:
+        log.error(f"Error: Model file not found at {MODEL_PATH}. Please run src/model.py first.")
+    except KeyboardInterrupt:
+        log.info("Monitoring stopped by user.")
+    finally:
+        if sink is not None:
+            sink.close()
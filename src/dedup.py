@@ -0,0 +1,163 @@
+# src/dedup.py
+
+import base64
+import json
+import os
+import threading
+import time
+
+# --- Configuration ---
+DEDUP_WINDOW = 1 << 16  # Record numbers remembered below the high-water mark (8 KiB per channel)
+DEDUP_CHECKPOINT_FILE = 'data/dedup_checkpoint.json'
+CHECKPOINT_INTERVAL = 5.0
+
+
+class RecordWindow:
+    """
+    Remembers which record numbers of one channel were seen, in constant
+    memory: the highest record number so far plus a circular bitmap of the
+    `window` numbers just below it. Anything older than the window counts as
+    already seen, which is what a forward-reading log needs - re-reads and
+    small reorderings are caught, and the state never grows.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW, high=0, bitmap=None):
+        self.window = window
+        self.high = high
+        self._bits = bytearray(bitmap) if bitmap is not None else bytearray((window + 7) // 8)
+
+    def add(self, record):
+        """Marks `record` as seen. Returns True if it had not been seen before."""
+        window, bits = self.window, self._bits
+        if record > self.high:
+            if record - self.high >= window:
+                bits[:] = bytes(len(bits))
+            else:
+                # Slots between the old and new high-water mark now belong to unseen records
+                for skipped in range(self.high + 1, record):
+                    slot = skipped % window
+                    bits[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+            slot = record % window
+            bits[slot >> 3] |= 1 << (slot & 7)
+            self.high = record
+            return True
+        if record <= self.high - window:
+            return False
+        slot = record % window
+        mask = 1 << (slot & 7)
+        if bits[slot >> 3] & mask:
+            return False
+        bits[slot >> 3] |= mask
+        return True
+
+    def to_dict(self):
+        return {'high': self.high, 'window': self.window,
+                'bitmap': base64.b64encode(bytes(self._bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['window'], state['high'], base64.b64decode(state['bitmap']))
+
+
+class DedupStore:
+    """
+    One RecordWindow per log channel, checkpointed atomically to `path` so a
+    restart resumes exactly where the last run stopped. With path=None the
+    state lives in memory only.
+    """
+
+    def __init__(self, path=DEDUP_CHECKPOINT_FILE, window=DEDUP_WINDOW, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.window = window
+        self.checkpoint_interval = checkpoint_interval
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+        if path is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                self._channels = {name: RecordWindow.from_dict(state) for name, state in saved.items()}
+            except (FileNotFoundError, ValueError, KeyError):
+                self._channels = {}
+
+    def is_new(self, channel, record):
+        """Records `record` for `channel`; returns False for a duplicate."""
+        with self._lock:
+            window = self._channels.get(channel)
+            if window is None:
+                window = self._channels[channel] = RecordWindow(self.window)
+            return window.add(record)
+
+    def high_water(self, channel):
+        """Highest record number seen on `channel` (0 if none)."""
+        window = self._channels.get(channel)
+        return window.high if window is not None else 0
+
+    def reset(self, channel):
+        """Forgets a channel, e.g. after its log was cleared and numbering restarted."""
+        with self._lock:
+            self._channels.pop(channel, None)
+
+    def snapshot(self):
+        """The current state, for a later save(state)."""
+        with self._lock:
+            return {name: window.to_dict() for name, window in self._channels.items()}
+
+    def save(self, state=None):
+        """Checkpoints `state` (a snapshot()) or, by default, the current state."""
+        if self.path is None:
+            return
+        if state is None:
+            state = self.snapshot()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+    def save_due(self):
+        return time.monotonic() - self._last_save >= self.checkpoint_interval
+
+    def save_if_due(self):
+        """Checkpoints at most once per `checkpoint_interval` seconds."""
+        if self.save_due():
+            self.save()
+
+
+class DeferredCheckpoint:
+    """
+    Checkpoints a DedupStore only once what was reported before the snapshot
+    has left every downstream stage, so a crash can re-read events but never
+    skip anomalies still buffered in memory. `stages` are objects with
+    mark() and written_through(mark) (an AnomalyAggregator, then the
+    AnomalySink it emits into), checked in order: a stage's mark is taken
+    only after the stage before it has passed the snapshot on. Call poll()
+    on every loop; it never blocks.
+    """
+
+    def __init__(self, store, stages):
+        self.store = store
+        self.stages = list(stages)
+        self._pending = None  # (snapshot, stage index, that stage's mark)
+
+    def poll(self):
+        """Takes a snapshot when one is due and saves it once every stage has written through it."""
+        if self._pending is None:
+            if not self.store.save_due():
+                return False
+            self._pending = (self.store.snapshot(), 0, None)
+        state, stage, mark = self._pending
+        while stage < len(self.stages):
+            if mark is None:
+                mark = self.stages[stage].mark()
+            if not self.stages[stage].written_through(mark):
+                self._pending = (state, stage, mark)
+                return False
+            stage, mark = stage + 1, None
+        self.store.save(state)
+        self._pending = None
+        return True
@@ -0,0 +1,409 @@
+# src/event_sources.py
+
+import csv
+import itertools
+import os
+import re
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from src.synthetic_logs import generate_logs
+
+# --- Configuration ---
+READ_BATCH_SIZE = 1024
+IDLE_SLEEP = 1.0
+REPLAY_MAX_GAP = 60.0  # Longest recorded pause (seconds) a replay reproduces
+TIMESTAMP_FORMATS = ['%a %b %d %H:%M:%S %Y', '%m/%d/%Y %I:%M:%S %p', '%d-%m-%Y %H:%M:%S']
+
+# "Source: X | ID: Y | Message: Z", as printed by the monitors and saved by dashboard.py
+_LOG_LINE = re.compile(r'^Source: (.*?) \| ID: (-?\d+) \| Message: (.*)$', re.S)
+
+# Mirrors the attributes the monitors read from a pywin32 event record
+EventRecord = namedtuple(
+    'EventRecord',
+    ['RecordNumber', 'SourceName', 'EventID', 'TimeGenerated', 'StringInserts']
+)
+
+
+class EventTime(datetime):
+    """A datetime that also answers pywintypes' `Format()` call."""
+
+    def Format(self, fmt='%c'):
+        return self.strftime(fmt)
+
+
+def event_message(event):
+    """Builds the message string the detector scores from an event's inserts."""
+    if not event.StringInserts:
+        return ""
+    return ' '.join(str(s).strip() for s in event.StringInserts)
+
+
+def event_seconds(event):
+    """An event's TimeGenerated as a Unix timestamp (pywintypes times are datetimes too)."""
+    return event.TimeGenerated.timestamp()
+
+
+def synthetic_source(count, rate=None, seed=42, start_record=1):
+    """
+    Yields `count` synthetic EventRecords. With `rate` set (events/sec) the
+    generator paces itself, otherwise it produces events as fast as possible.
+    """
+    interval = 1.0 / rate if rate else 0.0
+    next_due = time.perf_counter()
+    for offset, (_, source, event_id, message) in enumerate(generate_logs(count, seed)):
+        if interval:
+            next_due += interval
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield EventRecord(
+            RecordNumber=start_record + offset,
+            SourceName=source,
+            EventID=event_id,
+            TimeGenerated=EventTime.now(),
+            StringInserts=(message,),
+        )
+
+
+def parse_log_line(line):
+    """Splits a formatted monitor line into (source, event_id, message), or None."""
+    match = _LOG_LINE.match(line)
+    if match is None:
+        return None
+    source, event_id, message = match.groups()
+    return source, int(event_id), message
+
+
+def parse_timestamp(text):
+    """Parses the timestamp formats found in saved and exported logs; None if unknown."""
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def read_replay_rows(path, encoding='utf-8'):
+    """
+    Yields (timestamp, source, event_id, message) from every CSV layout the
+    project writes or reads: both live_anomalies.csv layouts (with or without
+    the aggregation Count/LastSeen columns) and Event Viewer exports. An
+    aggregated row is yielded once, as its first occurrence. Header and
+    malformed rows are skipped.
+    """
+    with open(path, newline='', encoding=encoding, errors='replace') as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            if row[1].startswith('Source: '):
+                # dashboard.py layout: Timestamp, "Source: .. | ID: .. | Message: ..", Reason[, Count, LastSeen]
+                parsed = parse_log_line(row[1])
+                if parsed is None:
+                    continue
+                stamp, (source, event_id, message) = row[0], parsed
+            elif len(row) >= 6 and not row[2].lstrip('-').isdigit():
+                # Event Viewer export: Level, DateTime, Source, EventID, TaskCategory, Message
+                stamp, source, event_id, message = row[1], row[2], row[3], row[5]
+            elif len(row) >= 4:
+                # main.py layout: Timestamp, Source, EventID, Message[, Reason, Count, LastSeen]
+                stamp, source, event_id, message = row[:4]
+            else:
+                continue
+            try:
+                event_id = int(event_id)  # pywin32 ids can be negative (qualifier bits set)
+            except ValueError:
+                continue  # Header row
+            yield parse_timestamp(stamp), source, event_id, message
+
+
+class EventSource:
+    """
+    A stream of event records (RecordNumber, SourceName, EventID,
+    TimeGenerated, StringInserts) - pywin32 records or EventRecords.
+    `read()` never blocks: it returns what is available now, possibly nothing.
+    Finite sources set `exhausted` once they have nothing left to give.
+    """
+    name = 'events'
+    exhausted = False
+    idle_sleep = IDLE_SLEEP
+
+    def read(self, max_events=READ_BATCH_SIZE):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        while True:
+            events = self.read()
+            if events:
+                yield from events
+            elif self.exhausted:
+                return
+            else:
+                time.sleep(self.idle_sleep)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WindowsEventLogSource(EventSource):
+    """
+    Reads a Windows event log forwards with one handle kept open. By default
+    only events written after the source is opened are returned; with
+    `after_record` (a checkpointed high-water mark) reading resumes just past
+    it while that record is still in the log. `clears` counts the times the
+    record numbering restarted because the log was cleared.
+    """
+    FILE_CHANGED = 1503  # ERROR_EVENTLOG_FILE_CHANGED: the log was cleared
+
+    def __init__(self, log_type='Application', server=None, from_start=False, after_record=None):
+        import win32evtlog  # Windows only; every other source runs anywhere
+        self._win32evtlog = win32evtlog
+        self.name = log_type
+        self.log_type = log_type
+        self.server = server
+        self.last_record = 0
+        self.clears = 0
+        self._pending = deque()
+        self._handle = None
+        self._open(from_start, after_record)
+
+    def _open(self, from_start, after_record=None):
+        evt = self._win32evtlog
+        self._handle = evt.OpenEventLog(self.server, self.log_type)
+        total = evt.GetNumberOfEventLogRecords(self._handle)
+        if not total:
+            return
+        oldest = evt.GetOldestEventLogRecord(self._handle)
+        newest = oldest + total - 1
+        if after_record is not None and after_record > newest:
+            self.clears += 1  # Numbering restarted since the checkpoint
+        if after_record is not None and oldest <= after_record <= newest:
+            start = after_record
+        elif from_start or after_record is not None:
+            return
+        else:
+            start = newest
+        self.last_record = start
+        # A seek read returns a buffer of records from `start` on and leaves the
+        # handle past that buffer, so everything in it after `start` is new
+        chunk = evt.ReadEventLog(self._handle, evt.EVENTLOG_SEEK_READ | evt.EVENTLOG_FORWARDS_READ, start)
+        self._pending.extend(event for event in chunk or () if event.RecordNumber > start)
+        if self._pending:
+            self.last_record = self._pending[-1].RecordNumber
+
+    def read(self, max_events=READ_BATCH_SIZE):
+        evt = self._win32evtlog
+        flags = evt.EVENTLOG_SEQUENTIAL_READ | evt.EVENTLOG_FORWARDS_READ
+        while len(self._pending) < max_events:
+            try:
+                chunk = evt.ReadEventLog(self._handle, flags, 0)
+            except Exception as e:
+                if getattr(e, 'winerror', None) != self.FILE_CHANGED:
+                    raise
+                # Cleared under us: reopen and start again from the (new) oldest record
+                evt.CloseEventLog(self._handle)
+                self.last_record = 0
+                self.clears += 1
+                self._open(from_start=True)
+                continue
+            if not chunk:
+                break
+            self._pending.extend(event for event in chunk if event.RecordNumber > self.last_record)
+            if self._pending:
+                self.last_record = self._pending[-1].RecordNumber
+        count = min(max_events, len(self._pending))
+        return [self._pending.popleft() for _ in range(count)]
+
+    def close(self):
+        if self._handle is not None:
+            self._win32evtlog.CloseEventLog(self._handle)
+            self._handle = None
+
+
+class FileTailSource(EventSource):
+    """
+    Tails a text log file (rotation and truncation aware, see FileTailer).
+    Each line becomes one record; "Source: .. | ID: .. | Message: .." lines
+    keep their source and event id, anything else is attributed to the file.
+    With an OffsetStore the source resumes from the saved offset and records
+    its position whenever every line read so far has been handed out.
+    """
+
+    def __init__(self, filepath, from_start=False, encoding='utf-8', offsets=None):
+        from src.log_monitor import FileTailer  # Keeps watchdog optional for other sources
+        offset, inode = 0, None
+        if offsets is not None:
+            offset, inode = offsets.get(os.path.abspath(filepath))
+        if inode is None and not from_start and os.path.exists(filepath):
+            stat = os.stat(filepath)
+            offset, inode = stat.st_size, (stat.st_dev, stat.st_ino)
+        self.name = os.path.basename(filepath)
+        self._tailer = FileTailer(filepath, offset=offset, inode=inode, encoding=encoding)
+        self._offsets = offsets
+        self._pending = deque()
+        self._records = 0
+
+    @property
+    def offset(self):
+        return self._tailer.offset
+
+    def read(self, max_events=READ_BATCH_SIZE):
+        if not self._pending:
+            for batch in self._tailer.read_batches():
+                self._pending.extend(line for line in batch if line.strip())
+        count = min(max_events, len(self._pending))
+        now = EventTime.now()
+        events = []
+        for _ in range(count):
+            line = self._pending.popleft().strip()
+            parsed = parse_log_line(line)
+            source, event_id, message = parsed if parsed else (self.name, 0, line)
+            self._records += 1
+            events.append(EventRecord(self._records, source, event_id, now, (message,)))
+        if self._offsets is not None and not self._pending:
+            self._offsets.update(self._tailer)
+        return events
+
+    def close(self):
+        self._tailer.close()
+
+
+class ReplaySource(EventSource):
+    """
+    Replays a saved anomaly log or an Event Viewer export (see
+    read_replay_rows) as live events. `speed` is a multiple of real time:
+    recorded gaps are divided by it (and capped at REPLAY_MAX_GAP first);
+    speed=0 replays as fast as the consumer reads. With `loop` the file
+    repeats forever with ever-increasing record numbers.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False, encoding='utf-8', start_record=1):
+        rows = list(read_replay_rows(path, encoding))
+        if not rows:
+            raise ValueError(f"No replayable events in {path}")
+        self.name = os.path.basename(path)
+        self.speed = speed
+        self.loop = loop
+        self._rows = [(source, event_id, (message,)) for _, source, event_id, message in rows]
+        # Replay offset of each row in recorded seconds, gaps clamped to [0, REPLAY_MAX_GAP]
+        self._offsets, elapsed, previous = [], 0.0, None
+        for stamp, *_ in rows:
+            if stamp is not None and previous is not None:
+                elapsed += min(max((stamp - previous).total_seconds(), 0.0), REPLAY_MAX_GAP)
+            previous = stamp or previous
+            self._offsets.append(elapsed)
+        self._cycle_length = elapsed + (self._offsets[1] if len(rows) > 1 else 0.0)
+        self._next = 0
+        self._record = start_record
+        self._started = None
+
+    def _due(self, index):
+        cycle, position = divmod(index, len(self._rows))
+        return cycle * self._cycle_length + self._offsets[position]
+
+    @property
+    def idle_sleep(self):
+        if not self.speed or self._started is None:
+            return 0.0
+        wait = self._due(self._next) / self.speed - (time.perf_counter() - self._started)
+        return min(max(wait, 0.0), IDLE_SLEEP)
+
+    def read(self, max_events=READ_BATCH_SIZE):
+        if self.exhausted:
+            return []
+        if self._started is None:
+            self._started = time.perf_counter()
+        limit = self._next + max_events
+        if not self.loop:
+            limit = min(limit, len(self._rows))
+        if self.speed:
+            replayed = (time.perf_counter() - self._started) * self.speed
+            end = self._next
+            while end < limit and self._due(end) <= replayed:
+                end += 1
+        else:
+            end = limit
+
+        now = EventTime.now()
+        n_rows = len(self._rows)
+        events = []
+        for index in range(self._next, end):
+            source, event_id, inserts = self._rows[index % n_rows]
+            events.append(EventRecord(self._record, source, event_id, now, inserts))
+            self._record += 1
+        self._next = end
+        if not self.loop and self._next >= n_rows:
+            self.exhausted = True
+        return events
+
+
+class SyntheticSource(EventSource):
+    """Generated Windows-like events (see synthetic_logs), optionally paced at `rate`/sec."""
+    name = 'synthetic'
+
+    def __init__(self, count=None, rate=None, seed=42, start_record=1):
+        self.rate = rate
+        self._logs = generate_logs(count, seed) if count is not None else self._endless(seed)
+        self._record = start_record
+        self._produced = 0
+        self._started = None
+
+    @staticmethod
+    def _endless(seed):
+        for block in itertools.count():
+            yield from generate_logs(1000000, seed + block)
+
+    @property
+    def idle_sleep(self):
+        return min(1.0 / self.rate, IDLE_SLEEP) if self.rate else 0.0
+
+    def read(self, max_events=READ_BATCH_SIZE):
+        if self.exhausted:
+            return []
+        if self._started is None:
+            self._started = time.perf_counter()
+        count = max_events
+        if self.rate:
+            count = min(count, int((time.perf_counter() - self._started) * self.rate) - self._produced)
+        now = EventTime.now()
+        events = [
+            EventRecord(self._record + offset, source, event_id, now, (message,))
+            for offset, (_, source, event_id, message) in enumerate(itertools.islice(self._logs, max(count, 0)))
+        ]
+        if len(events) < count:
+            self.exhausted = True
+        self._record += len(events)
+        self._produced += len(events)
+        return events
+
+
+def open_source(spec, **options):
+    """
+    Builds a source from a "kind:target" spec, e.g. "windows:System",
+    "file:data/raw_logs/app.log", "replay:live_anomalies.csv" or
+    "synthetic:" (target = event count, empty for endless). Extra keyword
+    options go to the source's constructor.
+    """
+    kind, _, target = spec.partition(':')
+    if kind == 'windows':
+        return WindowsEventLogSource(target or 'Application', **options)
+    if kind == 'file':
+        return FileTailSource(target, **options)
+    if kind == 'replay':
+        return ReplaySource(target or 'live_anomalies.csv', **options)
+    if kind == 'synthetic':
+        return SyntheticSource(int(target) if target else None, **options)
+    raise ValueError(f"Unknown event source '{spec}' (expected windows:, file:, replay: or synthetic:)")
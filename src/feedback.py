@@ -0,0 +1,202 @@
+# src/feedback.py
+# Analyst corrections for the detector, kept in an append-only store that
+# src/retrain.py folds into the model incrementally.
+#   python -m src.feedback add "A fatal crash has occurred." --label 1 --source PythonTestEventSource --event-id 777
+#   python -m src.feedback import data/raw_logs/labeled_application_logs.csv
+#   python -m src.feedback stats
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from src.normalize import clean_message
+
+# --- Configuration ---
+FEEDBACK_DIR = 'data/feedback'
+DATA_FILE = 'feedback.csv'
+INDEX_FILE = 'feedback.idx'
+IMPORT_BATCH_SIZE = 10000
+COLUMNS = ['Added', 'Level', 'Source', 'EventID', 'Message', 'is_crash']
+
+# One fixed-width index record per row: where it starts in the data file, its
+# dedup key (source, event id and cleaned message) and its label
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('key', '<u8'), ('label', 'u1')])
+
+# seq is the row's position in the store, 0-based and never reused
+Feedback = namedtuple('Feedback', ['seq', 'added', 'level', 'source', 'event_id', 'message', 'is_crash'])
+
+
+def feedback_key(source, event_id, message):
+    """Stable 64-bit key of a correction: same event text from the same Source/EventID."""
+    text = f"{source or ''}\x1f{event_id if event_id is not None else ''}\x1f{clean_message(message)}"
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class FeedbackStore:
+    """
+    Append-only store of labeled corrections: rows go to a CSV data file and
+    a binary index (see INDEX_DTYPE) records each row's offset, key and
+    label, so opening the store reads only the index and a reader can seek
+    straight to the rows after a given seq.
+
+    add() takes a batch and writes it with one append per file. A correction
+    whose key already has the same label is a duplicate and is skipped; a
+    different label is appended and supersedes the earlier one. Data is
+    flushed before the index, so a crash mid-batch leaves at most unindexed
+    bytes that readers never see. One writing process at a time.
+    """
+
+    def __init__(self, directory=FEEDBACK_DIR):
+        self.directory = directory
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        index = self._read_index()
+        self._rows = len(index)
+        self._labels = dict(zip(index['key'].tolist(), index['label'].tolist()))  # Latest label wins
+
+    def _read_index(self):
+        try:
+            index = np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        # Ignore a torn trailing record
+        return index[:os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize]
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, corrections):
+        """
+        Appends a batch of corrections: dicts with Message and is_crash, plus
+        optional Level, Source and EventID. Returns (added, duplicates).
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            rows, keys, labels = [], [], []
+            batch = {}
+            for correction in corrections:
+                label = int(correction['is_crash'])
+                if label not in (0, 1):
+                    raise ValueError(f"is_crash must be 0 or 1, got {correction['is_crash']!r}")
+                source, event_id = correction.get('Source'), correction.get('EventID')
+                key = feedback_key(source, event_id, correction['Message'])
+                if batch.get(key, self._labels.get(key)) == label:
+                    continue
+                batch[key] = label
+                rows.append([now, correction.get('Level') or '', source or '', '' if event_id is None else event_id,
+                             correction['Message'], label])
+                keys.append(key)
+                labels.append(label)
+            if not rows:
+                return 0, len(corrections)
+
+            os.makedirs(self.directory, exist_ok=True)
+            offsets = []
+            with open(self.data_path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_csv_line(COLUMNS))
+                lines = [_csv_line(row) for row in rows]
+                start = f.tell()
+                for line in lines:
+                    offsets.append(start)
+                    start += len(line)
+                f.write(b''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+            index = np.zeros(len(rows), dtype=INDEX_DTYPE)
+            index['offset'], index['key'], index['label'] = offsets, keys, labels
+            with open(self.index_path, 'ab') as f:
+                f.write(index.tobytes())
+            self._rows += len(rows)
+            self._labels.update(batch)
+            return len(rows), len(corrections) - len(rows)
+
+    def read(self, since=0):
+        """Yields the Feedback rows with seq >= `since`, in order."""
+        index = self._read_index()
+        if since >= len(index):
+            return
+        with open(self.data_path, 'rb') as f:
+            f.seek(int(index['offset'][since]))
+            reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline=''))
+            for seq, row in zip(range(since, len(index)), reader):
+                added, level, source, event_id, message, label = row
+                yield Feedback(seq, added, level, source or None, int(event_id) if event_id else None,
+                               message, int(label))
+
+    def stats(self):
+        labels = list(self._labels.values())
+        return {'rows': self._rows, 'distinct': len(labels), 'crash': sum(labels),
+                'normal': len(labels) - sum(labels)}
+
+
+def _csv_line(row):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+
+def read_corrections(path, encoding='utf-8'):
+    """Reads a labeled CSV (this store's columns or labeled_application_logs.csv's) as correction dicts."""
+    with open(path, 'r', newline='', encoding=encoding, errors='replace') as f:
+        for row in csv.DictReader(f):
+            if not row.get('Message') or row.get('is_crash') in (None, ''):
+                continue
+            event_id = row.get('EventID') or row.get('Event ID')
+            yield {
+                'Level': row.get('Level'),
+                'Source': row.get('Source') or None,
+                'EventID': int(event_id) if event_id and event_id.lstrip('-').isdigit() else None,
+                'Message': row['Message'],
+                'is_crash': int(row['is_crash']),
+            }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record analyst corrections for retraining.')
+    parser.add_argument('--store', default=FEEDBACK_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='record one correction')
+    add.add_argument('message')
+    add.add_argument('--label', type=int, choices=[0, 1], required=True, help='1 = crash/anomaly, 0 = normal')
+    add.add_argument('--source', default=None)
+    add.add_argument('--event-id', type=int, default=None)
+    add.add_argument('--level', default=None)
+    imports = commands.add_parser('import', help='record every labeled row of a CSV')
+    imports.add_argument('path')
+    imports.add_argument('--encoding', default='utf-8')
+    commands.add_parser('stats', help='summarize the store')
+    args = parser.parse_args()
+
+    store = FeedbackStore(args.store)
+    if args.command == 'add':
+        added, duplicates = store.add([{'Level': args.level, 'Source': args.source, 'EventID': args.event_id,
+                                        'Message': args.message, 'is_crash': args.label}])
+        print("✅ Correction recorded." if added else "ℹ️ Already recorded with that label.")
+    elif args.command == 'import':
+        added = duplicates = 0
+        batch = []
+        for correction in read_corrections(args.path, args.encoding):
+            batch.append(correction)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                counts = store.add(batch)
+                added, duplicates, batch = added + counts[0], duplicates + counts[1], []
+        if batch:
+            counts = store.add(batch)
+            added, duplicates = added + counts[0], duplicates + counts[1]
+        print(f"✅ {added} corrections recorded, {duplicates} duplicates skipped.")
+    else:
+        stats = store.stats()
+        print(f"📊 {stats['rows']} rows, {stats['distinct']} distinct corrections "
+              f"({stats['crash']} crash, {stats['normal']} normal)")
+    if args.command != 'stats':
+        print("ℹ️ Run `python -m src.retrain` to fold new feedback into the model.")
@@ -0,0 +1,209 @@
+# src/flat_forest.py
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator
+from sklearn.ensemble import IsolationForest
+from sklearn.pipeline import Pipeline
+
+# --- Configuration ---
+CHUNK_ROWS = 4096  # Rows scored per pass; bounds the (rows x trees) leaf array
+
+
+def average_path_length(n_samples):
+    """IsolationForest's expected path length for leaves holding `n_samples` (same float ops as sklearn)."""
+    n_samples = np.asarray(n_samples)
+    shape = n_samples.shape
+    n_samples = n_samples.reshape((1, -1))
+    lengths = np.zeros(n_samples.shape)
+    mask_1 = n_samples <= 1
+    mask_2 = n_samples == 2
+    rest = ~np.logical_or(mask_1, mask_2)
+    lengths[mask_2] = 1.0
+    lengths[rest] = 2.0 * (np.log(n_samples[rest] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[rest] - 1.0) / n_samples[rest]
+    return lengths.reshape(shape)
+
+
+class FlatIsolationForest(BaseEstimator):
+    """
+    Drop-in replacement for a fitted IsolationForest whose trees are
+    concatenated into flat node arrays (input feature, threshold, children,
+    and per node the path length a sample ending there contributes). Scores
+    a CSR batch for all trees at once without joblib's per-tree dispatch,
+    which is most of sklearn's cost on the engine's small batches.
+
+    Scoring is sparse-aware: a zero feature always takes the same branch,
+    so every tree has one "zero path" shared by all rows, and a row can only
+    leave it at a node splitting on one of its few non-zero features. Only
+    those (row, tree) pairs are walked node by node. Leaf values are summed
+    tree by tree in the fitted order, so scores equal the source forest's
+    bit for bit.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_value, roots, n_features, denominator, offset):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.n_features = n_features
+        self.denominator = denominator
+        self.offset = offset
+
+    @classmethod
+    def from_forest(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        start = 0
+        for tree, tree_features in zip(forest.estimators_, forest.estimators_features_):
+            nodes = tree.tree_
+            count = nodes.node_count
+            leaf = nodes.children_left == -1
+            local = np.arange(count)
+
+            feature = nodes.feature.astype(np.intp)
+            # Trees fitted on a feature subsample index into it; map back to input columns
+            if len(tree_features) != forest.n_features_in_:
+                feature[~leaf] = np.asarray(tree_features)[feature[~leaf]]
+            depth = np.ones(count, dtype=np.int64)
+            for node in np.flatnonzero(~leaf):  # Children always come after their parent
+                depth[nodes.children_left[node]] = depth[nodes.children_right[node]] = depth[node] + 1
+
+            features.append(np.where(leaf, 0, feature))
+            thresholds.append(np.where(leaf, np.inf, nodes.threshold))
+            lefts.append(np.where(leaf, local, nodes.children_left) + start)
+            rights.append(np.where(leaf, local, nodes.children_right) + start)
+            values.append(depth + average_path_length(nodes.n_node_samples) - 1.0)
+            roots.append(start)
+            start += count
+
+        return cls(
+            np.concatenate(features).astype(np.int32),
+            np.concatenate(thresholds),
+            np.concatenate(lefts).astype(np.int32),
+            np.concatenate(rights).astype(np.int32),
+            np.concatenate(values),
+            np.array(roots, dtype=np.int32),
+            forest.n_features_in_,
+            len(forest.estimators_) * average_path_length([forest.max_samples_]),
+            forest.offset_,
+        )
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def _zero_paths(self):
+        """Per tree the leaf an all-zero row reaches, and the nodes on that path indexed by feature."""
+        paths = getattr(self, '_zero_path_index', None)
+        if paths is None:
+            zero_child = np.where(0 <= self.threshold, self.left, self.right)
+            zero_leaf = np.empty(len(self.roots), dtype=np.int32)
+            on_path = []  # (feature, tree, depth, node)
+            for tree, node in enumerate(self.roots):
+                depth = 0
+                while self.left[node] != node:
+                    on_path.append((self.feature[node], tree, depth, node))
+                    node = zero_child[node]
+                    depth += 1
+                zero_leaf[tree] = node
+            on_path = np.array(sorted(on_path), dtype=np.int64).reshape(-1, 4)
+            pointer = np.searchsorted(on_path[:, 0], np.arange(self.n_features + 1))
+            paths = (zero_leaf, pointer, on_path[:, 1], on_path[:, 2], on_path[:, 3])
+            self._zero_path_index = paths
+        return paths
+
+    def _leaves(self, X):
+        """The (rows x trees) leaf each row reaches in each tree."""
+        zero_leaf, pointer, path_tree, path_depth, path_node = self._zero_paths()
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        leaves = np.tile(zero_leaf, (n_rows, 1))
+
+        # Every (non-zero entry, zero-path node on the same feature) pair
+        entry_row = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+        starts = pointer[X.indices]
+        counts = pointer[X.indices + 1] - starts
+        total = counts.sum()
+        if not total:
+            return leaves
+        entry = np.repeat(np.arange(len(counts)), counts)
+        position = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        node = path_node[position]
+        value = X.data[entry]
+        threshold = self.threshold[node]
+        leaves_path = (value <= threshold) != (0 <= threshold)
+        if not leaves_path.any():
+            return leaves
+
+        # Each (row, tree) leaves its zero path at the shallowest such node
+        row = entry_row[entry[leaves_path]]
+        pair = row * n_trees + path_tree[position[leaves_path]]
+        node = node[leaves_path]
+        order = np.lexsort((path_depth[position[leaves_path]], pair))
+        first = order[np.r_[True, pair[order][1:] != pair[order][:-1]]]
+        node = node[first]
+        start = np.where(value[leaves_path][first] <= self.threshold[node], self.left[node], self.right[node])
+        leaves.ravel()[pair[first]] = self._descend(X, row[first], start)
+        return leaves
+
+    def _descend(self, X, rows, nodes):
+        """Walks each (row, node) down to its leaf, looking values up in the CSR batch."""
+        keys = np.repeat(np.arange(X.shape[0], dtype=np.int64) * self.n_features, np.diff(X.indptr)) + X.indices
+        nodes = nodes.copy()
+        active = np.flatnonzero(self.left[nodes] != nodes)
+        while active.size:
+            node = nodes[active]
+            wanted = rows[active] * self.n_features + self.feature[node]
+            found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+            value = np.where(keys[found] == wanted, X.data[found], np.float32(0))
+            node = np.where(value <= self.threshold[node], self.left[node], self.right[node])
+            nodes[active] = node
+            active = active[self.left[node] != node]
+        return nodes
+
+    def _as_csr(self, X):
+        # Same input dtype as sklearn's trees: split values are compared as float32
+        X = sp.csr_matrix(X, dtype=np.float32, copy=not sp.issparse(X) or X.dtype == np.float32)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but FlatIsolationForest is expecting {self.n_features}")
+        X.sum_duplicates()
+        X.sort_indices()
+        return X
+
+    def score_samples(self, X):
+        X = self._as_csr(X)
+        depths = np.zeros(X.shape[0])
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaf_values = self.leaf_value[self._leaves(X[start:start + CHUNK_ROWS])]
+            # Running sum across trees in the fitted order, the order sklearn adds them in
+            depths[start:start + CHUNK_ROWS] = np.cumsum(leaf_values, axis=1)[:, -1] if leaf_values.size else 0.0
+        scores = 2 ** (-np.divide(depths, self.denominator, out=np.ones_like(depths), where=self.denominator != 0))
+        return -scores
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X):
+        is_inlier = np.ones(X.shape[0], dtype=int)
+        is_inlier[self.decision_function(X) < 0] = -1
+        return is_inlier
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_zero_path_index', None)  # Rebuilt on first use
+        return state
+
+
+def to_flat_pipeline(pipeline):
+    """Returns a copy of a fitted pipeline with its IsolationForest replaced by a FlatIsolationForest."""
+    if isinstance(pipeline, IsolationForest):
+        return FlatIsolationForest.from_forest(pipeline)
+    if not hasattr(pipeline, 'steps'):
+        return pipeline
+    steps = [
+        (name, FlatIsolationForest.from_forest(step) if isinstance(step, IsolationForest) else step)
+        for name, step in pipeline.steps
+    ]
+    return Pipeline(steps)
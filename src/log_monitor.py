@@ -1,47 +1,218 @@
-import time
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-
-class LogFileHandler(FileSystemEventHandler):
-    """Handles new data written to a monitored log file."""
-    def __init__(self, filepath, callback):
-        self.filepath = filepath
-        self.callback = callback
-        self.last_pos = 0 # Start reading from the beginning
-
-    def on_modified(self, event):
-        if event.src_path == self.filepath:
-            with open(self.filepath, 'r') as f:
-                f.seek(self.last_pos) # Go to where we left off
-                new_lines = f.readlines()
-                if new_lines:
-                    for line in new_lines:
-                        self.callback(line.strip())
-                    self.last_pos = f.tell() # Update our position
-
-def start_monitoring(filepath, callback):
-    """Starts monitoring a file for changes."""
-    event_handler = LogFileHandler(filepath, callback)
-    observer = Observer()
-    # Schedule monitoring the directory containing the file
-    observer.schedule(event_handler, path='.', recursive=False)
-    observer.start()
-    print(f"Monitoring '{filepath}' for new logs...")
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
-
-if __name__ == '__main__':
-    # Example usage: print new lines to the console
-    def print_new_log(log_line):
-        print(f"NEW LOG DETECTED: {log_line}")
-
-    # Create a dummy log file to monitor
-    log_file_path = "data/raw_logs/app.log"
-    with open(log_file_path, "w") as f:
-        f.write("Initial log entry.\n")
-    
-    start_monitoring(log_file_path, print_new_log)
\ No newline at end of file
+import json
+import os
+import threading
+import time
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+# --- Configuration ---
+CHUNK_SIZE = 1 << 20  # Read appended data in 1 MiB blocks
+OFFSETS_FILE = 'data/tail_offsets.json'
+CHECKPOINT_INTERVAL = 1.0
+
+class FileTailer:
+    """
+    Follows one file like `tail -F`: keeps the descriptor open, reads appended
+    data in large chunks, and copes with logrotate (new inode) and truncation.
+    """
+    def __init__(self, filepath, offset=0, inode=None, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+        self.filepath = os.path.abspath(filepath)
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self._file = None
+        self._inode = inode
+        self._offset = offset  # Byte offset of the end of the last complete line
+        self._partial = b''
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @property
+    def inode(self):
+        return self._inode
+
+    def _open(self):
+        try:
+            f = open(self.filepath, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(f.fileno())
+        inode = (stat.st_dev, stat.st_ino)
+        # A saved offset only applies to the same file, and only if it wasn't truncated since
+        if inode != self._inode or self._offset > stat.st_size:
+            self._offset = 0
+        f.seek(self._offset)
+        self._file, self._inode, self._partial = f, inode, b''
+        return True
+
+    def _rotated(self):
+        """Returns True if the path now points at a different or truncated file."""
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return False  # Rotated away but not recreated yet: keep draining the old file
+        if (stat.st_dev, stat.st_ino) != self._inode:
+            return True
+        if stat.st_size < self._offset + len(self._partial):
+            # copytruncate-style rotation: start over from the top of the same file
+            self._offset = 0
+            self._file.seek(0)
+            self._partial = b''
+        return False
+
+    def read_batches(self):
+        """Yields lists of newly completed lines, one list per chunk read."""
+        if self._file is None and not self._open():
+            return
+        if self._rotated():
+            # Finish whatever was written to the old file, then switch over
+            yield from self._drain(final=True)
+            self._file.close()
+            self._file, self._offset = None, 0
+            if not self._open():
+                return
+        yield from self._drain()
+
+    def read_lines(self):
+        """Yields newly completed lines one at a time."""
+        for batch in self.read_batches():
+            yield from batch
+
+    def _drain(self, final=False):
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                break
+            data = self._partial + chunk
+            end = data.rfind(b'\n')
+            if end < 0:
+                self._partial = data
+                continue
+            self._partial = data[end + 1:]
+            self._offset += end + 1
+            yield data[:end].decode(self.encoding, errors='replace').split('\n')
+        if final and self._partial:
+            # The last line of a rotated-away file is complete by definition
+            self._offset += len(self._partial)
+            yield [self._partial.decode(self.encoding, errors='replace')]
+            self._partial = b''
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class OffsetStore:
+    """Persists per-file (inode, offset) pairs so restarts resume where they stopped."""
+    def __init__(self, path=OFFSETS_FILE):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._offsets = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._offsets = {}
+
+    def get(self, filepath):
+        entry = self._offsets.get(filepath)
+        if not entry:
+            return 0, None
+        return entry['offset'], tuple(entry['inode'])
+
+    def update(self, tailer):
+        if tailer.inode is not None:
+            self._offsets[tailer.filepath] = {'inode': list(tailer.inode), 'offset': tailer.offset}
+
+    def snapshot(self):
+        """The current offsets, for a later save(state)."""
+        return dict(self._offsets)
+
+    def save(self, state=None):
+        """Persists `state` (a snapshot()) or, by default, the current offsets."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._offsets if state is None else state, f)
+        os.replace(tmp_path, self.path)
+
+class LogFileHandler(FileSystemEventHandler):
+    """Handles new data written to any of the monitored log files."""
+    def __init__(self, filepaths, callback, offsets=None):
+        self.callback = callback
+        self.offsets = offsets
+        self.tailers = {}
+        for filepath in filepaths:
+            filepath = os.path.abspath(filepath)
+            offset, inode = offsets.get(filepath) if offsets else (0, None)
+            self.tailers[filepath] = FileTailer(filepath, offset=offset, inode=inode)
+        self._lock = threading.Lock()
+
+    def _dispatch(self, path):
+        tailer = self.tailers.get(os.path.abspath(path))
+        if tailer is None:
+            return
+        with self._lock:
+            for batch in tailer.read_batches():
+                for line in batch:
+                    self.callback(line.strip())
+            if self.offsets is not None:
+                self.offsets.update(tailer)
+
+    def on_modified(self, event):
+        self._dispatch(event.src_path)
+
+    def on_created(self, event):
+        self._dispatch(event.src_path)
+
+    def on_moved(self, event):
+        self._dispatch(event.src_path)
+        self._dispatch(event.dest_path)
+
+    def poll(self):
+        """Reads every file once, covering any filesystem events that were missed."""
+        for filepath in self.tailers:
+            self._dispatch(filepath)
+        if self.offsets is not None:
+            with self._lock:
+                self.offsets.save()
+
+    def close(self):
+        for tailer in self.tailers.values():
+            tailer.close()
+
+def start_monitoring(filepaths, callback, offsets_file=OFFSETS_FILE):
+    """Starts monitoring one file or a list of files for appended lines."""
+    if isinstance(filepaths, str):
+        filepaths = [filepaths]
+    offsets = OffsetStore(offsets_file) if offsets_file else None
+    event_handler = LogFileHandler(filepaths, callback, offsets)
+    observer = Observer()
+    # Schedule each directory that holds a watched file once
+    for directory in {os.path.dirname(path) for path in event_handler.tailers}:
+        observer.schedule(event_handler, path=directory, recursive=False)
+    observer.start()
+    print(f"Monitoring {', '.join(repr(p) for p in filepaths)} for new logs...")
+    event_handler.poll()  # Pick up anything appended while we weren't running
+    try:
+        while True:
+            time.sleep(CHECKPOINT_INTERVAL)
+            event_handler.poll()
+    except KeyboardInterrupt:
+        observer.stop()
+    observer.join()
+    event_handler.poll()
+    event_handler.close()
+
+if __name__ == '__main__':
+    # Example usage: print new lines to the console
+    def print_new_log(log_line):
+        print(f"NEW LOG DETECTED: {log_line}")
+
+    # Create a dummy log file to monitor
+    log_file_path = "data/raw_logs/app.log"
+    with open(log_file_path, "w") as f:
+        f.write("Initial log entry.\n")
+
+    start_monitoring(log_file_path, print_new_log, offsets_file=None)
@@ -1,123 +1,269 @@
-import time
-import os
-import csv
-import re
-from joblib import load
-import win32evtlog
-from collections import deque
-
-# --- Configuration ---
-MODEL_PATH = 'models/anomaly_detector.joblib'
-LIVE_ANOMALY_LOG_FILE = 'live_anomalies.csv'
-LOG_TO_WATCH = 'Application'
-CRITICAL_KEYWORDS = r'fatal|crash|failed|exception|unhandled|error'
-
-# --- Global State ---
-model = None
-
-def clean_message(message):
-    if not isinstance(message, str):
-        return ""
-    cleaned = message.lower()
-    cleaned = re.sub(r'[^a-z\s]', '', cleaned)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned
-
-def process_event(event, seen_records):
-    if event.RecordNumber in seen_records:
-        return False
-
-    seen_records.add(event.RecordNumber)
-
-    try:
-        full_message = ""
-        if event.StringInserts:
-            full_message = ' '.join(str(s).strip() for s in event.StringInserts)
-
-        cleaned_full_message = clean_message(full_message)
-
-        model_prediction = model.predict([cleaned_full_message])[0]
-        keyword_found = re.search(CRITICAL_KEYWORDS, full_message, re.IGNORECASE)
-
-        if model_prediction == -1 or keyword_found:
-            reason = "Model detected anomaly" if model_prediction == -1 else f"Keyword match: '{keyword_found.group(0)}'"
-
-            log_line = f"Source: {event.SourceName} | ID: {event.EventID} | Message: {full_message}"
-            print(f"\n🚨 ANOMALY DETECTED!")
-            print(f"🔍 Reason: {reason}")
-            print(f"🧾 Event: {log_line}\n")
-            save_anomaly_to_file(event, full_message, reason)
-            return True
-
-    except Exception as e:
-        print(f"⚠️ Failed to process event from '{event.SourceName}'. Error: {e}")
-
-    return False
-
-def save_anomaly_to_file(event, message, reason):
-    with open(LIVE_ANOMALY_LOG_FILE, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            event.TimeGenerated.Format(),
-            event.SourceName,
-            event.EventID,
-            message,
-            reason
-        ])
-
-def start_live_monitoring():
-    global model
-    print("📡 Initializing live monitoring...")
-
-    try:
-        model = load(MODEL_PATH)
-        print("✅ Model loaded.")
-    except FileNotFoundError:
-        print(f"❌ Model file not found at {MODEL_PATH}.")
-        return
-
-    if not os.path.exists(LIVE_ANOMALY_LOG_FILE):
-        with open(LIVE_ANOMALY_LOG_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Timestamp', 'Source', 'EventID', 'Message', 'DetectionReason'])
-
-    log_handle = None
-    try:
-        log_handle = win32evtlog.OpenEventLog(None, LOG_TO_WATCH)
-
-        seen_records = set()
-        print(f"📖 Watching Windows '{LOG_TO_WATCH}' event log for anomalies...")
-
-        processed_event_count = 0
-        MAX_EVENTS = 10
-        flags = win32evtlog.EVENTLOG_FORWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-
-        while True:
-            events = win32evtlog.ReadEventLog(log_handle, flags, 0, 20)
-            if not events:
-                time.sleep(2)
-                continue
-
-            for event in events:
-                new_anomaly = process_event(event, seen_records)
-                if new_anomaly:
-                    processed_event_count += 1
-                    if processed_event_count >= MAX_EVENTS:
-                        print(f"\n⏸️ Processed {MAX_EVENTS} anomalies. Pausing for new events...\n")
-                        processed_event_count = 0
-                        time.sleep(5)
-
-            time.sleep(1)
-
-    except Exception as e:
-        print(f"❌ ERROR during monitoring: {e}")
-    finally:
-        if log_handle:
-            win32evtlog.CloseEventLog(log_handle)
-            print("ℹ️ Event log handle closed.")
-
-if __name__ == '__main__':
-    try:
-        start_live_monitoring()
-    except KeyboardInterrupt:
-        print("\n👋 Monitoring stopped by user.")
+import argparse
+from datetime import datetime
+
+from src.aggregation import AGGREGATION_WINDOW, AnomalyAggregator
+from src.anomaly_sink import AnomalySink
+from src.dedup import DEDUP_CHECKPOINT_FILE, DedupStore, DeferredCheckpoint
+from src.event_sources import WindowsEventLogSource, event_message, event_seconds, open_source
+from src.metrics import DUPLICATES, EVENTS_READ, serve_metrics
+from src.model_registry import ModelWatcher, load_current_model
+from src.profiler import profile_hot_loop
+from src.rate_detector import RateDetector
+from src.rules import RuleEngine
+from src.scheduler import PollScheduler
+from src.scoring_engine import ScoringEngine
+from src.sharded import ShardedDetector
+from src.structured_log import AlertSummarizer, add_logging_arguments, configure_from_args, get_logger
+from src.template_miner import TemplateVerdictCache
+
+# --- Configuration ---
+MODEL_PATH = 'models/anomaly_detector.joblib'
+LIVE_ANOMALY_LOG_FILE = 'live_anomalies.csv'
+LIVE_ANOMALY_PARQUET_DIR = 'data/live_anomalies'
+LIVE_ANOMALY_DB = 'data/anomalies.db'
+ANOMALY_OUTPUT_FORMAT = 'csv'  # or 'parquet' (daily partitions, needs pyarrow) or 'sqlite' (indexed history the API serves)
+# Timestamp is the first occurrence; Count identical anomalies were seen up to LastSeen
+ANOMALY_COLUMNS = ['Timestamp', 'Source', 'EventID', 'Message', 'DetectionReason', 'Count', 'LastSeen']
+LOG_TO_WATCH = 'Application'
+MAX_DETECTION_LATENCY = 1.0  # Seconds a new event may wait before an idle reader polls again
+RATE_DETECTION = True        # Also flag Source/EventID rate spikes and never-seen keys (src/rate_detector.py)
+
+log = get_logger('main')
+
+# --- Global State ---
+model = None
+engine = None
+sink = None
+watcher = None
+alerts = None
+aggregator = None
+
+def process_event(event, dedup, channel):
+    """Queues a new event for batched scoring; returns its Future or None for duplicates."""
+    if not dedup.is_new(channel, event.RecordNumber):
+        DUPLICATES.labels(channel=channel).inc()
+        return None
+
+    return engine.submit(event_message(event), event.SourceName, event.EventID, event_seconds(event))
+
+def report_verdict(event, future):
+    """Waits for an event's verdict and reports it if anomalous."""
+    full_message = event_message(event)
+    try:
+        verdict = future.result()
+
+        if verdict.is_anomaly:
+            reason = verdict_reason(verdict)
+
+            # Rate-limited per source; every anomaly is still counted in the sink
+            alerts.report(event.SourceName, event.EventID, full_message, reason)
+            save_anomaly_to_file(event, full_message, reason)
+            return True
+
+    except Exception as e:
+        log.warning(f"⚠️ Failed to process event from '{event.SourceName}'. Error: {e}")
+
+    return False
+
+def verdict_reason(verdict):
+    return "Model detected anomaly" if verdict.rule is None else f"Rule match ({verdict.rule}): '{verdict.keyword}'"
+
+def save_anomaly_to_file(event, message, reason):
+    # Identical anomalies are collapsed per window before they reach the sink
+    aggregator.add(event.SourceName, event.EventID, message, reason, event.TimeGenerated.Format())
+
+def write_anomaly_record(record):
+    # Buffered; the sink's writer thread does the actual file I/O in batches
+    sink.write([
+        record.first_seen,
+        record.source,
+        record.event_id,
+        record.message,
+        record.reason,
+        record.count,
+        record.last_seen
+    ])
+
+def start_live_monitoring(source=None):
+    """
+    Scores events from `source` (any EventSource) until stopped or exhausted.
+    By default it reads the Windows LOG_TO_WATCH log, resuming after the
+    checkpointed high-water mark (from the start on the first run).
+    """
+    global model, engine, sink, watcher, alerts, aggregator
+    log.info("📡 Initializing live monitoring...")
+
+    try:
+        model, version = load_current_model(fallback_path=MODEL_PATH)
+        log.info(f"✅ Model loaded ({version or MODEL_PATH}).")
+    except FileNotFoundError:
+        log.error(f"❌ Model file not found at {MODEL_PATH}.")
+        return
+
+    output_path = {'parquet': LIVE_ANOMALY_PARQUET_DIR, 'sqlite': LIVE_ANOMALY_DB}.get(
+        ANOMALY_OUTPUT_FORMAT, LIVE_ANOMALY_LOG_FILE
+    )
+    sink = AnomalySink(output_path, ANOMALY_COLUMNS, fmt=ANOMALY_OUTPUT_FORMAT)
+    alerts = AlertSummarizer()
+    aggregator = AnomalyAggregator(write_anomaly_record, AGGREGATION_WINDOW)
+
+    engine = ScoringEngine(
+        model, rules=RuleEngine.from_config(), template_cache=TemplateVerdictCache(),
+        rate_detector=RateDetector() if RATE_DETECTION else None
+    ).start()
+    # Hot-swaps the engine's model whenever src/model.py promotes a new version
+    watcher = ModelWatcher(engine, version).start()
+
+    dedup = None
+    try:
+        if source is None:
+            # Only the real event log keeps its record numbers across restarts
+            dedup = DedupStore(DEDUP_CHECKPOINT_FILE)
+            source = WindowsEventLogSource(
+                LOG_TO_WATCH, from_start=True, after_record=dedup.high_water(LOG_TO_WATCH) or None
+            )
+        else:
+            dedup = DedupStore(path=None)
+        # A checkpoint only covers anomalies the aggregator and sink have written out
+        checkpoint = DeferredCheckpoint(dedup, [aggregator, sink])
+        channel = source.name
+        events_read = EVENTS_READ.labels(channel=channel)
+        clears = 0
+        log.info(f"📖 Watching '{source.name}' events for anomalies...")
+
+        # Drains bursts without sleeping, backs off while idle
+        scheduler = PollScheduler(MAX_DETECTION_LATENCY)
+
+        while True:
+            events = source.read()
+            alerts.flush_due()
+            aggregator.flush_due()
+            checkpoint.poll()
+            if not events:
+                if source.exhausted:
+                    log.info(f"ℹ️ '{source.name}' has no more events.")
+                    break
+                scheduler.pause(0, source)
+                continue
+
+            events_read.inc(len(events))
+            if getattr(source, 'clears', 0) != clears:
+                # The log was cleared and record numbers restarted
+                clears = source.clears
+                dedup.reset(channel)
+
+            # Submit the whole read first so the engine scores it as one batch
+            pending = [(event, process_event(event, dedup, channel)) for event in events]
+            for event, future in pending:
+                if future is not None:
+                    report_verdict(event, future)
+
+            scheduler.pause(len(events), source)
+
+    except Exception as e:
+        log.error(f"❌ ERROR during monitoring: {e}")
+    finally:
+        watcher.stop()
+        engine.stop()
+        alerts.flush()
+        aggregator.flush()
+        sink.close()
+        if dedup is not None:
+            dedup.save()
+        if source is not None:
+            source.close()
+            log.info("ℹ️ Event source closed.")
+
+def report_sharded_verdicts(batch):
+    """Reports the anomalies of one in-order VerdictBatch from the sharded detector."""
+    for anomaly in batch.anomalies:
+        reason = verdict_reason(anomaly.verdict)
+        alerts.report(anomaly.source, anomaly.event_id, anomaly.message, reason)
+        aggregator.add(anomaly.source, anomaly.event_id, anomaly.message, reason,
+                       datetime.fromtimestamp(anomaly.seen).strftime('%c'))
+
+def flush_due():
+    alerts.flush_due()
+    aggregator.flush_due()
+
+def start_sharded_monitoring(spec, shards, options=None):
+    """
+    Scores the source `spec` with `shards` processes (src/sharded.py) and
+    reports anomalies in record order. There is no dedup checkpoint or model
+    hot-swap in this mode: a Windows log is read from new events on, and a
+    promoted model is used from the next start.
+    """
+    global model, sink, alerts, aggregator
+    log.info(f"📡 Initializing sharded monitoring with {shards} shard(s)...")
+
+    try:
+        model, version = load_current_model(fallback_path=MODEL_PATH)
+        log.info(f"✅ Model loaded ({version or MODEL_PATH}).")
+    except FileNotFoundError:
+        log.error(f"❌ Model file not found at {MODEL_PATH}.")
+        return
+
+    output_path = {'parquet': LIVE_ANOMALY_PARQUET_DIR, 'sqlite': LIVE_ANOMALY_DB}.get(
+        ANOMALY_OUTPUT_FORMAT, LIVE_ANOMALY_LOG_FILE
+    )
+    sink = AnomalySink(output_path, ANOMALY_COLUMNS, fmt=ANOMALY_OUTPUT_FORMAT)
+    alerts = AlertSummarizer()
+    aggregator = AnomalyAggregator(write_anomaly_record, AGGREGATION_WINDOW)
+    detector = ShardedDetector(spec, model, shards, source_options=options, rate_detection=RATE_DETECTION)
+    events_read = EVENTS_READ.labels(channel=spec)
+
+    def on_verdicts(batch):
+        events_read.inc(len(batch.scores))
+        report_sharded_verdicts(batch)
+        flush_due()
+
+    try:
+        log.info(f"📖 Watching '{spec}' events for anomalies...")
+        detector.run(on_verdicts, on_idle=flush_due)
+        log.info(f"ℹ️ '{spec}' has no more events ({detector.events} scored, {detector.anomalies} anomalies).")
+    except Exception as e:
+        # A shard or reader failure surfaces here; keep the traceback, as nothing else records it
+        log.exception(f"❌ ERROR during sharded monitoring: {e}")
+    finally:
+        alerts.flush()
+        aggregator.flush()
+        sink.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Live anomaly monitoring.')
+    parser.add_argument('--source', default=None,
+                        help="windows:<log>, file:<path>, replay:<csv> or synthetic:[count] "
+                             f"(default: the Windows '{LOG_TO_WATCH}' log)")
+    parser.add_argument('--speed', type=float, default=None,
+                        help='replay speed as a multiple of real time; 0 = as fast as possible')
+    parser.add_argument('--loop', action='store_true', help='repeat the replay file forever')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve Prometheus metrics at http://127.0.0.1:<port>/metrics')
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help='sample the running threads and write folded stacks here on exit')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='score with this many processes, split by Source/EventID (src/sharded.py); '
+                             'no dedup, read checkpoint or model hot-swap in this mode: a Windows log is '
+                             'read from new events on')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_from_args(args)
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    profile_hot_loop(args.profile)
+
+    options = {}
+    if args.speed is not None:
+        options['speed'] = args.speed
+    if args.loop:
+        options['loop'] = True
+
+    try:
+        if args.shards:
+            start_sharded_monitoring(args.source or f'windows:{LOG_TO_WATCH}', args.shards, options)
+        else:
+            start_live_monitoring(open_source(args.source, **options) if args.source else None)
+    except KeyboardInterrupt:
+        log.info("👋 Monitoring stopped by user.")
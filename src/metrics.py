@@ -0,0 +1,223 @@
+# src/metrics.py
+# Process-wide counters, gauges and latency histograms for the detection
+# pipeline, rendered in the Prometheus text format. The API serves them at
+# /metrics; the monitors can serve them on a local port with serve_metrics.
+#   curl http://127.0.0.1:9464/metrics
+
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9464
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds; spans a cached rule lookup (~1 µs) up to a slow disk flush
+LATENCY_BUCKETS = (1e-6, 5e-6, 2.5e-5, 1e-4, 5e-4, 2.5e-3, 0.01, 0.05, 0.25, 1.0, 5.0)
+BATCH_SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name):
+        yield name, (), self.value
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+        self._function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Reads the value from `function()` at render time instead."""
+        self._function = function
+
+    def samples(self, name):
+        if self._function is not None:
+            try:
+                self.value = self._function()
+            except Exception:
+                pass
+        yield name, (), self.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            cumulative += count
+            yield name + '_bucket', (('le', _format_value(bound)),), cumulative
+        yield name + '_sum', (), self.sum
+        yield name + '_count', (), cumulative
+
+
+class Metric:
+    """
+    One named metric, optionally split by labels. Without labels the metric
+    itself takes inc()/set()/observe(); with labels, call labels(...) once
+    and keep the child. Updates are not locked (they run for every event),
+    so concurrent writers may very occasionally lose an increment.
+    """
+
+    def __init__(self, kind, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # inc/set/observe/... on an unlabelled metric go straight to its only child
+            child = self.labels()
+            for method in ('inc', 'dec', 'set', 'set_function', 'observe'):
+                if hasattr(child, method):
+                    setattr(self, method, getattr(child, method))
+
+    def _new_child(self):
+        if self.kind == 'counter':
+            return _CounterChild()
+        if self.kind == 'gauge':
+            return _GaugeChild()
+        return _HistogramChild(self.buckets)
+
+    def labels(self, *values, **labels):
+        key = tuple(str(v) for v in values) or tuple(str(labels[name]) for name in self.labelnames)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"Metric '{self.name}' takes labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key, child in list(self._children.items()):
+            for name, extra, value in child.samples(self.name):
+                lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together; asking for an existing name returns it."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Metric(kind, name, documentation, labelnames, **options)
+            elif metric.kind != kind:
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get('counter', name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get('gauge', name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get('histogram', name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- Pipeline metrics ---
+EVENTS_READ = REGISTRY.counter('logmon_events_read_total', 'Events read from a source', ['channel'])
+DUPLICATES = REGISTRY.counter('logmon_duplicate_events_total', 'Events dropped as already seen', ['channel'])
+EVENTS_IN = REGISTRY.counter('logmon_events_in_total', 'Messages submitted to the scoring engine')
+EVENTS_SCORED = REGISTRY.counter('logmon_events_scored_total', 'Messages scored by the model')
+TEMPLATE_HITS = REGISTRY.counter('logmon_template_cache_hits_total', 'Messages answered from the template cache')
+RULE_DECISIONS = REGISTRY.counter('logmon_rule_decisions_total', 'Messages decided by a rule', ['action'])
+ANOMALIES = REGISTRY.counter('logmon_anomalies_total', 'Anomalous verdicts', ['decided_by'])
+ANOMALIES_WRITTEN = REGISTRY.counter('logmon_anomalies_written_total', 'Anomaly rows flushed to disk')
+QUEUE_DEPTH = REGISTRY.gauge('logmon_queue_depth', 'Messages waiting for a scoring worker')
+BATCH_SIZE = REGISTRY.histogram('logmon_batch_size', 'Messages per model call', buckets=BATCH_SIZE_BUCKETS)
+STAGE_SECONDS = REGISTRY.histogram(
+    'logmon_stage_seconds',
+    'Time per pipeline stage call: rules per event; clean, featurize and score per batch; sink per flush',
+    ['stage'],
+)
+DETECTION_LATENCY = REGISTRY.histogram(
+    'logmon_detection_latency_seconds', 'Time from submit to verdict for model-scored messages'
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Scrapes every few seconds would drown the monitor's own output
+
+
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY):
+    """
+    Serves `registry` as text at http://host:port/metrics from a daemon
+    thread, for the monitors that have no web app. Returns the server;
+    call shutdown() on it to stop.
+    """
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,128 @@
+# src/mmap_model.py
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import dump, load
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+
+from src.flat_forest import to_flat_pipeline
+
+# --- Configuration ---
+MMAP_MODEL_PATH = 'models/anomaly_detector.mmap.joblib'
+
+
+class CompactTfidf(BaseEstimator, TransformerMixin):
+    """
+    Drop-in replacement for a fitted TfidfVectorizer whose vocabulary lives in
+    flat NumPy arrays (sorted fixed-width terms + column ids) instead of a
+    Python dict. The vocabulary and idf weights are plain arrays, so joblib can
+    memory-map them and every process on one host shares the same pages.
+    Produces exactly the same matrix as the vectorizer it was built from.
+    """
+
+    def __init__(self, terms, columns, idf, analyzer_params, norm='l2', sublinear_tf=False):
+        self.terms = terms
+        self.columns = columns
+        self.idf = idf
+        self.analyzer_params = analyzer_params
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        vocabulary = vectorizer.vocabulary_
+        terms = np.array(sorted(vocabulary))
+        columns = np.array([vocabulary[t] for t in terms], dtype=np.int32)
+        params = vectorizer.get_params()
+        for key in ('vocabulary', 'dtype', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf'):
+            params.pop(key, None)
+        idf = np.asarray(vectorizer.idf_) if vectorizer.use_idf else None
+        return cls(terms, columns, idf, params, norm=vectorizer.norm, sublinear_tf=vectorizer.sublinear_tf)
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True  # Built from a fitted vectorizer; check_is_fitted finds no trailing-underscore attributes
+
+    def _analyzer(self):
+        analyzer = getattr(self, '_analyzer_fn', None)
+        if analyzer is None:
+            analyzer = TfidfVectorizer(**self.analyzer_params).build_analyzer()
+            self._analyzer_fn = analyzer
+        return analyzer
+
+    def transform(self, raw_documents):
+        analyzer = self._analyzer()
+        rows, tokens = [], []
+        n_docs = 0
+        for n_docs, doc in enumerate(raw_documents, start=1):
+            doc_tokens = analyzer(doc)
+            tokens.extend(doc_tokens)
+            rows.extend([n_docs - 1] * len(doc_tokens))
+
+        n_features = len(self.columns)
+        if tokens:
+            tokens = np.array(tokens)
+            # One vectorized binary search over the sorted terms for the whole batch
+            positions = np.searchsorted(self.terms, tokens)
+            positions[positions == len(self.terms)] = 0
+            known = self.terms[positions] == tokens
+            rows = np.asarray(rows)[known]
+            cols = self.columns[positions[known]]
+        else:
+            rows = cols = np.zeros(0, dtype=np.int32)
+
+        X = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(n_docs, n_features),
+        )
+        X.sum_duplicates()
+        X.sort_indices()
+        if self.analyzer_params.get('binary'):
+            X.data.fill(1)
+
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_analyzer_fn', None)  # Closures don't pickle; rebuilt on first use
+        return state
+
+
+def to_compact_pipeline(pipeline):
+    """
+    Returns a copy of a fitted tfidf+clf pipeline using CompactTfidf and a
+    FlatIsolationForest, so the vocabulary and every tree are flat arrays.
+    """
+    steps = [
+        (name, CompactTfidf.from_vectorizer(step) if isinstance(step, TfidfVectorizer) else step)
+        for name, step in to_flat_pipeline(pipeline).steps
+    ]
+    return Pipeline(steps)
+
+
+def export_mmap_model(pipeline, path=MMAP_MODEL_PATH):
+    """Writes an uncompressed, memory-mappable copy of a fitted pipeline."""
+    dump(to_compact_pipeline(pipeline), path)
+    return path
+
+
+def load_mmap_model(path=MMAP_MODEL_PATH):
+    """
+    Maps the artifact's arrays read-only instead of copying them. The forest
+    is stored flattened, so its node arrays are mapped too and need no
+    flattening after load. (An artifact exported before that still holds
+    sklearn trees, which copy their node arrays on load; re-export it.)
+    """
+    return load(path, mmap_mode='r')
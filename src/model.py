@@ -1,56 +1,149 @@
-# src/model.py
-
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import IsolationForest
-from sklearn.pipeline import Pipeline
-from joblib import dump
-import os
-
-def train_anomaly_model_on_processed_data():
-    """
-    Trains an Isolation Forest model using the preprocessed log data.
-    """
-    processed_data_path = 'data/processed/preprocessed_logs.csv'
-    model_path = 'models/anomaly_detector.joblib'
-
-    # 1. Load the PREPROCESSED Data
-    print(f"📂 Loading preprocessed data from '{processed_data_path}'...")
-    try:
-        df = pd.read_csv(processed_data_path)
-    except FileNotFoundError:
-        print(f"❌ ERROR: Preprocessed data file not found at '{processed_data_path}'.")
-        print("ℹ️ Please run the preprocess_data.py script first.")
-        return
-
-    # Fill missing values
-    df['CleanedMessage'] = df['CleanedMessage'].fillna('')
-    df['Level'] = df['Level'].fillna('')
-
-    # 2. Filter for "Normal" Data (Information-level)
-    normal_df = df[df['Level'] == 'Information']
-    if normal_df.empty:
-        print("❌ ERROR: No logs with 'Information' level found.")
-        return
-
-    print(f"✅ Found {len(normal_df)} normal logs (Level: Information).")
-
-    X_train = normal_df['CleanedMessage']
-
-    # 3. Create and Train Pipeline
-    pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(max_features=5000)),
-        ('clf', IsolationForest(contamination='auto', random_state=42))
-    ])
-
-    print("🧠 Training anomaly detection model...")
-    pipeline.fit(X_train)
-    print("✅ Training complete.")
-
-    # 4. Save model
-    os.makedirs('models', exist_ok=True)
-    dump(pipeline, model_path)
-    print(f"💾 Model saved to: {model_path}")
-
-if __name__ == '__main__':
-    train_anomaly_model_on_processed_data()
+# src/model.py
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.ensemble import IsolationForest
+from sklearn.pipeline import Pipeline
+from joblib import dump
+import argparse
+import os
+
+from src.mmap_model import MMAP_MODEL_PATH, export_mmap_model
+from src.model_registry import promote, register_model
+
+# --- Configuration ---
+PROCESSED_DATA_PATH = 'data/processed/preprocessed_logs.csv'
+MODEL_PATH = 'models/anomaly_detector.joblib'
+STREAM_CHUNK_SIZE = 100000
+RESERVOIR_SIZE = 100000
+HASH_FEATURES = 2 ** 18
+
+def save_model(pipeline, model_path, metadata, export_mmap=False, register=True):
+    """Saves the fitted pipeline, then registers and promotes it so running monitors hot-swap to it."""
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    dump(pipeline, model_path)
+    print(f"💾 Model saved to: {model_path}")
+    if export_mmap:
+        export_mmap_model(pipeline, MMAP_MODEL_PATH)
+        print(f"💾 Memory-mappable model saved to: {MMAP_MODEL_PATH}")
+
+    if register:
+        version = register_model(pipeline, metadata, mmap=export_mmap)
+        promote(version)
+        print(f"🏷️ Registered and promoted model version {version}")
+
+def train_anomaly_model_on_processed_data(export_mmap=False, processed_data_path=PROCESSED_DATA_PATH,
+                                          model_path=MODEL_PATH, register=True):
+    """
+    Trains an Isolation Forest model using the preprocessed log data.
+    With export_mmap=True a memory-mappable copy is written as well and the
+    registered version uses it, so monitor/API processes share its pages.
+    """
+    # 1. Load the PREPROCESSED Data
+    print(f"📂 Loading preprocessed data from '{processed_data_path}'...")
+    try:
+        df = pd.read_csv(processed_data_path)
+    except FileNotFoundError:
+        print(f"❌ ERROR: Preprocessed data file not found at '{processed_data_path}'.")
+        print("ℹ️ Please run the preprocess_data.py script first.")
+        return
+
+    # Fill missing values
+    df['CleanedMessage'] = df['CleanedMessage'].fillna('')
+    df['Level'] = df['Level'].fillna('')
+
+    # 2. Filter for "Normal" Data (Information-level)
+    normal_df = df[df['Level'] == 'Information']
+    if normal_df.empty:
+        print("❌ ERROR: No logs with 'Information' level found.")
+        return
+
+    print(f"✅ Found {len(normal_df)} normal logs (Level: Information).")
+
+    X_train = normal_df['CleanedMessage']
+
+    # 3. Create and Train Pipeline
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(max_features=5000)),
+        ('clf', IsolationForest(contamination='auto', random_state=42))
+    ])
+
+    print("🧠 Training anomaly detection model...")
+    pipeline.fit(X_train)
+    print("✅ Training complete.")
+
+    # 4. Save, register and promote the model
+    save_model(pipeline, model_path, {'trained_rows': len(X_train), 'source': processed_data_path},
+               export_mmap=export_mmap, register=register)
+
+def train_streaming_model(export_mmap=False, processed_data_path=PROCESSED_DATA_PATH, model_path=MODEL_PATH,
+                          register=True, chunksize=STREAM_CHUNK_SIZE, reservoir_size=RESERVOIR_SIZE,
+                          n_features=HASH_FEATURES):
+    """
+    Out-of-core variant of train_anomaly_model_on_processed_data for unbounded
+    log volumes. The CSV is streamed in chunks and a uniform reservoir sample of
+    the normal messages is kept; the model is a stateless HashingVectorizer
+    (no vocabulary to build or store) feeding the Isolation Forest. Peak memory
+    depends on `chunksize` and `reservoir_size`, not on the input size.
+    IsolationForest only draws 256 samples per tree anyway, so a reservoir of
+    this size loses nothing.
+    """
+    print(f"📂 Streaming preprocessed data from '{processed_data_path}'...")
+    rng = np.random.default_rng(42)
+    reservoir = np.empty(reservoir_size, dtype=object)
+    seen = 0
+
+    try:
+        chunks = pd.read_csv(processed_data_path, usecols=['Level', 'CleanedMessage'], chunksize=chunksize)
+        for chunk in chunks:
+            normal = chunk.loc[chunk['Level'] == 'Information', 'CleanedMessage'].fillna('').to_numpy(dtype=object)
+
+            # Fill the reservoir first, then Algorithm R vectorized over the chunk:
+            # item number i replaces a random slot with probability k / (i + 1)
+            fill = min(len(normal), max(0, reservoir_size - seen))
+            reservoir[seen:seen + fill] = normal[:fill]
+            rest = normal[fill:]
+            if len(rest):
+                positions = seen + fill + np.arange(len(rest))
+                slots = (rng.random(len(rest)) * (positions + 1)).astype(np.int64)
+                keep = slots < reservoir_size
+                reservoir[slots[keep]] = rest[keep]
+            seen += len(normal)
+    except FileNotFoundError:
+        print(f"❌ ERROR: Preprocessed data file not found at '{processed_data_path}'.")
+        print("ℹ️ Please run the preprocess_data.py script first.")
+        return
+
+    if seen == 0:
+        print("❌ ERROR: No logs with 'Information' level found.")
+        return
+
+    X_train = reservoir[:min(seen, reservoir_size)]
+    print(f"✅ Streamed {seen} normal logs; training on a reservoir of {len(X_train)}.")
+
+    pipeline = Pipeline([
+        ('hashing', HashingVectorizer(n_features=n_features, alternate_sign=False, norm='l2')),
+        ('clf', IsolationForest(contamination='auto', random_state=42))
+    ])
+
+    print("🧠 Training anomaly detection model...")
+    pipeline.fit(X_train)
+    print("✅ Training complete.")
+
+    save_model(pipeline, model_path,
+               {'trained_rows': len(X_train), 'streamed_rows': seen, 'source': processed_data_path},
+               export_mmap=export_mmap, register=register)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the log anomaly detector.')
+    parser.add_argument('--mmap', action='store_true', help='also export a memory-mappable model')
+    parser.add_argument('--streaming', action='store_true',
+                        help='out-of-core training with a hashing featurizer and reservoir sample')
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNK_SIZE)
+    parser.add_argument('--reservoir', type=int, default=RESERVOIR_SIZE)
+    args = parser.parse_args()
+    if args.streaming:
+        train_streaming_model(export_mmap=args.mmap, chunksize=args.chunksize, reservoir_size=args.reservoir)
+    else:
+        train_anomaly_model_on_processed_data(export_mmap=args.mmap)
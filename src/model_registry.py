@@ -0,0 +1,215 @@
+# src/model_registry.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from joblib import dump, load
+
+from src.flat_forest import to_flat_pipeline
+from src.mmap_model import export_mmap_model, load_mmap_model
+from src.normalize import clean_message
+from src.structured_log import get_logger
+from src.synthetic_logs import generate_logs
+
+# --- Configuration ---
+REGISTRY_DIR = 'models/registry'
+MODEL_PATH = 'models/anomaly_detector.joblib'
+ARTIFACT_NAME = 'model.joblib'
+POLL_INTERVAL = 2.0
+WARMUP_SIZE = 64
+FLAT_FOREST = True  # Score with the flattened forest; same scores, far less per-call overhead (mmap artifacts are stored flat)
+
+_VERSION_DIR = re.compile(r'^v(\d+)$')
+
+log = get_logger('model_registry')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = [name for name in os.listdir(registry_dir) if _VERSION_DIR.match(name)]
+    return sorted(versions, key=lambda name: int(name[1:]))
+
+
+def register_model(pipeline, metadata=None, registry_dir=REGISTRY_DIR, mmap=False):
+    """
+    Saves a fitted pipeline as the next version with metadata and a checksum.
+    With mmap=True the artifact is the memory-mappable compact pipeline.
+    """
+    versions = list_versions(registry_dir)
+    version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+    version_dir = os.path.join(registry_dir, version)
+    os.makedirs(version_dir)
+
+    artifact = os.path.join(version_dir, ARTIFACT_NAME)
+    if mmap:
+        export_mmap_model(pipeline, artifact)
+    else:
+        dump(pipeline, artifact)
+    info = dict(metadata or {})
+    info.update({
+        'version': version,
+        'created': datetime.now().isoformat(),
+        'artifact': ARTIFACT_NAME,
+        'format': 'mmap' if mmap else 'joblib',
+        'sha256': file_sha256(artifact),
+    })
+    with open(os.path.join(version_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return version
+
+
+def promote(version, registry_dir=REGISTRY_DIR):
+    """Atomically points CURRENT at `version`; running watchers pick it up."""
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version '{version}' in {registry_dir}")
+    tmp_path = os.path.join(registry_dir, 'CURRENT.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(registry_dir, 'CURRENT'))
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_signature(version, registry_dir=REGISTRY_DIR):
+    """
+    Cheap fingerprint of a version's files (mtime and size), used to tell a
+    re-registered version from the one that already failed to load.
+    """
+    version_dir = os.path.join(registry_dir, version)
+    signature = []
+    for name in sorted(os.listdir(version_dir)) if os.path.isdir(version_dir) else []:
+        stat = os.stat(os.path.join(version_dir, name))
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_version(version, registry_dir=REGISTRY_DIR, flat=FLAT_FOREST):
+    """
+    Loads a registered version after verifying its checksum. Returns
+    (pipeline, metadata); with flat=True the IsolationForest of a joblib
+    artifact is swapped for a FlatIsolationForest. An mmap artifact is
+    returned as mapped: copying its trees would give up the shared pages.
+    """
+    version_dir = os.path.join(registry_dir, version)
+    with open(os.path.join(version_dir, 'metadata.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    artifact = os.path.join(version_dir, metadata['artifact'])
+    if file_sha256(artifact) != metadata['sha256']:
+        raise ValueError(f"Checksum mismatch for model version '{version}'")
+    if metadata.get('format') == 'mmap':
+        return load_mmap_model(artifact), metadata
+    pipeline = load(artifact)
+    return (to_flat_pipeline(pipeline) if flat else pipeline), metadata
+
+
+def load_current_model(registry_dir=REGISTRY_DIR, fallback_path=MODEL_PATH, flat=FLAT_FOREST):
+    """
+    Loads the promoted registry version, or the artifact at `fallback_path`
+    when nothing has been promoted yet (memory-mapped if it is the compact
+    export). Returns (pipeline, version or None).
+    """
+    version = current_version(registry_dir)
+    if version is None:
+        if fallback_path.endswith('.mmap.joblib'):
+            return load_mmap_model(fallback_path), None
+        pipeline = load(fallback_path)
+        return (to_flat_pipeline(pipeline) if flat else pipeline), None
+    pipeline, _ = load_version(version, registry_dir, flat)
+    return pipeline, version
+
+
+def warm_up(pipeline, size=WARMUP_SIZE):
+    """Scores a throwaway batch so lazy initialization happens before go-live."""
+    pipeline.decision_function([clean_message(m) for _, _, _, m in generate_logs(size)])
+
+
+class ModelWatcher:
+    """
+    Polls the registry's CURRENT pointer and hot-swaps the engine's model when
+    a new version is promoted. The new pipeline is loaded, checksum-verified
+    and warmed up off to the side; the swap itself is a single reference
+    assignment, so queued and in-flight events are never dropped. A version
+    that fails to load is remembered and not retried until its files change.
+    """
+
+    def __init__(self, engine, version=None, registry_dir=REGISTRY_DIR, poll_interval=POLL_INTERVAL):
+        self.engine = engine
+        self.version = version
+        self.registry_dir = registry_dir
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.last_load_seconds = 0.0
+        self.last_swap_seconds = 0.0
+        self._failed = None  # (version, version_signature) of the last load that failed
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        """Swaps in the promoted version if it changed. Returns True on a swap."""
+        version = current_version(self.registry_dir)
+        if version is None or version == self.version:
+            return False
+        failed = (version, version_signature(version, self.registry_dir))
+        if failed == self._failed:
+            return False
+
+        start = time.perf_counter()
+        try:
+            pipeline, _ = load_version(version, self.registry_dir)
+            warm_up(pipeline)
+        except Exception:
+            # Loading (and flattening) again would fail the same way; wait for the files to change
+            self._failed = failed
+            raise
+        self._failed = None
+        self.last_load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.engine.swap_model(pipeline)
+        self.last_swap_seconds = time.perf_counter() - start
+
+        self.version = version
+        self.reloads += 1
+        log.info(f"🔄 Model {version} is live (load+warm-up {self.last_load_seconds:.2f}s, "
+                 f"swap {self.last_swap_seconds * 1e6:.0f}µs).")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                log.warning(f"⚠️ Model reload failed, keeping {self.version} until the new version's "
+                            f"files change. Error: {e}")
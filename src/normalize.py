@@ -0,0 +1,67 @@
+# src/normalize.py
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+CLEAN_CACHE_SIZE = 65536
+
+
+def _build_ascii_table():
+    """Lowercases A-Z, keeps a-z and whitespace, deletes every other ASCII char."""
+    table = {}
+    for code in range(128):
+        char = chr(code)
+        if 'a' <= char.lower() <= 'z':
+            table[code] = char.lower()
+        elif not char.isspace():
+            table[code] = None
+    return str.maketrans(table)
+
+
+_ASCII_TABLE = _build_ascii_table()
+_NON_ALPHA = re.compile(r'[^a-z\s]+')
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean(message):
+    if message.isascii():
+        # One translate pass does the lowercasing and the character filtering
+        cleaned = message.translate(_ASCII_TABLE)
+    else:
+        cleaned = _NON_ALPHA.sub('', message.lower())
+    return ' '.join(cleaned.split())
+
+
+def clean_message(message):
+    """
+    Applies the training-time cleaning to a message: lowercase, drop everything
+    except a-z and whitespace, collapse whitespace runs to single spaces.
+    Results are cached because Windows events repeat the same text constantly.
+    """
+    if not isinstance(message, str):
+        return ""
+    return _clean(message)
+
+
+cache_info = _clean.cache_info
+cache_clear = _clean.cache_clear
+
+
+def clean_series(series):
+    """
+    Bulk variant of clean_message for a pandas Series of strings. Each distinct
+    message is cleaned once and the results are broadcast back by position.
+    """
+    codes, uniques = pd.factorize(series)
+    # factorize marks missing values with -1, which picks the trailing ""
+    cleaned = np.array([clean_message(m) for m in uniques] + [""], dtype=object)
+    return pd.Series(cleaned[codes], index=series.index, name=series.name)
+
+
+def count_words(cleaned):
+    """Word counts for a Series already produced by clean_series."""
+    return np.where(cleaned == "", 0, cleaned.str.count(' ') + 1)
@@ -0,0 +1,202 @@
+# src/predict.py
+# Scores a historical log export (the Event Viewer CSV preprocess.py reads)
+# in bulk: each chunk is cleaned and scored with one model call, optionally
+# across a process pool, and the results are written in input order.
+#   python -m src.predict data/raw_logs/application_log_export.csv data/processed/predictions.csv --workers 4
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.model_registry import MODEL_PATH, load_current_model
+from src.normalize import clean_series
+from src.preprocess import READ_OPTIONS
+from src.rules import RuleEngine
+
+# --- Configuration ---
+CHUNK_SIZE = 100000
+OUTPUT_COLUMNS = ['Level', 'DateTime', 'Source', 'EventID', 'Message',
+                  'AnomalyScore', 'IsAnomaly', 'DetectionReason']
+MODEL_REASON = "Model detected anomaly"
+
+# Set per worker process by _init_worker
+_model = None
+_rules = None
+
+
+def score_frame(df, model, rules):
+    """
+    Scores one chunk of an export. AnomalyScore is always the model's score
+    (negative means anomalous); a matching rule decides IsAnomaly on its own,
+    as it does in the live monitors. Rows without a message are dropped.
+    """
+    df = df.dropna(subset=['Message'])
+    messages = df['Message'].astype(str)
+    sources = df['Source'].fillna('').astype(str)
+    event_ids = pd.to_numeric(df['EventID'], errors='coerce').astype('Int64')
+    # Plain Python values for the rule loop; iterating the pandas columns is several times slower
+    id_values = event_ids.to_numpy(dtype=float, na_value=np.nan).tolist()
+
+    # Exports repeat the same text constantly: score each distinct cleaned message once
+    codes, uniques = pd.factorize(clean_series(messages))
+    scores = model.decision_function(uniques.to_numpy())[codes] if len(uniques) else np.empty(0)
+    is_anomaly = scores < 0
+    reasons = np.where(is_anomaly, MODEL_REASON, '').astype(object)
+
+    for i, (message, source, event_id) in enumerate(zip(messages.tolist(), sources.tolist(), id_values)):
+        decision = rules.match(message, source, int(event_id) if event_id == event_id else None)
+        if decision is not None:
+            is_anomaly[i] = decision.rule.action == 'alert'
+            reasons[i] = f"Rule match ({decision.rule.name}): '{decision.text}'" if is_anomaly[i] else ''
+
+    return pd.DataFrame({
+        'Level': df['Level'].fillna('').astype(str).to_numpy(),
+        'DateTime': df['DateTime'].fillna('').astype(str).to_numpy(),
+        'Source': sources.to_numpy(),
+        'EventID': event_ids.array,
+        'Message': messages.to_numpy(),
+        'AnomalyScore': scores,
+        'IsAnomaly': is_anomaly,
+        'DetectionReason': reasons,
+    }, columns=OUTPUT_COLUMNS)
+
+
+def _init_worker(model_path):
+    global _model, _rules
+    _model, _ = load_current_model(fallback_path=model_path)
+    _rules = RuleEngine.from_config()
+
+
+def _score_chunk(df):
+    """Process-pool task: scores one chunk and reports how long it took."""
+    start = time.perf_counter()
+    output_df = score_frame(df, _model, _rules)
+    return output_df, len(df), time.perf_counter() - start
+
+
+class _ParquetOutput:
+    """Appends chunks to a single Parquet file as row groups."""
+
+    def __init__(self, path):
+        import pyarrow as pa  # only needed for Parquet output
+        import pyarrow.parquet as pq
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self._writer = None
+
+    def write(self, output_df):
+        table = self._pa.Table.from_pandas(output_df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _CsvOutput:
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, 'w', newline='', encoding='utf-8')
+        self._header = True
+
+    def write(self, output_df):
+        output_df.to_csv(self._f, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        self._f.close()
+
+
+def predict_export(input_filepath, output_filepath, model_path=MODEL_PATH, chunksize=CHUNK_SIZE,
+                   workers=1, anomalies_only=False):
+    """
+    Scores every row of an exported log CSV and writes OUTPUT_COLUMNS to
+    `output_filepath` (Parquet if it ends in .parquet, else CSV). With
+    workers > 1 chunks are scored in a process pool, each worker holding its
+    own model; results are still written in the original order. Returns a
+    dict of row counts and per-stage timings.
+    """
+    try:
+        reader = pd.read_csv(input_filepath, chunksize=chunksize, **READ_OPTIONS)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File not found at '{input_filepath}'")
+        return None
+
+    output_dir = os.path.dirname(output_filepath)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    output = _ParquetOutput(output_filepath) if output_filepath.endswith('.parquet') else _CsvOutput(output_filepath)
+
+    print(f"📂 Scoring '{input_filepath}' in chunks of {chunksize} with {workers} worker(s)...")
+    result = {'rows_in': 0, 'rows_out': 0, 'anomalies': 0}
+    timings = {'read': 0.0, 'score': 0.0, 'write': 0.0}
+    start = time.perf_counter()
+
+    def write_chunk(output_df, rows_in, score_seconds):
+        write_start = time.perf_counter()
+        result['rows_in'] += rows_in
+        result['anomalies'] += int(output_df['IsAnomaly'].sum())
+        if anomalies_only:
+            output_df = output_df[output_df['IsAnomaly']]
+        output.write(output_df)
+        result['rows_out'] += len(output_df)
+        timings['score'] += score_seconds
+        timings['write'] += time.perf_counter() - write_start
+
+    def next_chunk():
+        read_start = time.perf_counter()
+        chunk = next(reader, None)
+        timings['read'] += time.perf_counter() - read_start
+        return chunk
+
+    try:
+        if workers <= 1:
+            _init_worker(model_path)
+            while (chunk := next_chunk()) is not None:
+                write_chunk(*_score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                pending = deque()
+                while (chunk := next_chunk()) is not None:
+                    pending.append(pool.submit(_score_chunk, chunk))
+                    # Keep a bounded window in flight and write results in submission order
+                    while pending and (len(pending) > 2 * workers or pending[0].done()):
+                        write_chunk(*pending.popleft().result())
+                while pending:
+                    write_chunk(*pending.popleft().result())
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - start
+    rows_in = result['rows_in']
+    print(f"\n✅ Scored {rows_in} rows in {elapsed:.1f}s ({rows_in / elapsed * 60 if elapsed else 0:,.0f} rows/min), "
+          f"{result['anomalies']} anomalies.")
+    print(f"📁 Saved {result['rows_out']} rows to '{output_filepath}'")
+    print("--- Throughput per stage (rows in / stage seconds) ---")
+    for stage, seconds in timings.items():
+        # score time is summed across workers, so it is per-core throughput
+        print(f"  {stage:<6}: {rows_in / seconds if seconds else float('inf'):12.0f} rows/s")
+    print(f"  total : {rows_in / elapsed if elapsed else float('inf'):12.0f} rows/s")
+    return dict(result, seconds=elapsed, **timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a historical Windows log export in bulk.')
+    parser.add_argument('input', help='Event Viewer CSV export')
+    parser.add_argument('output', help='results file (.csv or .parquet)')
+    parser.add_argument('--model', default=MODEL_PATH, help='used when no registry version is promoted')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='score chunks in this many processes')
+    parser.add_argument('--anomalies-only', action='store_true', help='only write flagged rows')
+    args = parser.parse_args()
+
+    predict_export(args.input, args.output, model_path=args.model, chunksize=args.chunksize,
+                   workers=args.workers, anomalies_only=args.anomalies_only)
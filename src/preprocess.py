@@ -1,61 +1,198 @@
-import pandas as pd
-import re
-
-def preprocess_log_data(input_filepath, output_filepath):
-    """
-    Loads raw log data, cleans it properly, and saves it to a new file.
-    
-    Args:
-        input_filepath (str): Path to the raw CSV log file.
-        output_filepath (str): Path to save the cleaned CSV file.
-    """
-    print(f"📂 Loading log data from '{input_filepath}'...")
-
-    try:
-        col_names = ['Level', 'DateTime', 'Source', 'EventID', 'TaskCategory', 'Message']
-        df = pd.read_csv(
-            input_filepath,
-            encoding='latin1',
-            on_bad_lines='skip',
-            header=None,
-            skiprows=1,
-            names=col_names
-        )
-    except FileNotFoundError:
-        print(f"❌ ERROR: File not found at '{input_filepath}'")
-        return
-    except Exception as e:
-        print(f"❌ ERROR loading CSV: {e}")
-        return
-
-    # Drop rows without messages or levels
-    df = df.dropna(subset=['Message', 'Level'])
-
-    # Clean the message text
-    print("🧹 Cleaning log messages...")
-    df['CleanedMessage'] = df['Message'].astype(str).str.lower()
-    df['CleanedMessage'] = df['CleanedMessage'].apply(lambda x: re.sub(r'[^a-z\s]', '', x))
-    df['CleanedMessage'] = df['CleanedMessage'].apply(lambda x: re.sub(r'\s+', ' ', x).strip())
-
-    # Optional: You can drop very short messages (less than 3 words)
-    df = df[df['CleanedMessage'].str.split().str.len() >= 3]
-
-    # Save only useful columns for training
-    output_df = df[['Level', 'CleanedMessage']]
-
-    try:
-        output_df.to_csv(output_filepath, index=False, encoding='utf-8')
-        print(f"\n✅ Preprocessing complete.")
-        print(f"📁 Saved cleaned data to '{output_filepath}'")
-    except Exception as e:
-        print(f"❌ ERROR saving file: {e}")
-
-    # Display preview
-    print("\n--- Preview of Preprocessed Data ---")
-    print(output_df.head(5))
-
-if __name__ == '__main__':
-    raw_log_file = 'data/raw_logs/application_log_export.csv'
-    processed_log_file = 'data/processed/preprocessed_logs.csv'
-    
-    preprocess_log_data(raw_log_file, processed_log_file)
\ No newline at end of file
+import argparse
+import contextlib
+import glob
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.normalize import clean_series, count_words
+
+# --- Configuration ---
+COL_NAMES = ['Level', 'DateTime', 'Source', 'EventID', 'TaskCategory', 'Message']
+READ_OPTIONS = dict(encoding='latin1', on_bad_lines='skip', header=None, skiprows=1, names=COL_NAMES)
+CHUNK_SIZE = 200000
+
+def clean_log_frame(df):
+    """Drops unusable rows and returns the Level/CleanedMessage training columns."""
+    # Drop rows without messages or levels
+    df = df.dropna(subset=['Message', 'Level'])
+
+    # Clean the message text
+    df = df.assign(CleanedMessage=clean_series(df['Message'].astype(str)))
+
+    # Optional: You can drop very short messages (less than 3 words)
+    df = df[count_words(df['CleanedMessage']) >= 3]
+
+    # Keep only useful columns for training
+    return df[['Level', 'CleanedMessage']]
+
+def preprocess_log_data(input_filepath, output_filepath):
+    """
+    Loads raw log data, cleans it properly, and saves it to a new file.
+    
+    Args:
+        input_filepath (str): Path to the raw CSV log file.
+        output_filepath (str): Path to save the cleaned CSV file.
+    """
+    print(f"📂 Loading log data from '{input_filepath}'...")
+
+    try:
+        df = pd.read_csv(input_filepath, **READ_OPTIONS)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File not found at '{input_filepath}'")
+        return
+    except Exception as e:
+        print(f"❌ ERROR loading CSV: {e}")
+        return
+
+    print("🧹 Cleaning log messages...")
+    output_df = clean_log_frame(df)
+
+    try:
+        output_df.to_csv(output_filepath, index=False, encoding='utf-8')
+        print(f"\n✅ Preprocessing complete.")
+        print(f"📁 Saved cleaned data to '{output_filepath}'")
+    except Exception as e:
+        print(f"❌ ERROR saving file: {e}")
+
+    # Display preview
+    print("\n--- Preview of Preprocessed Data ---")
+    print(output_df.head(5))
+
+def _clean_chunk(df):
+    """Process-pool task: cleans one chunk and reports how long it took."""
+    start = time.perf_counter()
+    output_df = clean_log_frame(df)
+    return output_df, len(df), time.perf_counter() - start
+
+def _load_progress(progress_path):
+    try:
+        with open(progress_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _save_progress(progress_path, progress):
+    tmp_path = progress_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+def preprocess_log_data_chunked(input_filepath, output_filepath, chunksize=CHUNK_SIZE, workers=None,
+                                parquet_dir=None, resume=True):
+    """
+    Streaming variant of preprocess_log_data for multi-GB raw exports.
+
+    Chunks are read in order, cleaned in a process pool and written back in
+    the original order, so the output matches the single-shot version. Each
+    chunk is appended to the CSV (and written as parquet_dir/part-NNNNN.parquet
+    when parquet_dir is set). Progress is checkpointed after every chunk, so an
+    interrupted run restarts after the last completed chunk.
+    """
+    workers = workers or os.cpu_count() or 1
+    progress_path = output_filepath + '.progress.json'
+    progress = _load_progress(progress_path) if resume else None
+    if progress is not None and progress.get('chunksize') != chunksize:
+        print("ℹ️ Checkpoint was made with a different chunk size; starting over.")
+        progress = None
+    if progress is None:
+        progress = {'chunksize': chunksize, 'chunks_done': 0, 'csv_bytes': 0, 'rows_in': 0, 'rows_out': 0}
+    elif progress['chunks_done']:
+        print(f"↩️ Resuming after chunk {progress['chunks_done']} ({progress['rows_out']} rows already written).")
+
+    try:
+        reader = pd.read_csv(input_filepath, chunksize=chunksize, **READ_OPTIONS)
+    except FileNotFoundError:
+        print(f"❌ ERROR: File not found at '{input_filepath}'")
+        return
+
+    # Drop anything written after the last checkpoint
+    with open(output_filepath, 'a+b') as f:
+        f.truncate(progress['csv_bytes'])
+    if parquet_dir:
+        os.makedirs(parquet_dir, exist_ok=True)
+        # Like the CSV truncate: parts past the checkpoint (all of them when starting
+        # over) are left from an earlier, possibly larger run and would be read as output
+        for part in glob.glob(os.path.join(parquet_dir, 'part-*.parquet')):
+            index = os.path.basename(part)[len('part-'):-len('.parquet')]
+            if not index.isdigit() or int(index) >= progress['chunks_done']:
+                os.remove(part)
+
+    print(f"📂 Streaming log data from '{input_filepath}' in chunks of {chunksize} with {workers} workers...")
+    timings = {'read': 0.0, 'clean': 0.0, 'write': 0.0}
+    start = time.perf_counter()
+
+    def write_chunk(index, output_df):
+        write_start = time.perf_counter()
+        with open(output_filepath, 'a', newline='', encoding='utf-8') as f:
+            output_df.to_csv(f, index=False, header=progress['csv_bytes'] == 0)
+        progress['csv_bytes'] = os.path.getsize(output_filepath)
+        if parquet_dir:
+            output_df.to_parquet(os.path.join(parquet_dir, f'part-{index:05d}.parquet'), index=False)
+        progress['chunks_done'] = index + 1
+        progress['rows_out'] += len(output_df)
+        _save_progress(progress_path, progress)
+        timings['write'] += time.perf_counter() - write_start
+
+    def finish_oldest(pending):
+        done_index, future = pending.popleft()
+        output_df, rows_in, clean_seconds = future.result()
+        progress['rows_in'] += rows_in
+        timings['clean'] += clean_seconds
+        write_chunk(done_index, output_df)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        index = 0
+        while True:
+            read_start = time.perf_counter()
+            chunk = next(reader, None)
+            timings['read'] += time.perf_counter() - read_start
+            if chunk is None:
+                break
+            if index >= progress['chunks_done']:
+                pending.append((index, pool.submit(_clean_chunk, chunk)))
+            index += 1
+
+            # Keep a bounded window in flight and write results in submission order
+            while pending and (len(pending) > 2 * workers or pending[0][1].done()):
+                finish_oldest(pending)
+
+        while pending:
+            finish_oldest(pending)
+
+    elapsed = time.perf_counter() - start
+    # No chunk was written for an empty export, so there may be no progress file
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(progress_path)
+    rows_in, rows_out = progress['rows_in'], progress['rows_out']
+    print(f"\n✅ Preprocessing complete: {rows_in} rows in, {rows_out} rows out in {elapsed:.1f}s.")
+    print(f"📁 Saved cleaned data to '{output_filepath}'" + (f" and '{parquet_dir}'" if parquet_dir else ""))
+    print("--- Throughput per stage (rows in / stage seconds) ---")
+    for stage, seconds in timings.items():
+        # clean time is summed across workers, so it is per-core throughput
+        print(f"  {stage:<6}: {rows_in / seconds if seconds else float('inf'):12.0f} rows/s")
+    print(f"  total : {rows_in / elapsed if elapsed else float('inf'):12.0f} rows/s")
+
+if __name__ == '__main__':
+    raw_log_file = 'data/raw_logs/application_log_export.csv'
+    processed_log_file = 'data/processed/preprocessed_logs.csv'
+
+    parser = argparse.ArgumentParser(description='Preprocess a raw Windows log export.')
+    parser.add_argument('--chunked', action='store_true', help='stream the export through a process pool')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--parquet-dir', default=None, help='also write partitioned Parquet here')
+    parser.add_argument('--no-resume', action='store_true', help='ignore any previous checkpoint')
+    args = parser.parse_args()
+
+    if args.chunked:
+        preprocess_log_data_chunked(raw_log_file, processed_log_file, chunksize=args.chunksize,
+                                    workers=args.workers, parquet_dir=args.parquet_dir,
+                                    resume=not args.no_resume)
+    else:
+        preprocess_log_data(raw_log_file, processed_log_file)
\ No newline at end of file
@@ -0,0 +1,100 @@
+# src/profiler.py
+# Opt-in wall-clock sampling profiler for the monitors' hot loop. Writes
+# folded stacks ("outer;inner;leaf count" per line), which flamegraph.pl,
+# speedscope and inferno all read:
+#   python -m src.main --source synthetic:200000 --profile profile.folded
+#   flamegraph.pl profile.folded > profile.svg
+
+import atexit
+import os
+import sys
+import threading
+from collections import Counter
+
+# --- Configuration ---
+SAMPLE_INTERVAL = 0.005  # Seconds between samples; ~200 Hz keeps the overhead around 1%
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread (or only threads whose name
+    starts with one of `thread_prefixes`) every `interval` seconds from a
+    daemon thread, and counts identical stacks. Threads blocked in a queue
+    or sleep show up too, so the profile shows where wall time goes, idle
+    waits included. Costs nothing until start() is called.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_prefixes=None):
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes else None
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = names.get(thread_id, str(thread_id))
+                if thread_id == own_id or (self.thread_prefixes and not name.startswith(self.thread_prefixes)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                # Root first, with the thread as the outermost frame
+                stack.append(name)
+                self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """The profile as folded-stack lines, heaviest first."""
+        return [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.folded()) + '\n')
+        print(f"🔥 Wrote {self.samples} profile samples ({len(self._stacks)} distinct stacks) to '{path}'")
+
+
+def profile_hot_loop(path, interval=SAMPLE_INTERVAL, thread_prefixes=None):
+    """
+    Starts a profiler that writes to `path` when the process exits; returns
+    it, or None when `path` is empty. Monitors call this for --profile.
+    """
+    if not path:
+        return None
+    profiler = SamplingProfiler(interval, thread_prefixes).start()
+
+    def finish():
+        profiler.stop().dump(path)
+
+    atexit.register(finish)
+    return profiler
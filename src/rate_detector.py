@@ -0,0 +1,196 @@
+# src/rate_detector.py
+
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.metrics import REGISTRY
+
+# --- Configuration ---
+BUCKET_SECONDS = 60.0        # Rates are events per (Source, EventID) per bucket
+BASELINE_HALF_LIFE = 3600.0  # Seconds for a past bucket's weight in the expected count to halve
+SPIKE_FACTOR = 10.0          # A bucket this many times over its expected count is a spike...
+MIN_SPIKE_COUNT = 20         # ...once it holds at least this many events
+LEARNING_PERIOD = 900.0      # Wall-clock seconds after the first event during which nothing is flagged
+SKETCH_WIDTH = 1 << 16       # Counters per sketch row (a power of two)
+SKETCH_DEPTH = 4             # Sketch rows; an estimate is the smallest of a key's counters
+BLOOM_BITS = 1 << 24         # Bits in the seen-keys filter (2 MiB, ~0.2% false positives at 1M keys)
+BLOOM_HASHES = 4
+
+# Verdict rule names for the two findings
+RATE_SPIKE = 'rate-spike'
+NEW_KEY = 'new-source-event'
+
+RATE_FINDINGS = REGISTRY.counter('logmon_rate_findings_total', 'Rate detector findings', ['kind'])
+_SPIKES = RATE_FINDINGS.labels(kind=RATE_SPIKE)
+_NEW_KEYS = RATE_FINDINGS.labels(kind=NEW_KEY)
+
+
+def _hashes(key):
+    # Two 32-bit halves of one hash; row i uses h1 + i * h2 (double hashing)
+    h = hash(key) & 0xFFFFFFFFFFFFFFFF
+    return h & 0xFFFFFFFF, (h >> 32) | 1
+
+
+class BloomFilter:
+    """Fixed-size set of hashed keys: no false negatives, false positives grow with the keys added."""
+
+    def __init__(self, bits=BLOOM_BITS, hashes=BLOOM_HASHES):
+        if bits & (bits - 1):
+            raise ValueError("bits must be a power of two")
+        self.mask = bits - 1
+        self.hashes = hashes
+        self.added = 0
+        self._bits = bytearray(bits // 8)
+
+    def add(self, h1, h2):
+        """Sets the key's bits; returns True if they were all set already (seen before, probably)."""
+        bits = self._bits
+        present = True
+        for i in range(self.hashes):
+            position = (h1 + i * h2) & self.mask
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not bits[byte] & bit:
+                present = False
+                bits[byte] |= bit
+        if not present:
+            self.added += 1
+        return present
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class RateDetector:
+    """
+    Flags sudden bursts of one (Source, EventID) and keys never seen before,
+    in O(1) per event and fixed memory however many keys there are.
+
+    Event counts for the current `bucket_seconds` bucket live in a
+    count-min sketch. When a bucket closes it is folded into a second sketch
+    of the same shape holding each key's exponentially decayed count per
+    bucket (the half-life sets how fast old buckets are forgotten), with one
+    vectorized pass over the counters. An event is a spike when its key's
+    count in the open bucket crosses `spike_factor` times the expected count
+    (and at least `min_count`); each key fires once per bucket at the
+    crossing. Seen keys are kept in a Bloom filter. Sketches only ever
+    overestimate, so collisions can hide a spike but not invent one.
+
+    `seen` is the event's own timestamp when the caller has one, so a
+    backlog read at startup is bucketed in event time, not arrival time.
+    Nothing is flagged for `learning_period` seconds of `clock` time after
+    the first event, however old the events read meanwhile are: a first run
+    reading a long backlog learns every key in it instead of reporting each
+    as new. With clock=None (a simulation passing `seen` for every event)
+    the learning period is in event time too.
+    """
+
+    def __init__(self, bucket_seconds=BUCKET_SECONDS, half_life=BASELINE_HALF_LIFE, spike_factor=SPIKE_FACTOR,
+                 min_count=MIN_SPIKE_COUNT, learning_period=LEARNING_PERIOD, width=SKETCH_WIDTH,
+                 depth=SKETCH_DEPTH, bloom_bits=BLOOM_BITS, clock=time.time):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.bucket_seconds = bucket_seconds
+        self.spike_factor = spike_factor
+        self.min_count = min_count
+        self.learning_period = learning_period
+        self.width = width
+        self.depth = depth
+        self.clock = clock
+        self.seen = BloomFilter(bloom_bits)
+        self.events = 0
+        self.spikes = 0
+        self.new_keys = 0
+
+        self._counts = np.zeros(depth * width)    # This bucket's counts
+        self._expected = np.zeros(depth * width)  # Decayed average count per bucket
+        # Per-event reads and writes go through memoryviews (plain floats, no NumPy scalars)
+        self._counts_view = memoryview(self._counts)
+        self._expected_view = memoryview(self._expected)
+        self._row_offsets = [row * width for row in range(depth)]
+        self._keep = 0.5 ** (bucket_seconds / half_life)  # Old average's weight after one bucket
+        self._weight = 0.0  # Total weight of the closed buckets in the averages
+        self._bucket = None
+        self._bucket_end = -math.inf  # The first event opens the first bucket
+        self._learn_until = None
+        self._lock = threading.Lock()
+
+    def observe(self, source, event_id, seen=None):
+        """Counts one event; returns (rule, detail) for a rate spike or a new key, otherwise None."""
+        now = self.clock() if seen is None else seen
+        h1, h2 = _hashes((source, event_id))
+        mask = self.width - 1
+        with self._lock:
+            if self._bucket is None:  # The first event starts the learning period
+                self._learn_until = self._arrival(now, seen) + self.learning_period
+            if now >= self._bucket_end:
+                self._advance(now)
+            # Late events count towards the open bucket
+
+            self.events += 1
+            counts, expected = self._counts_view, self._expected_view
+            count = expect = math.inf
+            h = h1
+            for offset in self._row_offsets:
+                position = (h & mask) + offset
+                h += h2
+                value = counts[position]
+                counts[position] = value + 1
+                if value < count:
+                    count = value
+                value = expected[position]
+                if value < expect:
+                    expect = value
+            is_new = not self.seen.add(h1, h2)
+            if self._learn_until is not None:
+                if self._arrival(now, seen) < self._learn_until:
+                    return None
+                self._learn_until = None  # Learned; skip the clock from now on
+
+            if is_new:
+                self.new_keys += 1
+                _NEW_KEYS.inc()
+                return NEW_KEY, f"first {source}/{event_id} event"
+
+            # Undo the average's start at zero so young baselines aren't underestimated
+            expect = expect / self._weight if self._weight else 0.0
+            threshold = max(self.min_count, self.spike_factor * expect)
+            if count < threshold <= count + 1:
+                self.spikes += 1
+                _SPIKES.inc()
+                return RATE_SPIKE, f"{count + 1:.0f} events in {self.bucket_seconds:.0f}s, expected {expect:.1f}"
+        return None
+
+    def _arrival(self, now, seen):
+        """When the event was read: `clock` time, or its own for a simulated stream (clock=None)."""
+        return now if seen is None or self.clock is None else self.clock()
+
+    def _advance(self, now):
+        """Opens the bucket holding `now`, closing the open one (and any empty ones) first."""
+        bucket = int(now // self.bucket_seconds)
+        if self._bucket is not None:
+            self._close_buckets(bucket - self._bucket)
+        self._bucket = bucket
+        self._bucket_end = (bucket + 1) * self.bucket_seconds
+
+    def _close_buckets(self, elapsed):
+        """Folds the open bucket into the averages, plus `elapsed - 1` empty buckets after it."""
+        keep = self._keep
+        self._expected *= keep
+        self._expected += (1.0 - keep) * self._counts
+        if elapsed > 1:
+            self._expected *= keep ** (elapsed - 1)
+        self._counts.fill(0.0)
+        self._weight = 1.0 - (1.0 - self._weight) * keep ** elapsed
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'spikes': self.spikes,
+            'new_keys': self.new_keys,
+            'distinct_keys': self.seen.added,  # Approximate: Bloom collisions are not counted
+            'memory_bytes': self._counts.nbytes + self._expected.nbytes + self.seen.nbytes,
+        }
@@ -0,0 +1,224 @@
+# src/retrain.py
+# Folds new analyst feedback (src/feedback.py) into the model without
+# rerunning preprocessing and training from scratch: the term counts of the
+# training rows are cached, only new feedback rows are cleaned and counted,
+# and the TF-IDF weights and forest are refit from the cached matrix.
+#   python -m src.retrain                # fold in new feedback, register and promote the model
+#   python -m src.retrain --rebuild      # rebuild the cache from the preprocessed data first
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+
+from src.feedback import FEEDBACK_DIR, FeedbackStore
+from src.mmap_model import CompactTfidf
+from src.model import MODEL_PATH, PROCESSED_DATA_PATH, save_model
+from src.normalize import clean_series, count_words
+
+# --- Configuration ---
+CACHE_DIR = 'models/feature_cache'
+MAX_FEATURES = 5000  # Same vocabulary size as src/model.py
+
+
+def message_key(cleaned):
+    """Stable 64-bit key of a cleaned message; crash feedback drops training rows with the same key."""
+    return int.from_bytes(hashlib.blake2b(cleaned.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class FeatureCache:
+    """
+    The normal training messages as a (rows x terms) count matrix over an
+    append-only term list, plus one message_key per row. Terms never seen
+    before get new columns; rows are only ever appended or dropped. Stored
+    uncompressed in `directory` with a state.json saying how much feedback
+    it already contains.
+    """
+
+    def __init__(self, counts, terms, keys, state):
+        self.counts = counts
+        self.terms = terms
+        self.keys = keys
+        self.state = state
+        self._columns = {term: column for column, term in enumerate(terms)}
+        self._analyzer = CountVectorizer().build_analyzer()  # Tokenizes like the TfidfVectorizer
+
+    @classmethod
+    def build(cls, processed_data_path=PROCESSED_DATA_PATH):
+        """Counts the normal (Information) rows of the preprocessed data, as src/model.py trains on."""
+        df = pd.read_csv(processed_data_path, usecols=['Level', 'CleanedMessage'])
+        messages = df.loc[df['Level'] == 'Information', 'CleanedMessage'].fillna('').tolist()
+        vectorizer = CountVectorizer()
+        counts = vectorizer.fit_transform(messages).tocsr()
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, column in vectorizer.vocabulary_.items():
+            terms[column] = term
+        keys = np.array([message_key(m) for m in messages], dtype=np.uint64)
+        state = {'source': processed_data_path, 'feedback_seq': 0, 'built': datetime.now().isoformat()}
+        return cls(counts, terms, keys, state)
+
+    @classmethod
+    def load(cls, directory=CACHE_DIR):
+        with open(os.path.join(directory, 'state.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        counts = sp.load_npz(os.path.join(directory, 'counts.npz')).tocsr()
+        terms = np.load(os.path.join(directory, 'terms.npy')).tolist()
+        keys = np.load(os.path.join(directory, 'keys.npy'))
+        return cls(counts, terms, keys, state)
+
+    def save(self, directory=CACHE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        sp.save_npz(os.path.join(directory, 'counts.npz'), self.counts, compressed=False)
+        np.save(os.path.join(directory, 'terms.npy'), np.array(self.terms, dtype=str))
+        np.save(os.path.join(directory, 'keys.npy'), self.keys)
+        # state.json last: it is what says the other files are complete
+        tmp_path = os.path.join(directory, 'state.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, 'state.json'))
+
+    def append(self, messages):
+        """Counts cleaned messages into new rows, adding columns for unseen terms."""
+        rows, columns = [], []
+        for row, message in enumerate(messages):
+            for token in self._analyzer(message):
+                column = self._columns.get(token)
+                if column is None:
+                    column = self._columns[token] = len(self.terms)
+                    self.terms.append(token)
+                rows.append(row)
+                columns.append(column)
+        new = sp.csr_matrix((np.ones(len(rows), dtype=self.counts.dtype), (rows, columns)),
+                            shape=(len(messages), len(self.terms)))
+        new.sum_duplicates()
+        counts = self.counts.copy()
+        counts.resize((counts.shape[0], len(self.terms)))
+        self.counts = sp.vstack([counts, new], format='csr')
+        self.keys = np.concatenate([self.keys, np.array([message_key(m) for m in messages], dtype=np.uint64)])
+
+    def drop(self, keys):
+        """Drops every row whose message_key is in `keys`. Returns how many were dropped."""
+        keep = ~np.isin(self.keys, np.fromiter(keys, dtype=np.uint64, count=len(keys)))
+        dropped = len(keep) - int(keep.sum())
+        if dropped:
+            self.counts, self.keys = self.counts[keep], self.keys[keep]
+        return dropped
+
+    def features(self, max_features=MAX_FEATURES):
+        """
+        Returns (CompactTfidf, X): the vocabulary, idf weights and TF-IDF
+        matrix TfidfVectorizer(max_features=...) would produce if fit on
+        these messages, from the counts alone (same sorting, limiting and
+        idf formula).
+        """
+        counts = self.counts
+        present = np.flatnonzero(np.diff(sp.csc_matrix(counts).indptr))  # Terms still in some row
+        order = present[np.argsort(np.array(self.terms, dtype=object)[present])]  # Alphabetical, as sklearn sorts
+        counts = counts[:, order]
+        if max_features is not None and len(order) > max_features:
+            # Summed as float64 like TfidfVectorizer's counts, so ties sort the same way
+            term_counts = np.asarray(counts.sum(axis=0, dtype=np.float64)).ravel()
+            limited = np.zeros(len(order), dtype=bool)
+            limited[(-term_counts).argsort()[:max_features]] = True
+            order, counts = order[limited], counts[:, limited]
+
+        n_rows = counts.shape[0]
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + n_rows) / (1 + df)) + 1  # smooth_idf=True
+        X = counts.astype(np.float64)
+        X.data *= idf[X.indices]
+        X = normalize(X, norm='l2', copy=False)
+
+        terms = np.array([self.terms[i] for i in order])
+        # CompactTfidf wants its terms sorted; they already are, so column i is term i
+        params = TfidfVectorizer(max_features=max_features).get_params()
+        for key in ('vocabulary', 'dtype', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf'):
+            params.pop(key, None)
+        tfidf = CompactTfidf(terms, np.arange(len(terms), dtype=np.int32), idf, params, norm='l2')
+        return tfidf, X
+
+
+def fold_in_feedback(cache, store):
+    """Adds the normal corrections after the cache's feedback_seq and drops crash ones. Returns counts."""
+    latest = {}
+    for row in store.read(since=cache.state['feedback_seq']):
+        latest[row.message] = row  # A later label for the same text supersedes the earlier one
+        cache.state['feedback_seq'] = row.seq + 1
+    if not latest:
+        return {'normal': 0, 'crash': 0, 'dropped': 0}
+
+    # Only the new rows go through preprocessing, with the same cleaning and length filter
+    rows = list(latest.values())
+    cleaned = clean_series(pd.Series([r.message for r in rows], dtype=object))
+    long_enough = count_words(cleaned) >= 3
+    normal = [m for r, m, keep in zip(rows, cleaned, long_enough) if r.is_crash == 0 and keep]
+    crash = {message_key(m) for r, m in zip(rows, cleaned) if r.is_crash == 1}
+    # Relabeling as crash also removes the text from the normal rows it was added to before
+    dropped = cache.drop(crash) if crash else 0
+    if normal:
+        cache.append(normal)
+    return {'normal': len(normal), 'crash': len(crash), 'dropped': dropped}
+
+
+def retrain(feedback_dir=FEEDBACK_DIR, cache_dir=CACHE_DIR, processed_data_path=PROCESSED_DATA_PATH,
+            model_path=MODEL_PATH, rebuild=False, register=True):
+    """Refits the model from the cached counts plus any new feedback. Returns the fitted pipeline."""
+    timings = {}
+    start = time.perf_counter()
+    try:
+        cache = None if rebuild else FeatureCache.load(cache_dir)
+    except FileNotFoundError:
+        cache = None
+    if cache is None:
+        print(f"📂 Building the feature cache from '{processed_data_path}'...")
+        try:
+            cache = FeatureCache.build(processed_data_path)
+        except FileNotFoundError:
+            print(f"❌ ERROR: Preprocessed data file not found at '{processed_data_path}'.")
+            return None
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    folded = fold_in_feedback(cache, FeedbackStore(feedback_dir))
+    timings['feedback'] = time.perf_counter() - start
+    print(f"🧾 Feedback: {folded['normal']} normal rows added, {folded['crash']} crash messages "
+          f"({folded['dropped']} training rows dropped); {cache.counts.shape[0]} rows in total.")
+
+    start = time.perf_counter()
+    tfidf, X = cache.features()
+    timings['features'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clf = IsolationForest(contamination='auto', random_state=42).fit(X)
+    pipeline = Pipeline([('tfidf', tfidf), ('clf', clf)])
+    timings['fit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cache.save(cache_dir)
+    save_model(pipeline, model_path,
+               {'trained_rows': X.shape[0], 'feedback_seq': cache.state['feedback_seq'],
+                'source': cache.state['source'], 'incremental': True},
+               register=register)
+    timings['save'] = time.perf_counter() - start
+    print("--- Seconds per stage ---")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<8}: {seconds:8.2f}")
+    return pipeline
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fold analyst feedback into the model incrementally.')
+    parser.add_argument('--rebuild', action='store_true', help='recount the preprocessed data first')
+    parser.add_argument('--no-register', action='store_true', help='only write the model file')
+    args = parser.parse_args()
+    retrain(rebuild=args.rebuild, register=not args.no_register)
@@ -0,0 +1,285 @@
+# src/rules.py
+
+import json
+import re
+import time
+from collections import namedtuple
+
+try:
+    import ahocorasick  # pyahocorasick; optional, a trie-shaped regex is used without it
+except ImportError:
+    ahocorasick = None
+
+from src.config import RULES, RULES_FILE
+from src.metrics import STAGE_SECONDS
+from src.structured_log import get_logger
+
+# --- Configuration ---
+MATCH_CACHE_SIZE = 65536  # Distinct messages whose text-rule outcome is remembered
+KINDS = ('event_id', 'source', 'keyword', 'regex')
+ACTIONS = ('alert', 'ignore')
+# pywin32 reports the full 32-bit event identifier (qualifier/severity bits
+# included); Event Viewer and the rules use the low 16 bits
+EVENT_ID_MASK = 0xFFFF
+
+Rule = namedtuple('Rule', ['name', 'kind', 'patterns', 'action'])
+# rule is the Rule that decided; text is what it matched (keyword, regex match, id or source)
+Decision = namedtuple('Decision', ['rule', 'text'])
+
+_RULE_SECONDS = STAGE_SECONDS.labels(stage='rules')
+
+_MISSING = object()
+# Numbered or named backreferences and conditionals: they refer to groups by position or name
+_GROUP_REFERENCE = re.compile(r'\\\d|\(\?P=|\(\?\(')
+
+log = get_logger('rules')
+_fallback_logged = False
+
+
+def load_rules(path=RULES_FILE):
+    """Reads rules from the JSON file at `path` if there is one, else config.RULES."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+    except FileNotFoundError:
+        specs = RULES
+    return [make_rule(spec) for spec in specs]
+
+
+def make_rule(spec):
+    rule = Rule(spec['name'], spec['kind'], list(spec['patterns']), spec.get('action', 'alert'))
+    if rule.kind not in KINDS:
+        raise ValueError(f"Rule '{rule.name}': unknown kind '{rule.kind}' (expected one of {KINDS})")
+    if rule.action not in ACTIONS:
+        raise ValueError(f"Rule '{rule.name}': unknown action '{rule.action}' (expected one of {ACTIONS})")
+    if not rule.patterns:
+        raise ValueError(f"Rule '{rule.name}' has no patterns")
+    return rule
+
+
+def trie_regex(words):
+    """
+    One regex for a set of literals, shaped like a trie ("fa(?:tal|iled)")
+    so the regex engine tests each character once instead of retrying
+    every alternative at every position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def combinable(pattern):
+    """
+    True if `pattern` can join the one alternation all ungated regexes share.
+    There it is wrapped in a named group and its own groups are renumbered,
+    which breaks named groups, backreferences and inline global flags; such
+    patterns are compiled on their own instead.
+    """
+    try:
+        wrapped = re.compile(f'(?P<r>{pattern})')
+    except re.error:
+        return False
+    return list(wrapped.groupindex) == ['r'] and not _GROUP_REFERENCE.search(pattern)
+
+
+def required_literal(pattern, min_length=3):
+    """
+    The longest run of plain characters every match of `pattern` must
+    contain (lowercased), or None. Deliberately conservative: alternations,
+    groups, classes, escapes and quantified characters all end a run.
+    """
+    if '|' in pattern or '(?x' in pattern:
+        return None
+    runs, run, depth, i = [], '', 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            runs.append(run)
+            run, i = '', i + 2
+            continue
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif depth == 0 and (char.isalnum() or char in ' _-:,/'):
+            if i + 1 < len(pattern) and pattern[i + 1] in '?*{+':
+                # Optional or repeated: only what came before is certain
+                runs.append(run)
+                run = ''
+            else:
+                run += char
+            i += 1
+            continue
+        runs.append(run)
+        run, i = '', i + 1
+    runs.append(run)
+    longest = max(runs, key=len)
+    return longest.lower() if len(longest) >= min_length else None
+
+
+class RuleEngine:
+    """
+    Evaluates every rule against an event in a few lookups: EventIDs (low
+    16 bits, see EVENT_ID_MASK) and sources through dicts, all keywords
+    through one Aho-Corasick automaton (or one trie regex), all regexes
+    through one combined pattern. A regex with a required literal is only
+    run when the automaton saw that literal, and one that can't share the
+    combined pattern (see combinable) runs on its own. Text outcomes are cached per distinct message, so repeated
+    messages cost a dict lookup. Keeps hit counts and match time per rule;
+    the counters are not locked (this runs for every event), so concurrent
+    callers may very occasionally lose an increment.
+    """
+
+    def __init__(self, rules, cache_size=MATCH_CACHE_SIZE):
+        self.rules = list(rules)
+        self.cache_size = cache_size
+        self.hits = [0] * len(self.rules)
+        self.match_ns = [0] * len(self.rules)
+        self.evaluations = 0
+        self.total_ns = 0
+        self._cache = {}
+
+        # An earlier rule wins when two rules list the same pattern
+        self._by_event_id, self._by_source, keywords = {}, {}, {}
+        ungated, self._gated, self._standalone = [], [], []
+        for index, rule in enumerate(self.rules):
+            for pattern in rule.patterns:
+                # Lookup hits are answered with a prebuilt (index, Decision)
+                if rule.kind == 'event_id':
+                    self._by_event_id.setdefault(int(pattern) & EVENT_ID_MASK, (index, Decision(rule, str(pattern))))
+                elif rule.kind == 'source':
+                    self._by_source.setdefault(str(pattern).lower(), (index, Decision(rule, str(pattern))))
+                elif rule.kind == 'keyword':
+                    keywords.setdefault(str(pattern).lower(), index)
+                else:
+                    literal = required_literal(pattern)
+                    if literal is not None:
+                        self._gated.append((literal, index, re.compile(pattern, re.IGNORECASE)))
+                    elif combinable(pattern):
+                        ungated.append(f'(?P<r{index}_{len(ungated)}>{pattern})')
+                    else:
+                        self._standalone.append((index, re.compile(pattern, re.IGNORECASE)))
+
+        self._keyword_rule = keywords
+        self._automaton = None
+        self._keyword_regex = None
+        if ahocorasick is not None and (keywords or self._gated):
+            # Keywords and regex gate literals share one pass over the message
+            self._automaton = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._automaton.add_word(keyword, (len(keyword), keyword, []))
+            for gate, (literal, _, _) in enumerate(self._gated):
+                length, keyword, gates = self._automaton.get(literal, (len(literal), None, []))
+                self._automaton.add_word(literal, (length, keyword, gates + [gate]))
+            self._automaton.make_automaton()
+        elif keywords:
+            self._keyword_regex = re.compile(trie_regex(keywords))
+            _log_fallback()
+        self._regex = re.compile('|'.join(ungated), re.IGNORECASE) if ungated else None
+
+    @classmethod
+    def from_config(cls, path=RULES_FILE):
+        return cls(load_rules(path))
+
+    @classmethod
+    def from_keywords(cls, pattern):
+        """Wraps a legacy keyword alternation ("fatal|crash|...") as one alert rule."""
+        return cls([Rule('keywords', 'regex', [pattern], 'alert')])
+
+    def _scan(self, message, lowered):
+        """Returns (leftmost keyword (start, end, keyword) or None, gate ids whose literal occurs)."""
+        if self._automaton is not None:
+            best, gates = None, []
+            for end, (length, keyword, literal_gates) in self._automaton.iter(lowered):
+                if keyword is not None and (best is None or end - length + 1 < best[0]):
+                    best = (end - length + 1, end + 1, keyword)
+                gates.extend(literal_gates)
+            return best, gates
+        best = None
+        if self._keyword_regex is not None:
+            match = self._keyword_regex.search(lowered)
+            if match is not None:
+                best = (match.start(), match.end(), match.group(0))
+        return best, [gate for gate, (literal, _, _) in enumerate(self._gated) if literal in lowered]
+
+    def _match_text(self, message):
+        lowered = message.lower()
+        keyword, gates = self._scan(message, lowered)
+        if keyword is not None:
+            start, end, word = keyword
+            # Report the keyword as written in the message when lowering kept the length
+            text = message[start:end] if len(lowered) == len(message) else word
+            index = self._keyword_rule[word]
+            return index, Decision(self.rules[index], text)
+
+        # Leftmost regex match wins; the earlier rule on a tie
+        best = None
+        if self._regex is not None:
+            match = self._regex.search(message)
+            if match is not None:
+                best = (match.start(), int(match.lastgroup[1:].split('_')[0]), match.group(0))
+        for index, regex in [self._gated[gate][1:] for gate in gates] + self._standalone:
+            match = regex.search(message)
+            if match is not None and (best is None or (match.start(), index) < best[:2]):
+                best = (match.start(), index, match.group(0))
+        return (best[1], Decision(self.rules[best[1]], best[2])) if best is not None else None
+
+    def match(self, message, source=None, event_id=None):
+        """Returns the Decision of the first rule that matches the event, or None."""
+        start = time.perf_counter_ns()
+        found = None
+        if event_id is not None and self._by_event_id:
+            found = self._by_event_id.get(event_id & EVENT_ID_MASK)
+        if found is None and source is not None and self._by_source:
+            found = self._by_source.get(source.lower())
+        if found is None:
+            found = self._cache.get(message, _MISSING)
+            if found is _MISSING:
+                found = self._match_text(message)
+                if len(self._cache) >= self.cache_size:
+                    self._cache.clear()
+                self._cache[message] = found
+        elapsed = time.perf_counter_ns() - start
+        _RULE_SECONDS.observe(elapsed / 1e9)
+
+        self.evaluations += 1
+        self.total_ns += elapsed
+        if found is None:
+            return None
+        index, decision = found
+        self.hits[index] += 1
+        self.match_ns[index] += elapsed
+        return decision
+
+    def stats(self):
+        return {
+            # How keywords are matched: 'aho-corasick', 'trie-regex' (no pyahocorasick) or None
+            'matcher': 'aho-corasick' if self._automaton is not None else
+                       'trie-regex' if self._keyword_regex is not None else None,
+            'evaluations': self.evaluations,
+            'mean_match_ns': self.total_ns / self.evaluations if self.evaluations else 0.0,
+            'rules': [
+                {'name': rule.name, 'kind': rule.kind, 'action': rule.action,
+                 'hits': hits, 'match_ms': match_ns / 1e6}
+                for rule, hits, match_ns in zip(self.rules, self.hits, self.match_ns)
+            ],
+        }
+
+
+def _log_fallback():
+    global _fallback_logged
+    if not _fallback_logged:
+        _fallback_logged = True
+        log.info("ℹ️ pyahocorasick is not installed; matching keywords with a trie regex instead.")
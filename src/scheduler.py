@@ -0,0 +1,75 @@
+# src/scheduler.py
+
+import time
+
+# --- Configuration ---
+MAX_DETECTION_LATENCY = 1.0  # Longest an idle reader may wait before polling again (seconds)
+MIN_IDLE_SLEEP = 0.005
+BACKOFF_FACTOR = 2.0
+RATE_SMOOTHING = 0.2
+
+
+class PollScheduler:
+    """
+    Paces a polling loop. While reads return events it never sleeps, so a
+    burst is drained at full speed; after an empty read it sleeps
+    `min_sleep`, doubling with every further empty read up to `max_latency`.
+    An event written while the reader is idle is therefore picked up within
+    `max_latency` seconds, and an idle reader costs a handful of polls per
+    second. Sources that know when their next event is due (replay,
+    synthetic) can shorten the sleep through `hint`.
+    """
+
+    def __init__(self, max_latency=MAX_DETECTION_LATENCY, min_sleep=MIN_IDLE_SLEEP, factor=BACKOFF_FACTOR):
+        self.max_latency = max_latency
+        self.min_sleep = min(min_sleep, max_latency)
+        self.factor = factor
+        self.polls = 0
+        self.empty_polls = 0
+        self.events = 0
+        self.events_per_sec = 0.0
+        self._delay = 0.0
+        self._last_poll = None
+
+    def next_delay(self, n_events, hint=None):
+        """Records one poll that returned `n_events` and returns how long to sleep."""
+        now = time.monotonic()
+        if self._last_poll is not None and now > self._last_poll:
+            rate = n_events / (now - self._last_poll)
+            self.events_per_sec += RATE_SMOOTHING * (rate - self.events_per_sec)
+        self._last_poll = now
+        self.polls += 1
+        self.events += n_events
+
+        if n_events:
+            self._delay = 0.0
+            return 0.0
+        self.empty_polls += 1
+        self._delay = min(max(self._delay * self.factor, self.min_sleep), self.max_latency)
+        return self._delay if hint is None else min(self._delay, max(hint, 0.0))
+
+    def failed(self):
+        """Returns the back-off after an error: as long as an idle reader would wait."""
+        self._delay = self.max_latency
+        return self._delay
+
+    def pause(self, n_events, source=None, stop=None):
+        """
+        Sleeps as long as next_delay() says. With a threading.Event `stop`
+        the sleep ends early when it is set; returns True in that case.
+        """
+        delay = self.next_delay(n_events, getattr(source, 'idle_sleep', None))
+        if stop is not None:
+            return stop.wait(delay) if delay else stop.is_set()
+        if delay:
+            time.sleep(delay)
+        return False
+
+    def stats(self):
+        return {
+            'polls': self.polls,
+            'empty_polls': self.empty_polls,
+            'events': self.events,
+            'events_per_sec': self.events_per_sec,
+            'idle_delay_ms': self._delay * 1000,
+        }
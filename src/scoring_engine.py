@@ -0,0 +1,378 @@
+# src/scoring_engine.py
+
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from functools import partial
+
+from src.event_sources import event_message
+from src.metrics import (ANOMALIES, BATCH_SIZE, DETECTION_LATENCY, EVENTS_IN, EVENTS_SCORED, QUEUE_DEPTH,
+                         RULE_DECISIONS, STAGE_SECONDS, TEMPLATE_HITS)
+from src.normalize import clean_message
+from src.rules import RuleEngine
+
+# score is the model's decision_function value (negative means the model
+# flags the message, 0.0 when a rule decided without it); keyword is what
+# the deciding rule matched and rule its name, both None for model verdicts.
+# Rate detector findings look like rule verdicts: rule is the finding
+# ('rate-spike' or 'new-source-event') and keyword describes it.
+Verdict = namedtuple('Verdict', ['is_anomaly', 'score', 'keyword', 'rule'], defaults=[None])
+
+# Metric children used on every event, looked up once
+_MODEL_ANOMALIES = ANOMALIES.labels(decided_by='model')
+_RULE_ANOMALIES = ANOMALIES.labels(decided_by='rule')
+_RATE_ANOMALIES = ANOMALIES.labels(decided_by='rate')
+_RULE_DECISIONS = {action: RULE_DECISIONS.labels(action=action) for action in ('alert', 'ignore')}
+_CLEAN_SECONDS = STAGE_SECONDS.labels(stage='clean')
+_FEATURIZE_SECONDS = STAGE_SECONDS.labels(stage='featurize')
+_SCORE_SECONDS = STAGE_SECONDS.labels(stage='score')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted sequence (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ScoringEngine:
+    """
+    Accumulates messages from any monitor into micro-batches and scores each
+    batch with one vectorized transform + decision_function call.
+
+    A batch is flushed when it reaches `batch_size` messages or when its
+    oldest message has waited `max_latency` seconds, whichever comes first.
+    Callers get a Future per message that resolves to a Verdict.
+
+    Messages a rule decides (see src/rules.py) resolve immediately without
+    the model. With a TemplateVerdictCache, messages whose log template has
+    already been scored also resolve immediately from the cache, and ones
+    whose template is still being scored wait for that score. With a
+    RateDetector (see src/rate_detector.py) every event with a source is
+    also counted, and one that makes a rate spike or is the first of its
+    Source/EventID resolves as an anomaly unless a rule decided it.
+    score_events() runs the same steps synchronously for callers that batch
+    events themselves (the shard workers in src/sharded.py).
+
+    `workers` threads pull batches from the same queue, so several monitors
+    can share one model copy; the vectorizer and forest release the GIL for
+    part of each batch, letting a busy host use more than one core.
+    """
+
+    def __init__(self, model, keywords=None, batch_size=256, max_latency=0.05,
+                 max_queue=10000, stats_window=10000, clean=clean_message,
+                 template_cache=None, workers=1, rules=None, rate_detector=None):
+        self.model = model
+        self.clean = clean
+        self.template_cache = template_cache
+        self.rate_detector = rate_detector
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        # A bare keyword alternation still works: it becomes a single alert rule
+        self.rules = rules if rules is not None or not keywords else RuleEngine.from_keywords(keywords)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.workers = max(1, workers)
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self._model_generation = 0
+
+        # --- Stats ---
+        self.batches = 0
+        self.events_scored = 0
+        self.anomalies = 0
+        self.rule_decisions = 0
+        self.rate_findings = 0
+        self._batch_sizes = deque(maxlen=stats_window)
+        self._latencies = deque(maxlen=stats_window)
+
+    def start(self):
+        QUEUE_DEPTH.set_function(self._queue.qsize)
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._run, name=f'scoring-engine-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Flushes everything already submitted, then stops the workers."""
+        if self._threads:
+            # One sentinel per worker; each worker exits on the first it sees
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def swap_model(self, model):
+        """Replaces the model; a batch already being scored finishes on the old one."""
+        self.model = model
+        self._model_generation += 1
+        if self.template_cache is not None:
+            self.template_cache.clear()
+
+    def submit(self, message, source=None, event_id=None, seen=None, block=True):
+        """
+        Queues one raw message for scoring; blocks if the queue is full, or
+        raises queue.Full with block=False.
+        `source` and `event_id` let Source/EventID rules see the event;
+        `seen` is its timestamp for the rate detector (default: now).
+        """
+        future = Future()
+        EVENTS_IN.inc()
+        verdict, template_id = self._decide(message, source, event_id, seen)
+        if verdict is not None:
+            future.set_result(verdict)
+        elif not self._join(message, template_id, future):
+            try:
+                self._queue.put((message, future, time.perf_counter(), template_id), block)
+            except queue.Full as e:
+                # Misses of the same template that joined this one must not wait forever
+                self._fail([(message, future, template_id)], e)
+                raise
+        return future
+
+    def score_events(self, events):
+        """
+        Scores (message, source, event_id, seen) tuples synchronously, with
+        the same rate, rule and template-cache steps as submit() and one
+        model call for the rest. Returns Verdicts in order.
+        """
+        EVENTS_IN.inc(len(events))
+        verdicts, leaders = [], []
+        for message, source, event_id, seen in events:
+            verdict, template_id = self._decide(message, source, event_id, seen)
+            if verdict is None:
+                verdict = Future()
+                if not self._join(message, template_id, verdict):
+                    leaders.append((message, verdict, template_id))
+            verdicts.append(verdict)
+        if leaders:
+            try:
+                scored = self._score_messages([message for message, _, _ in leaders])
+            except Exception as e:
+                self._fail(leaders, e)
+                raise
+            with self._stats_lock:
+                self.events_scored += len(scored)
+                self.anomalies += sum(1 for verdict in scored if verdict.is_anomaly)
+            for (_, future, template_id), verdict in zip(leaders, scored):
+                self._resolve(future, template_id, verdict, cache=True)
+        return [verdict.result() if isinstance(verdict, Future) else verdict for verdict in verdicts]
+
+    def _join(self, message, template_id, future):
+        """True if `future` will resolve from a score already in flight for the same template."""
+        if self.template_cache is None:
+            return False
+        leader = self.template_cache.claim(template_id, future)
+        if leader is None:
+            return False
+        TEMPLATE_HITS.inc()
+        leader.add_done_callback(partial(self._follow, message=message, future=future))
+        return True
+
+    def _follow(self, leader, message, future):
+        if leader.exception() is not None:
+            future.set_exception(leader.exception())
+            return
+        verdict = self._verdict(message, leader.result().score)
+        if verdict.is_anomaly:
+            _MODEL_ANOMALIES.inc()
+            with self._stats_lock:
+                self.anomalies += 1
+        future.set_result(verdict)
+
+    def _resolve(self, future, template_id, verdict, cache):
+        if self.template_cache is not None:
+            if cache:
+                self.template_cache.store(template_id, verdict.score)
+            self.template_cache.release(template_id, future)
+        future.set_result(verdict)
+
+    def _fail(self, items, error):
+        for _, future, template_id in items:
+            if self.template_cache is not None:
+                self.template_cache.release(template_id, future)
+            future.set_exception(error)
+
+    def _decide(self, message, source, event_id, seen):
+        """(Verdict, None) when a rate finding, rule or cached template decides; else (None, template id)."""
+        finding = None
+        if self.rate_detector is not None and source is not None:
+            # Counted before the rules so ignored events still shape the rates
+            finding = self.rate_detector.observe(source, event_id, seen)
+        if self.rules is not None:
+            decision = self.rules.match(message, source, event_id)
+            if decision is not None:
+                verdict = self._decided(decision)
+                with self._stats_lock:
+                    self.rule_decisions += 1
+                    self.anomalies += verdict.is_anomaly
+                return verdict, None
+
+        if finding is not None:
+            rule, detail = finding
+            _RATE_ANOMALIES.inc()
+            with self._stats_lock:
+                self.rate_findings += 1
+                self.anomalies += 1
+            return Verdict(True, 0.0, detail, rule), None
+
+        template_id = None
+        if self.template_cache is not None:
+            template_id, score = self.template_cache.lookup(message)
+            if score is not None:
+                TEMPLATE_HITS.inc()
+                verdict = self._verdict(message, score)
+                if verdict.is_anomaly:
+                    _MODEL_ANOMALIES.inc()
+                    with self._stats_lock:
+                        self.anomalies += 1
+                return verdict, None
+        return None, template_id
+
+    def score_batch(self, messages):
+        """Scores a list of raw messages synchronously, returning Verdicts."""
+        EVENTS_IN.inc(len(messages))
+        if self.rules is None:
+            return self._score_messages(messages)
+        verdicts = []
+        undecided = []
+        for message in messages:
+            decision = self.rules.match(message)
+            verdicts.append(self._decided(decision) if decision is not None else None)
+            if decision is None:
+                undecided.append(message)
+        scored = iter(self._score_messages(undecided) if undecided else ())
+        return [verdict if verdict is not None else next(scored) for verdict in verdicts]
+
+    def _score_messages(self, messages):
+        """Model-only scoring of messages no rule decided."""
+        start = time.perf_counter()
+        cleaned = [self.clean(m) for m in messages]
+        _CLEAN_SECONDS.observe(time.perf_counter() - start)
+        scores = self._decision_function(cleaned)
+        BATCH_SIZE.observe(len(messages))
+        EVENTS_SCORED.inc(len(messages))
+        verdicts = [self._verdict(message, float(score)) for message, score in zip(messages, scores)]
+        _MODEL_ANOMALIES.inc(sum(1 for verdict in verdicts if verdict.is_anomaly))
+        return verdicts
+
+    def _decision_function(self, cleaned):
+        """The model's decision_function, timing featurization and scoring separately for a Pipeline."""
+        model = self.model
+        steps = getattr(model, 'steps', None)
+        start = time.perf_counter()
+        if not steps or len(steps) < 2:
+            scores = model.decision_function(cleaned)
+            _SCORE_SECONDS.observe(time.perf_counter() - start)
+            return scores
+        # Same calls Pipeline.decision_function makes, with a clock in between
+        features = model[:-1].transform(cleaned)
+        featurized = time.perf_counter()
+        scores = steps[-1][1].decision_function(features)
+        _FEATURIZE_SECONDS.observe(featurized - start)
+        _SCORE_SECONDS.observe(time.perf_counter() - featurized)
+        return scores
+
+    def _verdict(self, message, score):
+        return Verdict(score < 0, score, None)
+
+    @staticmethod
+    def _decided(decision):
+        _RULE_DECISIONS[decision.rule.action].inc()
+        if decision.rule.action == 'alert':
+            _RULE_ANOMALIES.inc()
+        return Verdict(decision.rule.action == 'alert', 0.0, decision.text, decision.rule.name)
+
+    def run(self, source, on_verdict):
+        """
+        Drives the engine from an event source (any iterable of event records).
+        `on_verdict(event, message, verdict)` is called from the worker thread.
+        """
+        def deliver(future, event, message):
+            if future.exception() is None:
+                on_verdict(event, message, future.result())
+
+        self.start()
+        for event in source:
+            message = event_message(event)
+            future = self.submit(message, event.SourceName, event.EventID)
+            future.add_done_callback(partial(deliver, event=event, message=message))
+        self.stop()
+
+    def stats(self):
+        with self._stats_lock:
+            batch_sizes = list(self._batch_sizes)
+            latencies = list(self._latencies)
+        stats = {
+            'batches': self.batches,
+            'events_scored': self.events_scored,
+            'anomalies': self.anomalies,
+            'rule_decisions': self.rule_decisions,
+            'rate_findings': self.rate_findings,
+            'queue_depth': self._queue.qsize(),
+            'mean_batch_size': sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+            'p50_latency_ms': percentile(latencies, 0.50) * 1000,
+            'p99_latency_ms': percentile(latencies, 0.99) * 1000,
+        }
+        if self.template_cache is not None:
+            stats.update(self.template_cache.stats())
+        return stats
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = item[2] + self.max_latency
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        # Past the deadline: take only what is already queued
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        generation = self._model_generation
+        try:
+            verdicts = self._score_messages([message for message, _, _, _ in batch])
+        except Exception as e:
+            self._fail([(message, future, template_id) for message, future, _, template_id in batch], e)
+            return
+
+        now = time.perf_counter()
+        with self._stats_lock:
+            self.batches += 1
+            self.events_scored += len(batch)
+            self.anomalies += sum(1 for verdict in verdicts if verdict.is_anomaly)
+            self._batch_sizes.append(len(batch))
+            self._latencies.extend(now - submitted for _, _, submitted, _ in batch)
+        for _, _, submitted, _ in batch:
+            DETECTION_LATENCY.observe(now - submitted)
+        for (_, future, _, template_id), verdict in zip(batch, verdicts):
+            self._resolve(future, template_id, verdict, cache=generation == self._model_generation)
@@ -0,0 +1,490 @@
+# src/sharded.py
+# Sharded detection: one reader process splits the events of a source by
+# (Source, EventID) into N scoring processes, each with a memory-mapped copy
+# of the model, and this process puts their verdicts back in record order.
+# Events and verdicts travel through shared-memory rings, not pickled queues.
+#   python -m src.sharded synthetic:1000000 --shards 4
+#   python -m src.main --source replay:live_anomalies.csv --shards 4
+
+import argparse
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+import zlib
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.event_sources import event_message, event_seconds, open_source
+from src.mmap_model import export_mmap_model, load_mmap_model
+from src.rate_detector import RateDetector
+from src.rules import RuleEngine
+from src.scheduler import MAX_DETECTION_LATENCY, PollScheduler
+from src.scoring_engine import ScoringEngine, Verdict
+from src.structured_log import get_logger
+from src.template_miner import TemplateVerdictCache
+
+# --- Configuration ---
+SHARDS = os.cpu_count() or 1
+RING_BYTES = 1 << 22         # Data bytes per ring (4 MiB), one ring each way per shard
+MAX_IN_FLIGHT = 65536        # Events the reader may get ahead of the ordered output (>= READ_BATCH_SIZE)
+READ_BATCH_SIZE = 4096       # Events the reader numbers and routes at a time
+SHARD_CACHE_SIZE = 100000    # Source/EventID -> shard lookups the reader keeps before starting over
+SHARD_BATCH_SIZE = 512       # Events per ring record and per model call in a shard
+SPIN_CHECKS = 50             # Empty polls that only yield the CPU before a poller starts sleeping
+MAX_IDLE_SLEEP = 0.001       # Longest sleep between polls of an empty ring
+START_METHOD = 'spawn'       # Children start clean (no inherited threads) and it works on Windows
+
+_HEADER = 192  # Write position, read position and capacity, each on its own cache line
+_LENGTH = struct.Struct('<I')
+
+# An event batch (reader -> shard) is a count, then per-event columns (seq,
+# event id, timestamp and the character lengths of source and message) and
+# the concatenated UTF-8 text of all sources, then all messages.
+_COUNT = struct.Struct('<I')
+_EVENT_COLUMNS = (('seq', '<u8'), ('event_id', '<i8'), ('seen', '<f8'), ('source_length', '<u4'),
+                  ('message_length', '<u4'))
+# A verdict batch (shard -> merger) is a count and an anomaly count, one
+# VERDICT_DTYPE row per event, then each anomaly's event id, timestamp and
+# string lengths followed by its source, message, rule and keyword.
+_VERDICT_COUNTS = struct.Struct('<II')
+VERDICT_DTYPE = np.dtype([('seq', '<u8'), ('flags', 'u1'), ('score', '<f8')])
+_DETAIL = struct.Struct('<qdHIHI')
+_ANOMALY, _HAS_RULE, _HAS_KEYWORD = 1, 2, 4
+
+# One anomaly, with the event it was raised for
+ShardVerdict = namedtuple('ShardVerdict', ['seq', 'source', 'event_id', 'message', 'seen', 'verdict'])
+# The verdicts of records first_seq, first_seq + 1, ... as arrays, plus the
+# anomalies among them in record order
+VerdictBatch = namedtuple('VerdictBatch', ['first_seq', 'is_anomaly', 'scores', 'anomalies'])
+
+log = get_logger('sharded')
+
+
+class ShmRing:
+    """
+    Single-producer, single-consumer ring of length-prefixed byte records in
+    a SharedMemory block. The header holds the total bytes ever written and
+    read; each side only advances its own counter, after copying the data.
+    Both counters are read and written under a multiprocessing lock, whose
+    acquire and release are full memory barriers, so the consumer never
+    sees a counter before the bytes it covers on any CPU (ARM included).
+    The lock is only held for a counter access, once per batch of records,
+    never while copying. A reader always sees whole records.
+
+    Create one with `ShmRing(capacity=...)` and pass it to a child process
+    as an argument (it pickles as its name and lock); the creator unlinks
+    it on close().
+    """
+
+    def __init__(self, name=None, capacity=RING_BYTES, lock=None):
+        self.owner = name is None
+        if self.owner:
+            self.shm = SharedMemory(create=True, size=_HEADER + capacity)
+            lock = multiprocessing.get_context(START_METHOD).Lock()
+        else:
+            # Child processes share the creator's resource tracker, so attaching adds no second owner
+            self.shm = SharedMemory(name=name)
+        self.name = self.shm.name
+        self._lock = lock
+        # Written by one side, read by the other: separate cache lines
+        self._written = np.ndarray(1, np.uint64, self.shm.buf, 0)
+        self._read = np.ndarray(1, np.uint64, self.shm.buf, 64)
+        self._capacity = np.ndarray(1, np.uint64, self.shm.buf, 128)
+        if self.owner:
+            self._capacity[0] = capacity
+        self.capacity = int(self._capacity[0])
+        self._data = self.shm.buf[_HEADER:_HEADER + self.capacity]
+
+    def __reduce__(self):
+        return ShmRing, (self.name, self.capacity, self._lock)
+
+    def close(self):
+        del self._written, self._read, self._capacity
+        self._data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def _load(self, counter):
+        with self._lock:
+            return int(counter[0])
+
+    def _publish(self, counter, value):
+        with self._lock:
+            counter[0] = value
+
+    def put(self, records):
+        """Appends records (bytes), waiting for the consumer to make room."""
+        framed = [_LENGTH.pack(len(record)) + record for record in records]
+        idle = 0
+        start = 0
+        while start < len(framed):
+            written = int(self._written[0])  # Only this side writes it
+            free = self.capacity - (written - self._load(self._read))
+            end, size = start, 0
+            while end < len(framed) and size + len(framed[end]) <= free:
+                size += len(framed[end])
+                end += 1
+            if end == start:
+                if len(framed[start]) > self.capacity:
+                    raise ValueError(f"A {len(framed[start])} byte record can't fit a {self.capacity} byte ring")
+                idle = pause(idle)
+                continue
+            self._copy_in(written, b''.join(framed[start:end]))
+            self._publish(self._written, written + size)
+            start, idle = end, 0
+
+    def get(self):
+        """Takes every complete record written so far (possibly none)."""
+        read = int(self._read[0])  # Only this side writes it
+        available = self._load(self._written) - read
+        if not available:
+            return []
+        blob = self._copy_out(read, available)
+        records, offset = [], 0
+        while offset < available:
+            length, = _LENGTH.unpack_from(blob, offset)
+            offset += _LENGTH.size
+            records.append(blob[offset:offset + length])
+            offset += length
+        self._publish(self._read, read + available)
+        return records
+
+    def _copy_in(self, position, data):
+        at = position % self.capacity
+        first = min(len(data), self.capacity - at)
+        self._data[at:at + first] = data[:first]
+        if first < len(data):
+            self._data[:len(data) - first] = data[first:]
+
+    def _copy_out(self, position, size):
+        at = position % self.capacity
+        first = min(size, self.capacity - at)
+        if first == size:
+            return bytes(self._data[at:at + size])
+        return bytes(self._data[at:]) + bytes(self._data[:size - first])
+
+
+def pause(idle):
+    """One poll of an empty ring came back empty: yield, then sleep longer each time. Returns the new count."""
+    time.sleep(0 if idle < SPIN_CHECKS else min(MAX_IDLE_SLEEP, (idle - SPIN_CHECKS + 1) * 0.0001))
+    return idle + 1
+
+
+def shard_of(source, event_id, shards):
+    """The shard for a Source/EventID; stable across processes and runs, unlike hash()."""
+    return zlib.crc32(f"{source}\x1f{event_id}".encode('utf-8')) % shards
+
+
+def _split(text, lengths):
+    ends = np.cumsum(lengths).tolist()
+    return [text[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+
+def encode_events(seqs, sources, event_ids, messages, seen):
+    """One batch record for a shard."""
+    columns = (seqs, event_ids, seen, [len(s) for s in sources], [len(m) for m in messages])
+    arrays = [np.asarray(values, dtype=dtype).tobytes() for values, (_, dtype) in zip(columns, _EVENT_COLUMNS)]
+    text = (''.join(sources) + ''.join(messages)).encode('utf-8', 'surrogatepass')
+    return _COUNT.pack(len(seqs)) + b''.join(arrays) + text
+
+
+def decode_events(record):
+    """(seqs, [(message, source, event_id, seen), ...]) from a batch record, as score_events takes them."""
+    count, = _COUNT.unpack_from(record)
+    offset, columns = _COUNT.size, []
+    for _, dtype in _EVENT_COLUMNS:
+        columns.append(np.frombuffer(record, dtype=dtype, count=count, offset=offset))
+        offset += columns[-1].nbytes
+    seqs, event_ids, seen, source_lengths, message_lengths = columns
+    text = record[offset:].decode('utf-8', 'surrogatepass')
+    split = int(source_lengths.sum())
+    sources = _split(text[:split], source_lengths)
+    messages = _split(text[split:], message_lengths)
+    return seqs, list(zip(messages, sources, event_ids.tolist(), seen.tolist()))
+
+
+def encode_verdicts(seqs, events, verdicts):
+    """One verdict batch record for the merger; only anomalies carry their event's text."""
+    rows = np.empty(len(verdicts), dtype=VERDICT_DTYPE)
+    rows['seq'] = seqs
+    rows['flags'] = [
+        (_ANOMALY if v.is_anomaly else 0) | (_HAS_RULE if v.rule is not None else 0)
+        | (_HAS_KEYWORD if v.keyword is not None else 0)
+        for v in verdicts
+    ]
+    rows['score'] = [v.score for v in verdicts]
+    details = []
+    for (message, source, event_id, seen), verdict in zip(events, verdicts):
+        if verdict.is_anomaly:
+            strings = [s.encode('utf-8', 'surrogatepass')
+                       for s in (source, message, verdict.rule or '', verdict.keyword or '')]
+            details.append(_DETAIL.pack(event_id, seen, *map(len, strings)) + b''.join(strings))
+    return _VERDICT_COUNTS.pack(len(verdicts), len(details)) + rows.tobytes() + b''.join(details)
+
+
+def decode_verdicts(record):
+    """(VERDICT_DTYPE rows, [ShardVerdict for each anomaly row, in row order])."""
+    count, _ = _VERDICT_COUNTS.unpack_from(record)
+    offset = _VERDICT_COUNTS.size
+    rows = np.frombuffer(record, dtype=VERDICT_DTYPE, count=count, offset=offset)
+    offset += rows.nbytes
+    found = []
+    for row in rows[rows['flags'] & _ANOMALY != 0].tolist():
+        seq, flags, score = row
+        event_id, seen, *lengths = _DETAIL.unpack_from(record, offset)
+        offset += _DETAIL.size
+        strings = []
+        for length in lengths:
+            strings.append(record[offset:offset + length].decode('utf-8', 'surrogatepass'))
+            offset += length
+        source, message, rule, keyword = strings
+        verdict = Verdict(True, score, keyword if flags & _HAS_KEYWORD else None,
+                          rule if flags & _HAS_RULE else None)
+        found.append(ShardVerdict(seq, source, event_id, message, seen, verdict))
+    return rows, found
+
+
+def read_events(spec, options, inboxes, emitted, stop):
+    """
+    Reader process: reads the source, numbers its events and hands each to
+    the shard of its Source/EventID, staying at most MAX_IN_FLIGHT events
+    ahead of the ordered output. Once `stop` is set it reads nothing more,
+    but every event already numbered is still delivered, so the ordered
+    output never waits on a gap. An empty record tells a shard it is done.
+    """
+    source = open_source(spec, **options)
+    scheduler = PollScheduler(MAX_DETECTION_LATENCY)
+    shard_cache = {}
+    seq = 0
+    try:
+        while not stop.is_set():
+            events = source.read()
+            if not events:
+                if source.exhausted:
+                    break
+                scheduler.pause(0, source)
+                continue
+            for start in range(0, len(events), READ_BATCH_SIZE):
+                seq = route(events[start:start + READ_BATCH_SIZE], seq, inboxes, shard_cache, emitted, stop)
+            scheduler.pause(len(events), source)
+    finally:
+        for inbox in inboxes:
+            inbox.put([b''])
+            inbox.close()
+        source.close()
+
+
+def route(events, seq, inboxes, shard_cache, emitted, stop):
+    """Numbers events from `seq` on and puts each shard's share in its inbox. Returns the next seq."""
+    idle = 0
+    while seq + len(events) - emitted.value > MAX_IN_FLIGHT:
+        if stop.is_set():
+            return seq  # Stopping: these were never numbered, so nothing waits for them
+        idle = pause(idle)
+
+    batches = [([], [], [], [], []) for _ in inboxes]
+    for event in events:
+        key = event.SourceName, event.EventID
+        shard = shard_cache.get(key)
+        if shard is None:
+            if len(shard_cache) >= SHARD_CACHE_SIZE:
+                shard_cache.clear()
+            shard = shard_cache[key] = shard_of(event.SourceName, event.EventID, len(inboxes))
+        seqs, sources, event_ids, messages, seen = batches[shard]
+        seqs.append(seq)
+        sources.append(event.SourceName)
+        event_ids.append(event.EventID)
+        messages.append(event_message(event))
+        seen.append(event_seconds(event))
+        seq += 1
+    for inbox, batch in zip(inboxes, batches):
+        if batch[0]:
+            inbox.put([encode_events(*(column[start:start + SHARD_BATCH_SIZE] for column in batch))
+                       for start in range(0, len(batch[0]), SHARD_BATCH_SIZE)])
+    return seq
+
+
+def score_shard(model_path, inbox, outbox, rate_detection, template_cache):
+    """
+    Shard process: scores its events in batches with its own engine (rules,
+    template cache and rate detector for the Source/EventIDs it owns) and
+    returns one verdict per event, in the order it received them.
+    """
+    engine = ScoringEngine(
+        load_mmap_model(model_path), rules=RuleEngine.from_config(),
+        template_cache=TemplateVerdictCache() if template_cache else None,
+        rate_detector=RateDetector() if rate_detection else None
+    )
+    idle = 0
+    done = False
+    try:
+        while not done:
+            records = inbox.get()
+            if not records:
+                idle = pause(idle)
+                continue
+            idle = 0
+            if not records[-1]:
+                done = True
+                records.pop()
+            for record in records:
+                seqs, events = decode_events(record)
+                outbox.put([encode_verdicts(seqs, events, engine.score_events(events))])
+        outbox.put([b''])
+    finally:
+        inbox.close()
+        outbox.close()
+
+
+class ShardedDetector:
+    """
+    Scores one source (an open_source spec) with `shards` processes. The
+    reader process routes every event of a Source/EventID to the same
+    shard, so each shard's rate detector sees a key's whole stream. run()
+    hands the verdicts to `on_verdicts(VerdictBatch)` in record order.
+
+    The model is written once as an uncompressed artifact that every shard
+    memory-maps (src/mmap_model.py), so the shards share its pages. Rule
+    changes and model promotions are picked up on the next start, not hot.
+    """
+
+    def __init__(self, spec, model, shards=SHARDS, source_options=None, rate_detection=True,
+                 template_cache=True, ring_bytes=RING_BYTES):
+        self.spec = spec
+        self.model = model
+        self.shards = shards
+        self.source_options = source_options or {}
+        self.rate_detection = rate_detection
+        self.template_cache = template_cache
+        self.ring_bytes = ring_bytes
+        self.events = 0
+        self.anomalies = 0
+
+    def run(self, on_verdicts, on_idle=None, seconds=None):
+        """
+        Runs until the source is exhausted, `seconds` pass (counted from
+        the start, process startup included) or the caller is interrupted; `on_idle()` is called whenever no verdict is waiting.
+        Returns the number of records scored.
+        """
+        context = multiprocessing.get_context(START_METHOD)
+        emitted = context.RawValue('Q', 0)
+        stop = context.Event()
+        inboxes = [ShmRing(capacity=self.ring_bytes) for _ in range(self.shards)]
+        outboxes = [ShmRing(capacity=self.ring_bytes) for _ in range(self.shards)]
+        processes = []
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = export_mmap_model(self.model, os.path.join(tmp, 'model.joblib'))
+            try:
+                processes = [
+                    context.Process(target=score_shard, name=f'shard-{n}', daemon=True,
+                                    args=(model_path, inbox, outbox, self.rate_detection,
+                                          self.template_cache))
+                    for n, (inbox, outbox) in enumerate(zip(inboxes, outboxes))
+                ]
+                processes.append(context.Process(
+                    target=read_events, name='shard-reader', daemon=True,
+                    args=(self.spec, self.source_options, inboxes, emitted, stop)
+                ))
+                for process in processes:
+                    process.start()
+                deadline = time.monotonic() + seconds if seconds is not None else None
+                self._merge(outboxes, processes, emitted, stop, deadline, on_verdicts, on_idle)
+            finally:
+                stop.set()
+                for process in processes:
+                    process.join(timeout=10)
+                    if process.is_alive():
+                        process.terminate()
+                for ring in inboxes + outboxes:
+                    ring.close()
+        return self.events
+
+    def _merge(self, outboxes, processes, emitted, stop, deadline, on_verdicts, on_idle):
+        """
+        Delivers verdicts in record order until every shard has sent its end
+        record. Verdicts land in a MAX_IN_FLIGHT-slot window indexed by seq;
+        each pass hands over the run of filled slots after the last one
+        delivered, so normal verdicts never become Python objects.
+        """
+        window = MAX_IN_FLIGHT
+        filled = np.zeros(window, dtype=bool)
+        flags = np.zeros(window, dtype=np.uint8)
+        scores = np.zeros(window)
+        anomalies = {}
+        open_shards = set(range(len(outboxes)))
+        idle = 0
+        while open_shards:
+            received = False
+            for shard in tuple(open_shards):
+                for record in outboxes[shard].get():
+                    if not record:
+                        open_shards.discard(shard)
+                        continue
+                    rows, found = decode_verdicts(record)
+                    slots = rows['seq'] % window
+                    filled[slots] = True
+                    flags[slots] = rows['flags']
+                    scores[slots] = rows['score']
+                    for anomaly in found:
+                        anomalies[anomaly.seq] = anomaly
+                    received = True
+
+            start = self.events % window
+            # The record window is a ring too: the run may continue from slot 0
+            ready = _run_length(filled[start:])
+            if ready == window - start:
+                ready += _run_length(filled[:start])
+            if ready:
+                slots = (start + np.arange(ready)) % window
+                is_anomaly = flags[slots] & _ANOMALY != 0
+                found = [anomalies.pop(self.events + int(i)) for i in np.flatnonzero(is_anomaly)]
+                batch = VerdictBatch(self.events, is_anomaly, scores[slots], found)
+                filled[slots] = False
+                self.events += ready
+                self.anomalies += len(found)
+                emitted.value = self.events
+                on_verdicts(batch)
+            if received or ready:
+                idle = 0
+                continue
+
+            if on_idle is not None:
+                on_idle()
+            if deadline is not None and time.monotonic() >= deadline:
+                stop.set()  # The reader winds down and the shards drain what they were given
+            dead = [p.name for p in processes if p.exitcode not in (None, 0)]
+            if dead:
+                raise RuntimeError(f"Shard process(es) {', '.join(dead)} exited abnormally")
+            idle = pause(idle)
+
+
+def _run_length(filled):
+    """Leading True values in a bool array."""
+    return len(filled) if filled.all() else int(np.argmin(filled))
+
+
+if __name__ == '__main__':
+    from src.model_registry import MODEL_PATH, load_current_model
+
+    parser = argparse.ArgumentParser(description='Score one event source with several shard processes.')
+    parser.add_argument('source', help='windows:<log>, file:<path>, replay:<csv> or synthetic:[count]')
+    parser.add_argument('--shards', type=int, default=SHARDS)
+    parser.add_argument('--seconds', type=float, default=None, help='stop after this long')
+    args = parser.parse_args()
+
+    model, version = load_current_model(fallback_path=MODEL_PATH)
+    options = {'speed': 0} if args.source.startswith('replay:') else {}
+    detector = ShardedDetector(args.source, model, args.shards, source_options=options)
+    start = time.perf_counter()
+    try:
+        detector.run(lambda batch: None, seconds=args.seconds)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"📊 {detector.events} events scored by {args.shards} shard(s) in {elapsed:.1f}s "
+          f"({detector.events / elapsed:,.0f} events/s), {detector.anomalies} anomalies")
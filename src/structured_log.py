@@ -0,0 +1,173 @@
+# src/structured_log.py
+# Logging for the monitors: records go through a bounded queue to a
+# background writer, so a slow console or pipe never blocks detection, and
+# anomaly alerts are rate-limited per source with periodic summaries.
+#   python -m src.main --log-format json --log-file data/monitor.jsonl --log-level INFO
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from src.metrics import REGISTRY
+
+# --- Configuration ---
+LOGGER_NAME = 'logmon'
+LOG_LEVEL = 'INFO'
+LOG_FORMAT = 'text'       # or 'json' (one JSON object per line)
+LOG_QUEUE_SIZE = 10000    # Records waiting for the writer; beyond this new records are dropped
+ALERT_WINDOW = 10.0       # Seconds per alert summary window
+ALERTS_PER_WINDOW = 5     # Anomalies per source logged in full each window before summarizing
+
+LOG_RECORDS_DROPPED = REGISTRY.counter('logmon_log_records_dropped_total', 'Log records dropped on a full queue')
+
+_listener = None
+_handler = None
+
+
+def get_logger(name=None):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """A QueueHandler that drops (and counts) records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message plus any `extra={'fields': {...}}`."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, path=None, stream=None, queue_size=LOG_QUEUE_SIZE):
+    """
+    Routes the 'logmon' loggers through a DroppingQueueHandler to a writer
+    thread that prints to `stream` (stdout by default) or appends to `path`.
+    Text format keeps the plain console messages; json writes JSON lines.
+    Calling it again replaces the previous setup.
+    """
+    global _listener, _handler
+    shutdown_logging()
+
+    if path:
+        target = logging.FileHandler(path, encoding='utf-8')
+    else:
+        target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter('%(message)s'))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, target, respect_handler_level=True)
+    _listener.start()
+
+    logger = get_logger()
+    logger.handlers = [_handler]
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
+
+
+def shutdown_logging():
+    """Writes out every queued record and stops the writer thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    if _handler.dropped:
+        get_logger().warning(f"⚠️ {_handler.dropped} log records were dropped because output fell behind")
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    get_logger().handlers = []
+    _listener = _handler = None
+
+
+atexit.register(shutdown_logging)
+
+
+def add_logging_arguments(parser):
+    parser.add_argument('--log-level', default=LOG_LEVEL, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    parser.add_argument('--log-format', default=LOG_FORMAT, choices=['text', 'json'])
+    parser.add_argument('--log-file', default=None, help='append log records here instead of stdout')
+
+
+def configure_from_args(args):
+    return configure_logging(args.log_level, args.log_format, args.log_file)
+
+
+class AlertSummarizer:
+    """
+    Logs the first `per_window` anomalies from each source in every
+    `window` seconds in full and only counts the rest; when the window
+    closes it logs one line per noisy source ("412 anomalies from Source X
+    in the last 10s"). Console cost per window is then bounded by the
+    number of sources, not the event rate. Every anomaly still reaches the
+    anomaly sink; this only limits what is logged.
+    """
+
+    def __init__(self, logger=None, window=ALERT_WINDOW, per_window=ALERTS_PER_WINDOW):
+        self.logger = logger or get_logger('alerts')
+        self.window = window
+        self.per_window = per_window
+        self._counts = Counter()
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def report(self, source, event_id, message, reason, channel=None):
+        self.flush_due()
+        with self._lock:
+            self._counts[source] += 1
+            count = self._counts[source]
+        if count > self.per_window:
+            return
+        prefix = f"[{channel}] " if channel else ""
+        self.logger.warning(
+            f"🚨 {prefix}ANOMALY DETECTED! Reason: {reason} | Source: {source} | ID: {event_id} | Message: {message}",
+            extra={'fields': {'event': 'anomaly', 'channel': channel, 'source': source, 'event_id': event_id,
+                              'reason': reason, 'anomaly_message': message}},
+        )
+
+    def flush_due(self):
+        """Closes the window if it has run its length; cheap enough to call on every poll."""
+        if time.monotonic() - self._window_start >= self.window:
+            self.flush()
+
+    def flush(self):
+        """Logs the summaries for the current window and starts a new one."""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            now = time.monotonic()
+            elapsed, self._window_start = now - self._window_start, now
+        for source, count in counts.most_common():
+            if count <= self.per_window:
+                continue
+            self.logger.warning(
+                f"🚨 {count} anomalies from {source} in the last {elapsed:.0f}s "
+                f"({count - self.per_window} not shown individually)",
+                extra={'fields': {'event': 'anomaly_summary', 'source': source, 'count': count,
+                                  'suppressed': count - self.per_window, 'window_s': round(elapsed, 3)}},
+            )
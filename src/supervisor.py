@@ -0,0 +1,306 @@
+# src/supervisor.py
+# Watches several event logs / files in one process: one reader thread per
+# channel, one shared scoring engine (one model copy) sized to the CPU count.
+#   python -m src.supervisor windows:System windows:Application file:data/raw_logs/app.log
+
+import argparse
+import contextlib
+import os
+import threading
+import time
+
+from src.aggregation import AGGREGATION_WINDOW, AnomalyAggregator
+from src.anomaly_sink import AnomalySink
+from src.dedup import DedupStore, DeferredCheckpoint
+from src.event_sources import FileTailSource, WindowsEventLogSource, event_message, event_seconds, open_source
+from src.metrics import DUPLICATES, EVENTS_READ, serve_metrics
+from src.model_registry import MODEL_PATH, ModelWatcher, load_current_model
+from src.profiler import profile_hot_loop
+from src.rate_detector import RateDetector
+from src.rules import RuleEngine
+from src.scheduler import MAX_DETECTION_LATENCY, PollScheduler
+from src.scoring_engine import ScoringEngine
+from src.structured_log import AlertSummarizer, add_logging_arguments, configure_from_args, get_logger
+from src.template_miner import TemplateVerdictCache
+
+# --- Configuration ---
+CHANNELS = ['windows:System', 'windows:Application']
+WORKERS = os.cpu_count() or 1
+DEDUP_CHECKPOINT_FILE = 'data/supervisor_dedup.json'
+OFFSETS_FILE = 'data/supervisor_offsets.json'
+LIVE_ANOMALY_LOG_FILE = 'live_anomalies.csv'
+ANOMALY_COLUMNS = ['Timestamp', 'Source', 'EventID', 'Message', 'DetectionReason', 'Count', 'LastSeen']
+STATS_INTERVAL = 30.0
+RATE_DETECTION = True  # Also flag Source/EventID rate spikes and never-seen keys (src/rate_detector.py)
+
+log = get_logger('supervisor')
+
+
+class ChannelMonitor:
+    """
+    Reads one source on its own thread, drops duplicate records, submits the
+    rest to the shared engine and hands anomalies to `on_anomaly(channel,
+    event, message, verdict)`. Keeps its own counters. `lock` is held from
+    reading a batch until its anomalies are reported.
+    """
+
+    def __init__(self, source, engine, on_anomaly, dedup, max_latency=MAX_DETECTION_LATENCY):
+        self.source = source
+        self.name = source.name
+        self.engine = engine
+        self.on_anomaly = on_anomaly
+        self.dedup = dedup
+        self.scheduler = PollScheduler(max_latency)
+        self.events = 0
+        self.duplicates = 0
+        self.anomalies = 0
+        self.errors = 0
+        self.last_event = None
+        self._events_read = EVENTS_READ.labels(channel=self.name)
+        self._duplicates = DUPLICATES.labels(channel=self.name)
+        self._clears = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'channel-{self.name}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _process(self, events):
+        if getattr(self.source, 'clears', 0) != self._clears:
+            # The log was cleared and record numbers restarted
+            self._clears = self.source.clears
+            self.dedup.reset(self.name)
+
+        # Submit the whole read first so it joins the engine's next batch
+        pending = []
+        for event in events:
+            if not self.dedup.is_new(self.name, event.RecordNumber):
+                self.duplicates += 1
+                self._duplicates.inc()
+                continue
+            message = event_message(event)
+            future = self.engine.submit(message, event.SourceName, event.EventID, event_seconds(event))
+            pending.append((event, message, future))
+
+        for event, message, future in pending:
+            verdict = future.result()
+            if verdict.is_anomaly:
+                self.anomalies += 1
+                self.on_anomaly(self.name, event, message, verdict)
+        self.events += len(events)
+        self._events_read.inc(len(events))
+        self.last_event = time.time()
+
+    def _run(self):
+        while not self._stop.is_set() and not self.source.exhausted:
+            try:
+                with self.lock:
+                    events = self.source.read()
+                    if events:
+                        self._process(events)
+                if self.scheduler.pause(len(events), self.source, self._stop):
+                    break
+            except Exception as e:
+                self.errors += 1
+                log.warning(f"⚠️ Channel '{self.name}' failed, retrying. Error: {e}")
+                if self._stop.wait(self.scheduler.failed()):
+                    break
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'duplicates': self.duplicates,
+            'anomalies': self.anomalies,
+            'errors': self.errors,
+            'high_water': self.dedup.high_water(self.name),
+            'last_event': self.last_event,
+        }
+
+
+class Supervisor:
+    """
+    Runs one ChannelMonitor per source spec (see open_source) against a
+    single ScoringEngine and anomaly sink. Windows channels resume after
+    their checkpointed high-water mark and tailed files from their saved
+    offset; replay/synthetic channels start fresh each run. High-water
+    marks and offsets are checkpointed together, and only once the
+    anomalies they cover have left the aggregator and the sink.
+    """
+
+    def __init__(self, specs, model, model_version=None, workers=WORKERS, rules=None,
+                 sink=None, dedup_file=DEDUP_CHECKPOINT_FILE, offsets_file=OFFSETS_FILE,
+                 max_latency=MAX_DETECTION_LATENCY, source_options=None):
+        # One detector for all channels: the same Source/EventID can arrive through several
+        self.rates = RateDetector() if RATE_DETECTION else None
+        self.engine = ScoringEngine(
+            model, rules=rules or RuleEngine.from_config(), template_cache=TemplateVerdictCache(), workers=workers,
+            rate_detector=self.rates
+        )
+        self.watcher = ModelWatcher(self.engine, model_version)
+        self.sink = sink
+        self.alerts = AlertSummarizer()
+        self.aggregator = AnomalyAggregator(self._write_record, AGGREGATION_WINDOW)
+        self.dedup = DedupStore(dedup_file)
+        self.offsets = None
+        if offsets_file:
+            from src.log_monitor import OffsetStore  # watchdog is only needed with file channels
+            self.offsets = OffsetStore(offsets_file)
+        self.monitors = [
+            ChannelMonitor(source, self.engine, self._report, dedup, max_latency)
+            for source, dedup in (self._open(spec, source_options or {}) for spec in specs)
+        ]
+        self._checkpoint = DeferredCheckpoint(self, [self.aggregator] + ([sink] if sink is not None else []))
+
+    def _open(self, spec, options):
+        kind, _, target = spec.partition(':')
+        if kind == 'windows':
+            name = target or 'Application'
+            return WindowsEventLogSource(name, after_record=self.dedup.high_water(name) or None), self.dedup
+        if kind == 'file':
+            # Offsets carry these across restarts; record numbers restart every run
+            return FileTailSource(target, offsets=self.offsets), DedupStore(path=None)
+        return open_source(spec, **options), DedupStore(path=None)
+
+    def _report(self, channel, event, message, verdict):
+        reason = "Model detected anomaly" if verdict.rule is None else f"Rule match ({verdict.rule}): '{verdict.keyword}'"
+        self.alerts.report(event.SourceName, event.EventID, message, reason, channel=channel)
+        self.aggregator.add(event.SourceName, event.EventID, message, reason, event.TimeGenerated.Format())
+
+    def _write_record(self, record):
+        if self.sink is not None:
+            self.sink.write([record.first_seen, record.source, record.event_id, record.message,
+                             record.reason, record.count, record.last_seen])
+
+    def start(self):
+        self.engine.start()
+        self.watcher.start()
+        for monitor in self.monitors:
+            monitor.start()
+        return self
+
+    # save_due(), snapshot() and save() make the supervisor the store its DeferredCheckpoint saves
+    def save_due(self):
+        return self.dedup.save_due()
+
+    def snapshot(self):
+        """High-water marks and offsets at a point where every event read so far has been reported."""
+        with contextlib.ExitStack() as stack:
+            for monitor in self.monitors:
+                stack.enter_context(monitor.lock)
+            return self.dedup.snapshot(), self.offsets.snapshot() if self.offsets is not None else None
+
+    def save(self, state=None):
+        dedup_state, offsets_state = state if state is not None else (None, None)
+        self.dedup.save(dedup_state)
+        if self.offsets is not None:
+            self.offsets.save(offsets_state)
+
+    def stop(self):
+        for monitor in self.monitors:
+            monitor.stop()
+        for monitor in self.monitors:
+            monitor.join()
+            monitor.source.close()
+        self.watcher.stop()
+        self.engine.stop()
+        self.alerts.flush()
+        self.aggregator.flush()
+        if self.sink is not None:
+            self.sink.close()
+            if not self.sink.written_through(self.sink.mark()):
+                log.warning("⚠️ Some anomalies were not written; keeping the previous checkpoint.")
+                return
+        self.save()
+
+    def wait(self, seconds=None, stats_interval=STATS_INTERVAL):
+        """Blocks until every channel is exhausted or `seconds` pass, checkpointing and printing stats."""
+        deadline = time.monotonic() + seconds if seconds is not None else None
+        next_stats = time.monotonic() + stats_interval
+        while any(monitor.alive for monitor in self.monitors):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+            self.alerts.flush_due()
+            self.aggregator.flush_due()
+            self._checkpoint.poll()
+            if time.monotonic() >= next_stats:
+                self.print_stats()
+                next_stats += stats_interval
+
+    def stats(self):
+        return {
+            'channels': {monitor.name: monitor.stats() for monitor in self.monitors},
+            'engine': self.engine.stats(),
+            'aggregation': self.aggregator.stats(),
+            'rates': self.rates.stats() if self.rates is not None else None,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        for name, channel in stats['channels'].items():
+            log.info(f"📊 {name:<24} events {channel['events']:>10} | duplicates {channel['duplicates']:>8} | "
+                     f"anomalies {channel['anomalies']:>8} | errors {channel['errors']}")
+        engine = stats['engine']
+        log.info(f"📊 engine: {engine['events_scored']} scored in {engine['batches']} batches, "
+                 f"p99 {engine['p99_latency_ms']:.1f} ms, queue {engine['queue_depth']}")
+        aggregation = stats['aggregation']
+        log.info(f"📊 anomalies: {aggregation['anomalies']} collapsed into {aggregation['records']} records, "
+                 f"{aggregation['open_groups']} groups open")
+        rates = stats['rates']
+        if rates is not None:
+            log.info(f"📊 rates: {rates['spikes']} spikes, {rates['new_keys']} new keys, "
+                     f"~{rates['distinct_keys']} Source/EventID keys in {rates['memory_bytes'] / 2**20:.0f} MiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monitor several channels with one shared model.')
+    parser.add_argument('channels', nargs='*', default=CHANNELS,
+                        help='source specs: windows:<log>, file:<path>, replay:<csv>, synthetic:[count]')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--seconds', type=float, default=None, help='stop after this long')
+    parser.add_argument('--no-sink', action='store_true', help='log anomalies without saving them')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve Prometheus metrics at http://127.0.0.1:<port>/metrics')
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help='sample the running threads and write folded stacks here on exit')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+
+    configure_from_args(args)
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    profile_hot_loop(args.profile)
+
+    log.info("📡 Initializing multi-channel monitoring...")
+    try:
+        model, version = load_current_model(fallback_path=MODEL_PATH)
+        log.info(f"✅ Model loaded ({version or MODEL_PATH}).")
+    except FileNotFoundError:
+        raise SystemExit(f"❌ Model file not found at {MODEL_PATH}.")
+
+    sink = None if args.no_sink else AnomalySink(LIVE_ANOMALY_LOG_FILE, ANOMALY_COLUMNS)
+    supervisor = Supervisor(args.channels, model, version, workers=args.workers, sink=sink).start()
+    log.info(f"📖 Watching {len(supervisor.monitors)} channel(s) with {args.workers} scoring worker(s)...")
+    try:
+        supervisor.wait(args.seconds)
+    except KeyboardInterrupt:
+        log.info("👋 Monitoring stopped by user.")
+    finally:
+        supervisor.stop()
+        supervisor.print_stats()
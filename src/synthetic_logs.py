@@ -0,0 +1,62 @@
+# src/synthetic_logs.py
+
+import random
+import uuid
+
+# --- Templates modeled on the Windows events seen in live_anomalies.csv ---
+# (level, source, event_id, message template, weight)
+TEMPLATES = [
+    ('Information', 'Razer Central Service', 0, "PowerEvent handled successfully by the service.", 20),
+    ('Information', 'igcc', 0, "PowerEvent handled successfully by the service.", 20),
+    ('Information', 'SamsungQuickShareService', 0, "PowerEvent handled successfully by the service.", 20),
+    ('Information', 'SecurityCenter', 15, "Windows Defender SECURITY_PRODUCT_STATE_ON", 10),
+    ('Information', 'Software Protection Platform Service', 1073758208,
+     "{year}-07-08T13:26:{sec:02d}Z RulesEngine", 10),
+    ('Information', 'Software Protection Platform Service', 16384,
+     "Successfully scheduled Software Protection service for re-start at {year}-07-08T13:26:{sec:02d}Z.", 10),
+    ('Information', 'Microsoft-Windows-Winlogon', 7001,
+     "User Logon Notification for Customer Experience Improvement Program {guid}", 8),
+    ('Warning', 'Microsoft-Windows-DNS-Client', 1014,
+     "Name resolution for the name {host}.example.com timed out after none of the configured DNS servers responded.", 4),
+    ('Error', 'Windows Error Reporting', 1001,
+     "0 LiveKernelEvent Not available 0 1b8 1 0 0 0 10_0_26100 0_0 768_1 "
+     "\\\\?\\C:\\WINDOWS\\LiveKernelReports\\WATCHDOG{num}\\WATCHDOG{num}-20250730-2056.dmp "
+     "\\\\?\\C:\\WINDOWS\\SystemTemp\\WER-{num}-0.sysdata.xml", 2),
+    ('Error', 'VSS', 8229,
+     "0x800423f4, The writer experienced a non-transient error. If the backup process is retried, "
+     "the error is likely to reoccur. Writer Instance ID: {{{guid}}} Process ID: {pid}", 1),
+    ('Error', 'PythonTestEventSource', 777,
+     "A fatal crash has occurred. Application failed unexpectedly.", 1),
+    ('Error', 'Application Error', 1000,
+     "Faulting application name: {exe}, version: 1.0.0.{num}, Exception code: 0xc0000005 "
+     "Faulting module name: KERNELBASE.dll", 1),
+]
+
+HOSTS = ['wpad', 'login', 'telemetry', 'update', 'cdn', 'api', 'mail']
+EXES = ['SOTTR.exe', 'svchost.exe', 'explorer.exe', 'chrome.exe', 'python.exe']
+
+
+def generate_logs(count, seed=42):
+    """
+    Yields `count` deterministic (level, source, event_id, message) tuples.
+    The same seed always produces the same sequence.
+    """
+    rng = random.Random(seed)
+    weights = [t[4] for t in TEMPLATES]
+    remaining = count
+    while remaining > 0:
+        # Draw templates in blocks so huge counts don't build one giant list
+        block = rng.choices(TEMPLATES, weights=weights, k=min(remaining, 10000))
+        remaining -= len(block)
+        for level, source, event_id, message, _ in block:
+            if '{' in message:
+                message = message.format(
+                    year=rng.randint(2025, 2125),
+                    sec=rng.randint(0, 59),
+                    guid=uuid.UUID(int=rng.getrandbits(128)),
+                    host=rng.choice(HOSTS),
+                    num=rng.randint(1000, 99999),
+                    pid=rng.randint(100, 9999),
+                    exe=rng.choice(EXES),
+                )
+            yield level, source, event_id, message
@@ -0,0 +1,174 @@
+# src/template_miner.py
+
+import re
+import threading
+from collections import OrderedDict
+
+# --- Configuration ---
+MASK = '<*>'
+# Tokens with digits or path separators are almost always variable parts
+# (record numbers, GUIDs, dump paths), so they never take part in matching
+_VARIABLE_TOKEN = re.compile(r'[0-9\\/]')
+
+
+class TemplateMiner:
+    """
+    Drain-style log template miner.
+
+    Messages are routed through a fixed-depth prefix tree keyed on token count
+    and the first `depth` tokens, so finding the candidate templates for a
+    message costs O(tokens); only the handful of templates in that leaf are
+    compared position by position.
+    """
+
+    def __init__(self, depth=4, sim_threshold=0.5, max_children=100, max_templates=50000):
+        self.depth = depth
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self._root = {}
+        # template_id -> (tokens, leaf list it lives in), in LRU order
+        self._templates = OrderedDict()
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self._templates)
+
+    def tokens(self, template_id):
+        return self._templates[template_id][0]
+
+    def template(self, template_id):
+        return ' '.join(self.tokens(template_id))
+
+    def add(self, message):
+        """
+        Maps a message to a template. Returns (template_id, changed) where
+        `changed` is True when an existing template had to be generalized.
+        """
+        tokens = [MASK if _VARIABLE_TOKEN.search(t) else t for t in message.split()]
+
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            if token not in node and len(node) >= self.max_children:
+                token = MASK
+            node = node.setdefault(token, {})
+        leaf = node.setdefault(None, [])
+
+        best_id, best_sim = None, -1.0
+        for template_id in leaf:
+            sim = self._similarity(self._templates[template_id][0], tokens)
+            if sim > best_sim:
+                best_id, best_sim = template_id, sim
+
+        if best_id is not None and best_sim >= self.sim_threshold:
+            template, _ = self._templates[best_id]
+            merged = [t if t == tok else MASK for t, tok in zip(template, tokens)]
+            changed = merged != template
+            if changed:
+                self._templates[best_id] = (merged, leaf)
+            self._templates.move_to_end(best_id)
+            return best_id, changed
+
+        template_id = self._next_id
+        self._next_id += 1
+        self._templates[template_id] = (tokens, leaf)
+        leaf.append(template_id)
+        if len(self._templates) > self.max_templates:
+            evicted_id, (_, old_leaf) = self._templates.popitem(last=False)
+            old_leaf.remove(evicted_id)
+        return template_id, False
+
+    @staticmethod
+    def _similarity(template, tokens):
+        if not tokens:
+            return 1.0
+        same = sum(1 for t, tok in zip(template, tokens) if t == tok)
+        return same / len(tokens)
+
+
+class TemplateVerdictCache:
+    """
+    Caches one model score per log template with LRU eviction, so the model
+    only runs for messages whose template hasn't been scored yet. Templates
+    made only of variable tokens carry no text for the model to judge, so
+    they are never cached.
+
+    While a template's first miss is being scored, claim() lets later
+    misses of the same template wait for that score instead of queueing
+    the model again; they count as hits.
+    """
+
+    def __init__(self, miner=None, max_size=10000):
+        self.miner = miner or TemplateMiner()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+        self._pending = {}  # template_id -> Future of the miss being scored for it
+        self._lock = threading.Lock()
+
+    def lookup(self, message):
+        """Returns (template_id, cached score or None); template_id is None if uncacheable."""
+        with self._lock:
+            template_id, changed = self.miner.add(message)
+            if all(t == MASK for t in self.miner.tokens(template_id)):
+                self.misses += 1
+                return None, None
+            if changed:
+                # The template just got more general, so its old score is stale
+                self._scores.pop(template_id, None)
+                self._pending.pop(template_id, None)
+            score = self._scores.get(template_id)
+            if score is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._scores.move_to_end(template_id)
+            return template_id, score
+
+    def store(self, template_id, score):
+        if template_id is None:
+            return
+        with self._lock:
+            self._scores[template_id] = score
+            self._scores.move_to_end(template_id)
+            if len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def claim(self, template_id, future):
+        """
+        After a miss: returns the Future already scoring `template_id`, or
+        records `future` as the one that will and returns None.
+        """
+        if template_id is None:
+            return None
+        with self._lock:
+            pending = self._pending.get(template_id)
+            if pending is None:
+                self._pending[template_id] = future
+                return None
+            self.misses -= 1
+            self.hits += 1
+            return pending
+
+    def release(self, template_id, future):
+        """Ends `future`'s claim once it is scored (after store()) or failed."""
+        with self._lock:
+            if self._pending.get(template_id) is future:
+                del self._pending[template_id]
+
+    def clear(self):
+        """Forgets every cached score, e.g. after the model was replaced."""
+        with self._lock:
+            self._scores.clear()
+            self._pending.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'templates': len(self.miner),
+            'templates_in_flight': len(self._pending),
+            'template_hits': self.hits,
+            'template_misses': self.misses,
+            'template_hit_rate': self.hits / total if total else 0.0,
+        }
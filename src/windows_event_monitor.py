@@ -1,61 +1,59 @@
-# src/windows_event_monitor.py
-
-import win32evtlog
-import win32evtlogutil
-import win32api
-import time
-
-def start_monitoring(callback, log_type='System', server='localhost'):
-    """
-    Monitors the Windows Event Log for new entries.
-    This version is resilient to errors from events that don't have a registered message file.
-    """
-    print(f"Attempting to monitor the '{log_type}' Windows Event Log...")
-    
-    try:
-        log_handle = win32evtlog.OpenEventLog(server, log_type)
-    except Exception as e:
-        print(f"Error opening event log: {e}")
-        print("Please ensure you are running this script with Administrator privileges.")
-        return
-
-    total_records = win32evtlog.GetNumberOfEventLogRecords(log_handle)
-    last_record_read = total_records
-
-    print(f"Monitoring started. Current records: {total_records}. Waiting for new events...")
-
-    try:
-        while True:
-            current_total = win32evtlog.GetNumberOfEventLogRecords(log_handle)
-            
-            if current_total > last_record_read:
-                events = win32evtlog.ReadEventLog(
-                    log_handle, 
-                    win32evtlog.EVENTLOG_SEQUENTIAL_READ | win32evtlog.EVENTLOG_FORWARDS_READ, 
-                    last_record_read
-                )
-
-                for event in events:
-                    full_message = ""
-                    try:
-                        # **TRY** the robust method first
-                        full_message = win32evtlogutil.FormatMessage(event, log_type)
-                    except win32api.error:
-                        # **FALLBACK** if the message file is missing
-                        if event.StringInserts:
-                            full_message = ' '.join(str(s).strip() for s in event.StringInserts)
-                        else:
-                            full_message = "No message string available."
-                    
-                    # Create a single string for the model
-                    formatted_log = f"Source: {event.SourceName} | ID: {event.EventID} | Message: {full_message.strip()}"
-                    callback(formatted_log)
-                
-                last_record_read = current_total
-
-            time.sleep(2) 
-            
-    except KeyboardInterrupt:
-        print("Stopping monitor.")
-    finally:
-        win32evtlog.CloseEventLog(log_handle)
\ No newline at end of file
+# src/windows_event_monitor.py
+
+from src.event_sources import EventRecord, WindowsEventLogSource, event_message
+from src.scheduler import MAX_DETECTION_LATENCY, PollScheduler
+
+try:
+    import win32api
+    import win32evtlogutil
+except ImportError:  # Off Windows only replay/file/synthetic sources can drive the monitor
+    win32api = win32evtlogutil = None
+
+def format_event(event, log_type):
+    """Builds the single "Source | ID | Message" string the model scores."""
+    full_message = None
+    if win32evtlogutil is not None and not isinstance(event, EventRecord):
+        try:
+            # **TRY** the robust method first
+            full_message = win32evtlogutil.FormatMessage(event, log_type)
+        except win32api.error:
+            pass
+    if full_message is None:
+        # **FALLBACK** if the message file is missing (or the record isn't a pywin32 one)
+        full_message = event_message(event) or "No message string available."
+
+    # Create a single string for the model
+    return f"Source: {event.SourceName} | ID: {event.EventID} | Message: {full_message.strip()}"
+
+def start_monitoring(callback, log_type='System', server='localhost', source=None,
+                     max_latency=MAX_DETECTION_LATENCY):
+    """
+    Monitors the Windows Event Log (or any EventSource passed as `source`)
+    for new entries.
+    This version is resilient to errors from events that don't have a registered message file.
+    """
+    print(f"Attempting to monitor the '{log_type if source is None else source.name}' event source...")
+    
+    if source is None:
+        try:
+            source = WindowsEventLogSource(log_type, server=server)
+        except Exception as e:
+            print(f"Error opening event log: {e}")
+            print("Please ensure you are running this script with Administrator privileges.")
+            return
+
+    print("Monitoring started. Waiting for new events...")
+
+    scheduler = PollScheduler(max_latency)
+    try:
+        while not source.exhausted:
+            events = source.read()
+            for event in events:
+                callback(format_event(event, log_type))
+
+            scheduler.pause(len(events), source)
+            
+    except KeyboardInterrupt:
+        print("Stopping monitor.")
+    finally:
+        source.close()
@@ -0,0 +1,10 @@
+# tests/conftest.py
+# The modules import each other as `src.x`, as when run with `python -m src.x`
+# from the repo root; make that work however pytest is started.
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,172 @@
+# tests/test_anomaly_store.py
+# The store's answers must equal a brute-force pass over the rows it was
+# given: top_sources() through its rollup buckets, history() page by page,
+# and both again after purge().
+
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from src.anomaly_store import ROLLUP_SECONDS, AnomalyStore, decode_cursor, parse_anomaly_row
+
+SOURCES = ['Application', 'DNS-Client', 'Disk', 'Service Control Manager', 'WinRM']
+START = 1_700_000_000.0 - 1_700_000_000.0 % ROLLUP_SECONDS  # A bucket boundary
+SPAN = 40 * ROLLUP_SECONDS
+
+
+def sink_rows(count, seed=7):
+    """main.py-layout rows (Timestamp, Source, EventID, Message, Reason, Count, LastSeen), some sharing a timestamp."""
+    rng = random.Random(seed)
+    rows = []
+    for n in range(count):
+        ts = START + rng.randrange(SPAN) + (rng.random() if n % 3 else 0.0)
+        if rows and n % 10 == 0:
+            ts = rows[-1][0]  # Ties are broken by id
+        rows.append((ts, rng.choice(SOURCES), rng.choice([1000, 1014, 7034]), f'message {n}', 'model',
+                     rng.choice([1, 1, 2, 5]), ts + 1))
+    return rows
+
+
+@pytest.fixture
+def stored(tmp_path):
+    rows = sink_rows(2000)
+    store = AnomalyStore(str(tmp_path / 'anomalies.db'), retention_days=None)
+    assert store.add(rows[:1200]) == 1200
+    assert store.add(rows[1200:]) == 800
+    yield store, rows
+    store.close()
+
+
+def expected_top(rows, since, until=None, limit=10):
+    anomalies, records = Counter(), Counter()
+    for ts, source, _, _, _, count, _ in rows:
+        if ts >= since and (until is None or ts < until):
+            anomalies[source] += count
+            records[source] += 1
+    ranked = sorted(anomalies, key=lambda source: (-anomalies[source], source))[:limit]
+    return [(source, anomalies[source], records[source]) for source in ranked]
+
+
+def expected_history(rows, since=None, source=None, event_id=None):
+    """(id, ts) newest first; ids count from 1 in insertion order."""
+    matching = [
+        (row_id, row[0]) for row_id, row in enumerate(rows, start=1)
+        if (since is None or row[0] >= since) and source in (None, row[1]) and event_id in (None, row[2])
+    ]
+    return sorted(matching, key=lambda item: (item[1], item[0]), reverse=True)
+
+
+def all_pages(store, limit, **filters):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = store.history(limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        rows += page
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def rollups(store):
+    return sorted(store._connection().execute("SELECT bucket, source, anomalies, records FROM source_counts"))
+
+
+def rollups_from_rows(store):
+    return sorted(store._connection().execute(
+        f"SELECT CAST(ts / {ROLLUP_SECONDS} AS INTEGER), source, SUM(count), COUNT(*) FROM anomalies "
+        "GROUP BY 1, 2"
+    ))
+
+
+@pytest.mark.parametrize('since, until', [
+    (START, None),                                             # Everything
+    (START + 0.5 * ROLLUP_SECONDS, START + 7.25 * ROLLUP_SECONDS),  # Partial buckets at both ends
+    (START + 3 * ROLLUP_SECONDS, START + 9 * ROLLUP_SECONDS),     # Whole buckets only
+    (START + 3 * ROLLUP_SECONDS, START + 9.5 * ROLLUP_SECONDS),
+    (START + 2.9 * ROLLUP_SECONDS, START + 3.1 * ROLLUP_SECONDS),  # Across one boundary
+    (START + 4.1 * ROLLUP_SECONDS, START + 4.6 * ROLLUP_SECONDS),  # Inside one bucket
+    (START + 11.3 * ROLLUP_SECONDS, None),                        # Open-ended from a partial bucket
+    (START + SPAN + 60, None),                                    # After the last row
+])
+def test_top_sources_matches_the_rows(stored, since, until):
+    store, rows = stored
+    assert [tuple(row) for row in store.top_sources(since, until)] == expected_top(rows, since, until)
+
+
+def test_top_sources_accepts_datetimes_and_limits(stored):
+    store, rows = stored
+    since = START + 5.5 * ROLLUP_SECONDS
+    top = store.top_sources(datetime.fromtimestamp(since), limit=2)
+    assert [tuple(row) for row in top] == expected_top(rows, since, limit=2)
+
+
+@pytest.mark.parametrize('limit, filters', [
+    (1, {'source': 'Disk'}),
+    (37, {}),
+    (100, {'event_id': 1014, 'since': START + SPAN / 2}),
+    (5000, {}),
+])
+def test_history_pages_through_every_row_once(stored, limit, filters):
+    store, rows = stored
+    paged, pages = all_pages(store, limit, **filters)
+    expected = expected_history(rows, **filters)
+    assert [(row.id, row.timestamp) for row in paged] == expected
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+def test_history_rows_round_trip(stored):
+    store, rows = stored
+    (row,), _ = store.history(limit=1)
+    ts, source, event_id, message, reason, count, last_seen = rows[row.id - 1]
+    assert tuple(row) == (row.id, ts, last_seen, source, event_id, message, reason, count)
+
+
+def test_history_rejects_a_bad_cursor(stored):
+    store, _ = stored
+    _, cursor = store.history(limit=3)
+    assert decode_cursor(cursor)[1] > 0
+    with pytest.raises(ValueError):
+        store.history(cursor='not-a-cursor')
+
+
+def test_rollups_match_the_rows_after_adds(stored):
+    store, _ = stored
+    assert rollups(store) == rollups_from_rows(store)
+
+
+@pytest.mark.parametrize('older_than', [START + 10 * ROLLUP_SECONDS, START + 10.6 * ROLLUP_SECONDS])
+def test_purge_keeps_the_rollups_consistent(stored, older_than):
+    store, rows = stored
+    cutoff = START + 10 * ROLLUP_SECONDS  # Rounded down to the bucket
+    assert store.purge(older_than) == sum(row[0] < cutoff for row in rows)
+    remaining = [row for row in rows if row[0] >= cutoff]
+    assert store.count() == len(remaining)
+    assert rollups(store) == rollups_from_rows(store)
+    assert min(bucket for bucket, *_ in rollups(store)) == 10 + START // ROLLUP_SECONDS
+    assert [tuple(row) for row in store.top_sources(START)] == expected_top(remaining, START)
+    assert [tuple(row) for row in store.top_sources(START + 12.5 * ROLLUP_SECONDS, START + 30.2 * ROLLUP_SECONDS)] \
+        == expected_top(remaining, START + 12.5 * ROLLUP_SECONDS, START + 30.2 * ROLLUP_SECONDS)
+
+
+def test_add_skips_headers_and_malformed_rows(tmp_path):
+    store = AnomalyStore(str(tmp_path / 'anomalies.db'), retention_days=None)
+    added = store.add([
+        ('Timestamp', 'Source', 'EventID', 'Message', 'Reason', 'Count', 'LastSeen'),
+        ('2024-05-01 10:00:00', 'Disk', '7', 'bad block', 'model', '3', '2024-05-01 10:02:00'),
+        ('2024-05-01 10:01:00', 'Source: WinRM | ID: 10 | Message: listener failed', 'rule', '2', ''),
+        ('not a time', 'Disk', '7', 'bad block'),
+        ('2024-05-01 10:00:00', 'Disk'),
+    ])
+    assert added == 2
+    rows, _ = store.history()
+    assert [(row.source, row.event_id, row.message, row.count) for row in rows] == [
+        ('WinRM', 10, 'listener failed', 2), ('Disk', 7, 'bad block', 3)]
+    assert rows[0].last_seen == rows[0].timestamp
+    assert rows[1].last_seen - rows[1].timestamp == 120
+    store.close()
+
+
+def test_parse_anomaly_row_reads_the_short_main_layout():
+    assert parse_anomaly_row([START, 'Disk', 7, 'bad block']) == (START, START, 'Disk', 7, 'bad block', '', 1)
@@ -0,0 +1,129 @@
+# tests/test_dedup.py
+# RecordWindow must answer like an exact set of seen record numbers inside
+# its window, treat anything older as seen, and never grow.
+
+import itertools
+import random
+import tracemalloc
+
+import pytest
+
+from src.dedup import DedupStore, RecordWindow
+
+
+def record_stream(records, seed=42):
+    """Mostly increasing record numbers with periodic re-reads from behind the high-water mark."""
+    rng = random.Random(seed)
+    high = 0
+    emitted = 0
+    while emitted < records:
+        if rng.random() < 0.05 and high > 20:
+            # The reader went back and re-read a short stretch it already saw
+            start = high - rng.randint(1, 2000)
+            for record in range(max(start, 1), high + 1):
+                yield record
+            emitted += high - max(start, 1) + 1
+        else:
+            for _ in range(100):
+                high += 1 if rng.random() < 0.99 else rng.randint(2, 50)
+                yield high
+            emitted += 100
+
+
+def reference_is_new(seen, high, window, record):
+    """What an unbounded set would answer, with RecordWindow's rule for records older than the window."""
+    if record <= high - window:
+        return False
+    if record in seen:
+        return False
+    seen.add(record)
+    return True
+
+
+@pytest.mark.parametrize('window', [64, 1000, 1 << 16])
+def test_matches_an_exact_set_inside_the_window(window):
+    records = RecordWindow(window)
+    seen, high = set(), 0
+    for record in record_stream(200000, seed=window):
+        assert records.add(record) == reference_is_new(seen, high, window, record), record
+        high = max(high, record)
+
+
+def test_duplicates_are_caught():
+    records = RecordWindow(128)
+    assert records.add(10)
+    assert not records.add(10)
+    assert records.add(11)
+    assert not records.add(11)
+    assert not records.add(10)
+
+
+def test_out_of_order_records_inside_the_window():
+    records = RecordWindow(128)
+    for record in (100, 98, 99, 97, 101):
+        assert records.add(record)
+    for record in (97, 98, 99, 100, 101):
+        assert not records.add(record)
+    # Skipped numbers below the high-water mark are still new when they turn up
+    assert records.add(50)
+    assert records.add(120)
+    assert records.add(110)
+
+
+def test_records_older_than_the_window_count_as_seen():
+    records = RecordWindow(128)
+    assert records.add(1000)
+    assert not records.add(1000 - 128)
+    assert records.add(1000 - 127)
+
+
+def test_a_jump_past_the_window_forgets_the_old_bits():
+    records = RecordWindow(64)
+    assert records.add(5)
+    assert records.add(5 + 64 * 3)  # Same slot as 5, one window-multiple ahead
+    assert not records.add(5 + 64 * 3)
+    assert records.add(5 + 64 * 3 - 1)
+
+
+def test_memory_stays_bounded():
+    records = RecordWindow(1 << 16)
+    size = len(records._bits)
+    stream = record_stream(600000, seed=7)
+    for record in itertools.islice(stream, 100000):  # Warm-up: the bitmap is allocated up front
+        records.add(record)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for record in stream:
+            records.add(record)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(records._bits) == size
+    assert after - before < 16 * 1024
+    assert len(records.to_dict()['bitmap']) == len(RecordWindow(1 << 16).to_dict()['bitmap'])
+
+
+def test_checkpoint_resumes_the_same_answers(tmp_path):
+    path = str(tmp_path / 'dedup.json')
+    store = DedupStore(path, window=256)
+    for record in list(range(1, 500)) + [505, 503]:
+        store.is_new('System', record)
+    store.save()
+
+    resumed = DedupStore(path, window=256)
+    assert resumed.high_water('System') == 505
+    assert not resumed.is_new('System', 503)
+    assert not resumed.is_new('System', 499)
+    assert resumed.is_new('System', 504)
+    assert resumed.is_new('System', 506)
+
+
+def test_reset_forgets_a_cleared_channel():
+    store = DedupStore(path=None)
+    assert store.is_new('Application', 42)
+    assert not store.is_new('Application', 42)
+    store.reset('Application')
+    assert store.is_new('Application', 42)
+    assert store.is_new('System', 42)  # Channels never share state
@@ -0,0 +1,86 @@
+# tests/test_flat_forest.py
+# The flattened forest must score exactly like the IsolationForest it was
+# built from, in memory and when mapped from the compact mmap artifact.
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+from src.flat_forest import FlatIsolationForest, to_flat_pipeline
+from src.mmap_model import export_mmap_model, load_mmap_model
+from src.normalize import clean_message
+from src.synthetic_logs import generate_logs
+
+
+def messages(count, seed=0):
+    return [clean_message(f'{message} #{seed + n}') for n, (_, _, _, message) in enumerate(generate_logs(count))]
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    model = Pipeline([
+        ('tfidf', TfidfVectorizer(max_features=500)),
+        ('clf', IsolationForest(n_estimators=50, contamination='auto', random_state=42)),
+    ])
+    return model.fit(messages(300))
+
+
+@pytest.fixture(scope='module')
+def batch(pipeline):
+    return pipeline[:-1].transform(messages(200, seed=1000) + ['', 'unseen words only'])
+
+
+def assert_same_scores(forest, flat, X):
+    assert np.array_equal(forest.decision_function(X), flat.decision_function(X))
+    assert np.array_equal(forest.predict(X), flat.predict(X))
+
+
+def test_batch_scores_are_identical(pipeline, batch):
+    forest = pipeline[-1]
+    assert_same_scores(forest, FlatIsolationForest.from_forest(forest), batch)
+
+
+def test_single_rows_score_like_the_batch(pipeline, batch):
+    forest, flat = pipeline[-1], FlatIsolationForest.from_forest(pipeline[-1])
+    for row in range(0, batch.shape[0], 25):
+        assert_same_scores(forest, flat, batch[row])
+
+
+def test_all_zero_and_dense_inputs(pipeline, batch):
+    forest, flat = pipeline[-1], FlatIsolationForest.from_forest(pipeline[-1])
+    assert_same_scores(forest, flat, sp.csr_matrix(batch.shape))
+    assert_same_scores(forest, flat, batch[:20].toarray())
+
+
+def test_feature_subsampled_forest():
+    X = sp.random(300, 40, density=0.2, format='csr', random_state=7)
+    forest = IsolationForest(n_estimators=30, max_features=0.5, random_state=42).fit(X)
+    assert_same_scores(forest, FlatIsolationForest.from_forest(forest), X)
+
+
+def test_wrong_width_is_rejected(pipeline):
+    with pytest.raises(ValueError):
+        FlatIsolationForest.from_forest(pipeline[-1]).decision_function(sp.csr_matrix((1, 3)))
+
+
+def test_to_flat_pipeline_keeps_the_featurizer(pipeline):
+    flat = to_flat_pipeline(pipeline)
+    assert isinstance(flat[-1], FlatIsolationForest)
+    assert flat[0] is pipeline[0]
+    docs = messages(50, seed=5000)
+    assert np.array_equal(pipeline.decision_function(docs), flat.decision_function(docs))
+
+
+def test_mmap_artifact_maps_the_flat_forest(pipeline, tmp_path):
+    path = export_mmap_model(pipeline, str(tmp_path / 'model.mmap.joblib'))
+    mapped = load_mmap_model(path)
+    forest = mapped[-1]
+    assert isinstance(forest, FlatIsolationForest)
+    for name in ('feature', 'threshold', 'left', 'right', 'leaf_value'):
+        array = getattr(forest, name)
+        assert isinstance(array, np.memmap) and not array.flags.writeable, name
+    docs = messages(100, seed=9000) + ['']
+    assert np.array_equal(pipeline.decision_function(docs), mapped.decision_function(docs))
@@ -0,0 +1,80 @@
+# tests/test_normalize.py
+# The shared normalizer must stay byte-identical to the regex cleaning the
+# model was trained with, on the live path and the bulk training path.
+
+import csv
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from src.normalize import clean_message, clean_series
+from src.synthetic_logs import generate_logs
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYNTHETIC_ROWS = 20000
+
+# Awkward inputs: unicode case folding, non-ASCII whitespace, control chars
+EDGE_CASES = [
+    "", "   ", "ABC def", "Fatal CRASH!!! 0xC0000005", "tab\tand\nnewline\r\n",
+    "\x1c\x1d\x1e\x1f separators", "non\u00a0breaking\u2003spaces", "İstanbul ǅ ß ﬃ",
+    "Ünïcödé façade — naïve", "\\\\?\\C:\\WINDOWS\\SystemTemp\\WER-425703-0.sysdata.xml",
+    "mixed ＡＢＣ full-width", "emoji 🚨 alert", "\u2028line\u2029para",
+]
+
+
+def legacy_live_clean(message):
+    """The clean_message that used to live in main.py / dashboard.py."""
+    if not isinstance(message, str):
+        return ""
+    cleaned = message.lower()
+    cleaned = re.sub(r'[^a-z\s]', '', cleaned)
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    return cleaned
+
+
+def legacy_training_clean(series):
+    """The row-wise cleaning that used to live in preprocess.py."""
+    cleaned = series.astype(str).str.lower()
+    cleaned = cleaned.apply(lambda x: re.sub(r'[^a-z\s]', '', x))
+    return cleaned.apply(lambda x: re.sub(r'\s+', ' ', x).strip())
+
+
+def sample_corpus():
+    """The edge cases, every row of the committed live_anomalies.csv and a synthetic stream."""
+    messages = list(EDGE_CASES)
+    with open(os.path.join(REPO_ROOT, 'live_anomalies.csv'), newline='', encoding='utf-8') as f:
+        messages.extend(' '.join(row) for row in csv.reader(f))
+    messages.extend(message for _, _, _, message in generate_logs(SYNTHETIC_ROWS))
+    return messages
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    return sample_corpus()
+
+
+@pytest.mark.parametrize('message', EDGE_CASES)
+def test_clean_message_matches_legacy_on_edge_cases(message):
+    assert clean_message(message).encode() == legacy_live_clean(message).encode()
+
+
+def test_clean_message_matches_legacy_on_corpus(corpus):
+    mismatches = [m for m in corpus if clean_message(m).encode() != legacy_live_clean(m).encode()]
+    assert mismatches == []
+
+
+def test_clean_series_matches_legacy_training_clean(corpus):
+    series = pd.Series(corpus)
+    expected = [s.encode() for s in legacy_training_clean(series)]
+    assert [s.encode() for s in clean_series(series.astype(str))] == expected
+
+
+def test_live_and_bulk_paths_agree(corpus):
+    bulk = clean_series(pd.Series(corpus).astype(str)).tolist()
+    assert [clean_message(m) for m in corpus] == bulk
+
+
+def test_non_strings_clean_to_empty():
+    assert clean_message(None) == legacy_live_clean(None) == ''
@@ -0,0 +1,114 @@
+# tests/test_rate_detector.py
+
+import pytest
+
+from src.rate_detector import NEW_KEY, RATE_SPIKE, BloomFilter, RateDetector
+
+KEY = ('Microsoft-Windows-DNS-Client', 1014)
+
+
+class Clock:
+    """A wall clock the test moves by hand."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def detector(clock=None, **kwargs):
+    kwargs.setdefault('learning_period', 0)
+    return RateDetector(width=1 << 10, bloom_bits=1 << 16, clock=clock or Clock(), **kwargs)
+
+
+def rules(findings):
+    return [None if finding is None else finding[0] for finding in findings]
+
+
+def feed(rate_detector, per_bucket, buckets, start=0.0, key=KEY):
+    """`per_bucket` events of `key` in each of `buckets` consecutive buckets; returns the findings."""
+    width = rate_detector.bucket_seconds
+    return [
+        rate_detector.observe(*key, seen=start + bucket * width + n * width / (per_bucket + 1))
+        for bucket in range(buckets) for n in range(per_bucket)
+    ]
+
+
+def test_first_event_of_a_key_is_new():
+    rate_detector = detector()
+    assert rules([rate_detector.observe('App', 1, seen=0.0), rate_detector.observe('App', 1, seen=1.0),
+                  rate_detector.observe('App', 2, seen=2.0), rate_detector.observe('Other', 1, seen=3.0)]) \
+        == [NEW_KEY, None, NEW_KEY, NEW_KEY]
+    assert rate_detector.stats()['new_keys'] == 3
+
+
+def test_steady_rate_is_not_a_spike():
+    rate_detector = detector()
+    findings = feed(rate_detector, 5, 60)
+    assert rules(findings).count(RATE_SPIKE) == 0
+    assert rules(findings)[0] == NEW_KEY
+
+
+def test_burst_fires_once_per_bucket_at_the_crossing():
+    rate_detector = detector()
+    feed(rate_detector, 1, 60)
+    # Expected 1 per bucket, so the threshold is min_count (20) events
+    burst = feed(rate_detector, 50, 2, start=60 * 60.0)
+    assert rules(burst).count(RATE_SPIKE) == 2
+    assert rules(burst).index(RATE_SPIKE) == 19
+    assert rules(burst)[50:].index(RATE_SPIKE) < 50
+    assert rate_detector.stats()['spikes'] == 2
+
+
+def test_burst_below_min_count_is_not_a_spike():
+    rate_detector = detector(min_count=100)
+    feed(rate_detector, 1, 30)
+    assert RATE_SPIKE not in rules(feed(rate_detector, 50, 1, start=30 * 60.0))
+
+
+def test_spike_threshold_follows_the_baseline():
+    rate_detector = detector()
+    feed(rate_detector, 10, 120)
+    # 10x a baseline of 10 is 100 events; 60 is busy but not a spike
+    assert RATE_SPIKE not in rules(feed(rate_detector, 60, 1, start=120 * 60.0))
+    assert RATE_SPIKE in rules(feed(rate_detector, 150, 1, start=121 * 60.0))
+
+
+def test_learning_period_is_measured_in_arrival_time():
+    clock = Clock()
+    rate_detector = detector(clock, learning_period=900)
+    # A first run reads a day of backlog within a few seconds
+    backlog = [rate_detector.observe(f'Source{n % 7}', n, seen=n * 60.0) for n in range(24 * 60)]
+    assert backlog == [None] * len(backlog)
+    clock.now += 899
+    assert rate_detector.observe('Late', 1, seen=24 * 3600.0) is None
+    clock.now += 2
+    assert rules([rate_detector.observe('Later', 1, seen=24 * 3600.0 + 1),
+                  rate_detector.observe('Source1', 1, seen=24 * 3600.0 + 2)]) == [NEW_KEY, None]
+
+
+def test_learning_period_without_event_times():
+    clock = Clock()
+    rate_detector = detector(clock, learning_period=60)
+    assert rate_detector.observe('App', 1) is None
+    clock.now += 30
+    assert rate_detector.observe('App', 2) is None
+    clock.now += 31
+    assert rules([rate_detector.observe('App', 3), rate_detector.observe('App', 2)]) == [NEW_KEY, None]
+
+
+def test_simulated_stream_learns_in_event_time():
+    rate_detector = RateDetector(learning_period=600, width=1 << 10, bloom_bits=1 << 16, clock=None)
+    assert rate_detector.observe('App', 1, seen=0.0) is None
+    assert rate_detector.observe('App', 2, seen=599.0) is None
+    assert rules([rate_detector.observe('App', 3, seen=601.0)]) == [NEW_KEY]
+
+
+def test_bloom_filter_reports_what_it_has_seen():
+    bloom = BloomFilter(bits=1 << 12, hashes=3)
+    assert not bloom.add(1, 3)
+    assert bloom.add(1, 3)
+    assert bloom.added == 1
+    with pytest.raises(ValueError):
+        BloomFilter(bits=1000)
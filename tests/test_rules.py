@@ -0,0 +1,164 @@
+# tests/test_rules.py
+# The rule engine must give the same first-matching-rule answer however a
+# rule is evaluated: dict lookups, the keyword automaton or its trie-regex
+# fallback, the shared regex alternation or a standalone regex.
+
+import json
+import re
+
+import pytest
+
+import src.rules as rules
+from src.rules import Rule, RuleEngine, combinable, load_rules, make_rule, required_literal, trie_regex
+
+
+@pytest.fixture(params=['aho-corasick', 'trie-regex'])
+def matcher(request, monkeypatch):
+    """Runs a test with the Aho-Corasick automaton and again with the fallback."""
+    if request.param == 'aho-corasick' and rules.ahocorasick is None:
+        pytest.skip('pyahocorasick is not installed')
+    if request.param == 'trie-regex':
+        monkeypatch.setattr(rules, 'ahocorasick', None)
+    return request.param
+
+
+def engine(*specs, **kwargs):
+    return RuleEngine([make_rule(spec) for spec in specs], **kwargs)
+
+
+def rule(name, kind, patterns, action='alert'):
+    return {'name': name, 'kind': kind, 'patterns': patterns, 'action': action}
+
+
+def decided_by(decision):
+    return None if decision is None else decision.rule.name
+
+
+def test_event_ids_match_on_their_low_16_bits():
+    rule_engine = engine(rule('scm', 'event_id', [7034]), rule('raw', 'event_id', [0x40001B7B]))
+    assert decided_by(rule_engine.match('x', event_id=7034)) == 'scm'
+    assert decided_by(rule_engine.match('x', event_id=0xC0001B7A)) == 'scm'
+    assert decided_by(rule_engine.match('x', event_id=0xC0001B7A - (1 << 32))) == 'scm'  # Signed, as pywin32 may report it
+    assert decided_by(rule_engine.match('x', event_id=7035)) == 'raw'  # The rule's own qualifier bits are ignored too
+    assert rule_engine.match('x', event_id=7036) is None
+    assert rule_engine.match('x') is None
+
+
+def test_sources_match_case_insensitively():
+    rule_engine = engine(rule('test-source', 'source', ['PythonTestEventSource']))
+    assert decided_by(rule_engine.match('x', source='pythontesteventsource')) == 'test-source'
+    assert rule_engine.match('x', source='PythonTestEventSource2') is None
+
+
+def test_lookups_come_before_text_rules(matcher):
+    rule_engine = engine(
+        rule('keywords', 'keyword', ['crash']),
+        rule('quiet-source', 'source', ['Noisy'], 'ignore'),
+        rule('ids', 'event_id', [1000]),
+    )
+    assert decided_by(rule_engine.match('app crash', 'Noisy', 1000)) == 'ids'
+    assert decided_by(rule_engine.match('app crash', 'Noisy', 1)) == 'quiet-source'
+    assert rule_engine.match('app crash', 'Noisy', 1).rule.action == 'ignore'
+    assert decided_by(rule_engine.match('app crash', 'Other', 1)) == 'keywords'
+
+
+def test_leftmost_keyword_wins_and_is_reported_as_written(matcher):
+    rule_engine = engine(rule('first', 'keyword', ['failed']), rule('second', 'keyword', ['fatal', 'FAILED']))
+    decision = rule_engine.match('A Fatal error: service FAILED')
+    assert (decided_by(decision), decision.text) == ('second', 'Fatal')
+    # The earlier rule owns a keyword both list
+    assert decided_by(rule_engine.match('service failed')) == 'first'
+
+
+def test_keywords_come_before_regexes(matcher):
+    rule_engine = engine(rule('timeouts', 'regex', [r'name .* timed out']), rule('kw', 'keyword', ['timed']))
+    assert decided_by(rule_engine.match('name example.com timed out')) == 'kw'
+
+
+def test_leftmost_regex_wins_across_gated_and_combined_patterns(matcher):
+    rule_engine = engine(
+        rule('gated', 'regex', [r'disk \d+ offline']),   # Has a required literal
+        rule('combined', 'regex', [r'[0-9a-f]{8}']),     # Doesn't
+    )
+    assert decided_by(rule_engine.match('disk 3 offline after deadbeef')) == 'gated'
+    assert decided_by(rule_engine.match('deadbeef then disk 3 offline')) == 'combined'
+    assert rule_engine.match('disk offline') is None
+
+
+def test_earlier_rule_wins_a_regex_tie(matcher):
+    rule_engine = engine(rule('a', 'regex', [r'err\w*']), rule('b', 'regex', [r'e\w+']))
+    assert decided_by(rule_engine.match('errors everywhere')) == 'a'
+
+
+@pytest.mark.parametrize('pattern, message, text', [
+    (r'\b(\w+) \1\b', 'the the disk', 'the the'),
+    (r'(?P<word>\w+)-(?P=word)', 'retry-retry', 'retry-retry'),
+    (r'(?P<code>0x[0-9a-f]+)', 'status 0x1f', '0x1f'),
+    (r'(?i)[xyz]{3}', 'got XYZ', 'XYZ'),
+    (r'(a)?(?(1)b|c)', 'ab', 'ab'),
+])
+def test_patterns_with_their_own_groups_match_as_written(matcher, pattern, message, text):
+    assert not combinable(pattern)
+    # Alongside a combined pattern with groups of its own, which must not disturb it
+    rule_engine = engine(rule('other', 'regex', [r'(q)(u)+x']), rule('user', 'regex', [pattern]))
+    decision = rule_engine.match(message)
+    assert (decided_by(decision), decision.text) == ('user', text)
+    assert decided_by(rule_engine.match('quux')) == 'other'
+
+
+def test_regexes_ignore_case(matcher):
+    rule_engine = engine(rule('dns', 'regex', [r'name .* timed out']))
+    assert decided_by(rule_engine.match('Name foo TIMED OUT')) == 'dns'
+
+
+def test_from_keywords_wraps_a_legacy_alternation(matcher):
+    rule_engine = RuleEngine.from_keywords('fatal|crash|error')
+    assert rule_engine.match('A CRASH happened').text == 'CRASH'
+    assert rule_engine.match('all good') is None
+
+
+def test_cached_outcomes_are_counted_and_bounded(matcher):
+    rule_engine = engine(rule('kw', 'keyword', ['crash']), cache_size=2)
+    for message in ['crash one', 'crash one', 'ok', 'crash two', 'crash one']:
+        rule_engine.match(message)
+    assert len(rule_engine._cache) <= 2
+    stats = rule_engine.stats()
+    assert stats['matcher'] == matcher
+    assert stats['evaluations'] == 5
+    assert stats['rules'][0]['hits'] == 4
+
+
+def test_load_rules_prefers_the_json_file(tmp_path):
+    assert [r.name for r in load_rules(str(tmp_path / 'missing.json'))] == ['critical-keywords']
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([rule('ids', 'event_id', [1000, 1001])]), encoding='utf-8')
+    assert load_rules(str(path)) == [Rule('ids', 'event_id', [1000, 1001], 'alert')]
+
+
+@pytest.mark.parametrize('spec', [
+    rule('bad-kind', 'glob', ['*']),
+    rule('bad-action', 'keyword', ['x'], 'drop'),
+    rule('empty', 'keyword', []),
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(ValueError):
+        make_rule(spec)
+
+
+@pytest.mark.parametrize('words', [['fatal', 'failed', 'fail'], ['a.b', 'a+b', 'ab'], ['x']])
+def test_trie_regex_matches_the_plain_alternation(words):
+    trie = re.compile(trie_regex(words))
+    plain = re.compile('|'.join(sorted(map(re.escape, words), key=len, reverse=True)))
+    for text in ['fatal failed fail', 'a.b a+b ab', 'axb fai x']:
+        assert [m.group(0) for m in trie.finditer(text)] == [m.group(0) for m in plain.finditer(text)]
+
+
+@pytest.mark.parametrize('pattern, literal', [
+    (r'name .* timed out', ' timed out'),
+    (r'disk \d+ offline', ' offline'),
+    (r'abc|def', None),
+    (r'colou?r', 'colo'),  # The optional 'u' ends the run
+    (r'[0-9a-f]{8}', None),
+])
+def test_required_literal(pattern, literal):
+    assert required_literal(pattern) == literal
@@ -0,0 +1,134 @@
+# tests/test_sharded.py
+# What travels between the sharded processes must come back unchanged, and
+# the merged output must be exactly what one process scoring the same
+# events in order would have produced.
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+from src.event_sources import SyntheticSource, event_message, event_seconds
+from src.normalize import clean_message
+from src.rules import RuleEngine
+from src.scoring_engine import ScoringEngine, Verdict
+from src.sharded import (ShardedDetector, ShmRing, decode_events, decode_verdicts, encode_events,
+                         encode_verdicts, shard_of)
+from src.synthetic_logs import generate_logs
+
+EVENTS = [
+    ('Disk error on \\Device\\Harddisk0', 'Disk', 7, 1_700_000_000.25),
+    ('', 'EventLog', 6005, 1_700_000_001.0),
+    ('Dienst „Spooler“ beendet ✓', 'Service Control Manager', 7036, 1_700_000_002.5),
+    ('lone surrogate \udc80 kept', 'Application', -1, 0.0),
+    ('x' * 70000, 'Big', 4294967295, 1e10),
+]
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing(capacity=64)
+    yield ring
+    ring.close()
+
+
+def test_events_round_trip():
+    seqs = [10, 11, 2 ** 40, 13, 14]
+    messages, sources, event_ids, seen = map(list, zip(*EVENTS))
+    decoded_seqs, decoded = decode_events(encode_events(seqs, sources, event_ids, messages, seen))
+    assert decoded_seqs.tolist() == seqs
+    assert decoded == EVENTS
+
+
+def test_empty_event_batch_round_trips():
+    seqs, events = decode_events(encode_events([], [], [], [], []))
+    assert (seqs.tolist(), events) == ([], [])
+
+
+def test_verdicts_round_trip():
+    seqs = [5, 6, 7, 8, 9]
+    verdicts = [
+        Verdict(True, -0.125, 'Disk', 'disk-errors'),
+        Verdict(False, 0.25, None),
+        Verdict(True, 0.5, None, 'rate-spike'),
+        Verdict(True, -0.75, None),
+        Verdict(False, 1.0, None, 'ignored-source'),
+    ]
+    rows, found = decode_verdicts(encode_verdicts(seqs, EVENTS, verdicts))
+    assert rows['seq'].tolist() == seqs
+    assert rows['score'].tolist() == [v.score for v in verdicts]
+    assert [(a.seq, a.message, a.source, a.event_id, a.seen, a.verdict) for a in found] == [
+        (seq,) + event + (verdict,) for seq, event, verdict in zip(seqs, EVENTS, verdicts) if verdict.is_anomaly
+    ]
+
+
+def test_ring_wraps_around_without_losing_a_byte(ring):
+    # Odd-sized records make most puts straddle the end of the 64-byte buffer
+    sent, received = [], []
+    for n in range(500):
+        records = [bytes([n % 251]) * (n % 23), b'', bytes(range(n % 7))]
+        ring.put(records)
+        sent += records
+        if n % 2:
+            ring.put([b'%d' % n])
+            sent.append(b'%d' % n)
+        received += ring.get()
+    assert received == sent
+    assert ring.get() == []
+
+
+def test_ring_rejects_a_record_it_cannot_hold(ring):
+    with pytest.raises(ValueError):
+        ring.put([b'x' * 61])
+
+
+def test_attached_ring_reads_what_the_owner_wrote(ring):
+    attached = ShmRing(ring.name, ring.capacity, ring._lock)
+    try:
+        ring.put([b'hello', b'world'])
+        assert attached.get() == [b'hello', b'world']
+        assert not attached.owner
+    finally:
+        attached.close()
+
+
+def test_shard_of_is_stable():
+    assert shard_of('Disk', 7, 4) == shard_of('Disk', 7, 4)
+    assert {shard_of(f'Source{n}', n, 4) for n in range(100)} == {0, 1, 2, 3}
+
+
+@pytest.fixture(scope='module')
+def model():
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer(max_features=2000)),
+        ('clf', IsolationForest(n_estimators=50, contamination=0.05, random_state=42)),
+    ])
+    return pipeline.fit([clean_message(message) for *_, message in generate_logs(2000, seed=1)])
+
+
+def test_sharded_verdicts_equal_single_process_verdicts_in_record_order(model):
+    count = 3000
+    events = SyntheticSource(count).read(count)
+    reference = ScoringEngine(model, rules=RuleEngine.from_config()).score_events(
+        [(event_message(e), e.SourceName, e.EventID, event_seconds(e)) for e in events]
+    )
+
+    # The rate detector and template cache see each shard's share only, so they are off here
+    detector = ShardedDetector(f'synthetic:{count}', model, shards=3, rate_detection=False,
+                               template_cache=False, ring_bytes=1 << 16)
+    batches = []
+    assert detector.run(batches.append, seconds=120) == count
+    assert [batch.first_seq for batch in batches] == list(np.cumsum([0] + [len(b.scores) for b in batches[:-1]]))
+
+    is_anomaly = np.concatenate([batch.is_anomaly for batch in batches])
+    scores = np.concatenate([batch.scores for batch in batches])
+    assert is_anomaly.tolist() == [v.is_anomaly for v in reference]
+    assert np.array_equal(scores, [v.score for v in reference])
+    anomalies = [anomaly for batch in batches for anomaly in batch.anomalies]
+    assert anomalies, "the test model should flag some events"
+    assert [(a.seq, a.source, a.event_id, a.message, a.verdict) for a in anomalies] == [
+        (seq, events[seq].SourceName, events[seq].EventID, event_message(events[seq]), verdict)
+        for seq, verdict in enumerate(reference) if verdict.is_anomaly
+    ]
+    assert detector.anomalies == len(anomalies)